@@ -0,0 +1,105 @@
+from datetime import timedelta, timezone as dt_timezone
+
+from django.utils import timezone
+
+from todo.models import RecurrenceRule
+
+FEED_FIELDS = ('id', 'title', 'due_date', 'due_time', 'due_at', 'done', 'updated_at')
+RECURRENCE_FIELDS = ('freq', 'interval', 'byweekday', 'until', 'count')
+FEED_CHUNK_SIZE = 2000
+PRODID = '-//Todo App//Task Calendar//EN'
+
+
+def escape_text(value):
+    """Escape a TEXT value per RFC 5545 section 3.3.11"""
+    return (
+        value.replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def fold(line):
+    """Fold a content line to 75 octets, continuation lines starting with a space"""
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts = []
+    limit = 75
+    while encoded:
+        cut = min(limit, len(encoded))
+        # Never split a multi-byte UTF-8 sequence
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode())
+        encoded = encoded[cut:]
+        limit = 74
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def format_utc(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def format_local(value):
+    return value.strftime('%Y%m%dT%H%M%S')
+
+
+def format_date(value):
+    return value.strftime('%Y%m%d')
+
+
+def feed_rows(tasks, chunk_size=FEED_CHUNK_SIZE):
+    """Stream tuples straight from the cursor without building model instances"""
+    fields = FEED_FIELDS + tuple(f'recurrence__{field}' for field in RECURRENCE_FIELDS)
+    return tasks.order_by('due_date', 'id').values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+def task_event(host, tz, task_id, title, due_date, due_time, due_at, done, updated_at, *recurrence):
+    """One VEVENT; ``tz`` is the owner's time zone, which due_at was computed in"""
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:task-{task_id}@{host}',
+        f'DTSTAMP:{format_utc(updated_at)}',
+        f'LAST-MODIFIED:{format_utc(updated_at)}',
+    ]
+    if due_time is None:
+        day = timezone.localtime(due_date, tz).date()
+        lines.append(f'DTSTART;VALUE=DATE:{format_date(day)}')
+        lines.append(f'DTEND;VALUE=DATE:{format_date(day + timedelta(days=1))}')
+    elif recurrence[0]:
+        # Floating local time: repeating at a UTC instant would shift by an
+        # hour across DST and can move BYDAY to the wrong weekday
+        start = timezone.localtime(due_at, tz).replace(tzinfo=None)
+        lines.append(f'DTSTART:{format_local(start)}')
+    else:
+        # UTC: a TZID would need a matching VTIMEZONE component
+        lines.append(f'DTSTART:{format_utc(due_at)}')
+    if recurrence[0]:
+        rule = RecurrenceRule(**dict(zip(RECURRENCE_FIELDS, recurrence)))
+        lines.append('RRULE:' + rule.to_rrule(None if due_time is None else start.time()))
+    summary = f'✓ {title}' if done else title
+    lines.append(f'SUMMARY:{escape_text(summary)}')
+    lines.append('END:VEVENT')
+    return ''.join(fold(line) for line in lines)
+
+
+def stream_calendar(tasks, host, tz, name='Tasks'):
+    """
+    Yield an iCalendar document one event at a time, with dates in ``tz``.
+
+    The body is produced after the view returns, so the time zone is passed
+    in rather than taken from the active one.
+    """
+    yield ''.join(fold(line) for line in (
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        f'X-WR-CALNAME:{escape_text(name)}',
+    ))
+    for row in feed_rows(tasks):
+        yield task_event(host, tz, *row)
+    yield fold('END:VCALENDAR')
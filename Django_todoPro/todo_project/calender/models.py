@@ -1,3 +1,27 @@
+import secrets
+
 from django.db import models
+from django.contrib.auth.models import User
+
+
+def generate_feed_token():
+    return secrets.token_urlsafe(24)
+
+
+class CalendarFeed(models.Model):
+    """
+    Secret token for a user's iCalendar subscription URL.
+
+    Calendar clients poll the feed without a session, so the token in the
+    URL is the only credential; resetting it invalidates old subscriptions.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='calendar_feed')
+    token = models.CharField(max_length=64, unique=True, default=generate_feed_token)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Calendar feed of {self.user.username}"
 
-# Create your models here.
+    def reset_token(self):
+        self.token = generate_feed_token()
+        self.save(update_fields=['token'])
@@ -1,3 +1,54 @@
+from datetime import date, datetime, time, timezone as dt_timezone
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.urls import reverse
+
+from todo.models import RecurrenceRule, Task
+from .models import CalendarFeed
+
+
+class CalendarFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', password='secret-pass')
+        cls.user.profile.time_zone = 'America/New_York'
+        cls.user.profile.save()
+        cls.feed = CalendarFeed.objects.create(user=cls.user)
+        # 02:00 UTC on Jan 1st is still Dec 31st in New York
+        cls.due = datetime(2030, 1, 1, 2, 0, tzinfo=dt_timezone.utc)
+
+    def get_feed(self):
+        response = self.client.get(reverse('calender:feed', kwargs={'token': self.feed.token}))
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_all_day_task_is_on_the_owners_local_date(self):
+        Task.objects.create(user=self.user, title='New year', due_date=self.due)
+        self.assertIn('DTSTART;VALUE=DATE:20291231\r\n', self.get_feed())
+
+    def test_timed_task_starts_at_its_deadline(self):
+        task = Task.objects.create(user=self.user, title='Call', due_date=self.due, due_time=time(9, 0))
+        self.assertEqual(task.due_at, datetime(2029, 12, 31, 14, 0, tzinfo=dt_timezone.utc))
+        self.assertIn('DTSTART:20291231T140000Z\r\n', self.get_feed())
+
+    def test_recurring_timed_task_repeats_at_local_time(self):
+        task = Task.objects.create(user=self.user, title='Stand-up', due_date=self.due, due_time=time(21, 0))
+        RecurrenceRule.objects.create(task=task, freq='WEEKLY', byweekday='MO,WE', until=date(2030, 3, 31))
+        feed = self.get_feed()
+        # 21:00 on Monday in New York is already Tuesday in UTC, and the
+        # series crosses the start of DST on March 10th
+        self.assertIn('DTSTART:20291231T210000\r\nRRULE:FREQ=WEEKLY;BYDAY=MO,WE;UNTIL=20300331T210000\r\n', feed)
+        self.assertNotIn('TZID', feed)
+        self.assertTrue(feed.startswith('BEGIN:VCALENDAR\r\n') and feed.endswith('END:VCALENDAR\r\n'))
+
+    def test_recurring_all_day_task_ends_on_a_date(self):
+        task = Task.objects.create(user=self.user, title='Bins', due_date=self.due)
+        RecurrenceRule.objects.create(task=task, freq='DAILY', interval=2, until=date(2030, 3, 31))
+        self.assertIn('DTSTART;VALUE=DATE:20291231\r\nDTEND;VALUE=DATE:20300101\r\n'
+                      'RRULE:FREQ=DAILY;INTERVAL=2;UNTIL=20300331\r\n', self.get_feed())
 
-# Create your tests here.
+    def test_unchanged_feed_revalidates_with_304(self):
+        url = reverse('calender:feed', kwargs={'token': self.feed.token})
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 304)
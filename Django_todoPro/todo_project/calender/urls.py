@@ -0,0 +1,13 @@
+from django.urls import path
+from .views import MonthView, WeekView, CalendarFeedView, CalendarFeedResetView
+
+app_name = 'calender'
+
+urlpatterns = [
+    path('', MonthView.as_view(), name='month'),
+    path('<int:year>/<int:month>/', MonthView.as_view(), name='month_detail'),
+    path('week/', WeekView.as_view(), name='week'),
+    path('week/<int:year>/<int:week>/', WeekView.as_view(), name='week_detail'),
+    path('feed/reset/', CalendarFeedResetView.as_view(), name='feed_reset'),
+    path('feed/<str:token>.ics', CalendarFeedView.as_view(), name='feed'),
+]
@@ -1,3 +1,193 @@
-from django.shortcuts import render
+import calendar
+from datetime import date, time, timedelta
 
-# Create your views here.
+from django.contrib import messages
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db.models import Q
+from django.db.models.functions import TruncDate
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect
+from django.utils import timezone
+from django.views.generic import View, TemplateView
+
+from todo.conditional import TaskWatermarkMixin
+from todo.models import Task, local_midnight
+from todo.streaming import streaming_content
+from .ics import stream_calendar
+from .models import CalendarFeed
+
+# How far back the subscription feed reaches; later tasks are all included
+FEED_PAST_DAYS = 90
+
+
+class CalendarContextMixin:
+    """Shared context for the month and week views"""
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['today'] = timezone.localdate()
+        context['feed'] = CalendarFeed.objects.filter(user=self.request.user).first()
+        return context
+
+
+# Month View
+class MonthView(LoginRequiredMixin, TaskWatermarkMixin, CalendarContextMixin, TemplateView):
+    """
+    A month grid with per-day task counts.
+
+    The whole visible grid, including the spill-over days of the adjacent
+    months, is one range query on (user, due_date) grouped by day. Recurring
+    tasks are expanded for the same range and added to the day counts.
+    """
+    template_name = 'calender/month.html'
+
+    def get_month(self):
+        today = timezone.localdate()
+        year = self.kwargs.get('year', today.year)
+        month = self.kwargs.get('month', today.month)
+        if not 1 <= month <= 12 or not date.min.year < year < date.max.year:
+            raise Http404('Invalid month.')
+        return year, month
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        year, month = self.get_month()
+        grid = calendar.Calendar().monthdatescalendar(year, month)
+
+        first_day, end_day = grid[0][0], grid[-1][-1] + timedelta(days=1)
+        tasks = self.request.user.tasks
+        now = timezone.now()
+        buckets = {
+            bucket['day']: bucket
+            for bucket in tasks.one_off().day_buckets(local_midnight(first_day), local_midnight(end_day))
+        }
+        for occurrence in tasks.occurrences_between(first_day, end_day):
+            bucket = buckets.setdefault(occurrence.date, {'total': 0, 'completed': 0, 'expired': 0})
+            bucket['total'] += 1
+            bucket['completed'] += occurrence.done
+            bucket['expired'] += occurrence.is_past_due_and_incomplete(now)
+
+        context['weeks'] = [
+            [
+                {
+                    'date': day,
+                    'in_month': day.month == month,
+                    'iso_week': day.isocalendar()[:2],
+                    'counts': buckets.get(day),
+                }
+                for day in week
+            ]
+            for week in grid
+        ]
+        first = date(year, month, 1)
+        previous_month = first - timedelta(days=1)
+        next_month = first + timedelta(days=32)
+        context['month_start'] = first
+        context['previous_month'] = (previous_month.year, previous_month.month)
+        context['next_month'] = (next_month.year, next_month.month)
+        context['weekday_names'] = list(calendar.day_abbr)
+        return context
+
+
+# Week View
+class WeekView(LoginRequiredMixin, TaskWatermarkMixin, CalendarContextMixin, TemplateView):
+    """
+    One ISO week of tasks, bucketed by local due day from a single range
+    query, plus the occurrences of recurring tasks in that week.
+    """
+    template_name = 'calender/week.html'
+
+    def get_week_start(self):
+        if 'year' not in self.kwargs:
+            today = timezone.localdate()
+            return today - timedelta(days=today.weekday())
+        try:
+            return date.fromisocalendar(self.kwargs['year'], self.kwargs['week'], 1)
+        except ValueError:
+            raise Http404('Invalid week.')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        week_start = self.get_week_start()
+        days = [week_start + timedelta(days=offset) for offset in range(7)]
+
+        end_day = days[-1] + timedelta(days=1)
+        tasks = list(
+            self.request.user.tasks.one_off()
+            .due_between(local_midnight(days[0]), local_midnight(end_day))
+            .annotate(day=TruncDate('due_date'))
+            .order_by('due_date', 'id')
+        )
+        occurrences = self.request.user.tasks.occurrences_between(days[0], end_day)
+        for occurrence in occurrences:
+            occurrence.day = occurrence.date
+        tasks = Task.flag_expired(tasks + occurrences)
+
+        by_day = {day: [] for day in days}
+        for task in tasks:
+            by_day[task.day].append(task)
+        for day_tasks in by_day.values():
+            day_tasks.sort(key=lambda task: (task.due_time is not None, task.due_time or time.min))
+
+        context['days'] = [{'date': day, 'tasks': by_day[day]} for day in days]
+        context['week_start'] = week_start
+        context['week_end'] = days[-1]
+        context['task_count'] = len(tasks)
+        context['previous_week'] = (week_start - timedelta(weeks=1)).isocalendar()[:2]
+        context['next_week'] = (week_start + timedelta(weeks=1)).isocalendar()[:2]
+        return context
+
+
+# iCalendar feed
+class CalendarFeedView(TaskWatermarkMixin, View):
+    """
+    Stream a user's tasks as an iCalendar document: the subscription feed,
+    authenticated by the secret token in the URL.
+
+    Calendar clients revalidate with If-None-Match every few minutes; as long
+    as the user's tasks are unchanged that costs one query and a 304.
+    """
+
+    # No forms, and no session or CSRF cookie on a subscription
+    etag_includes_csrf = False
+
+    def dispatch(self, request, *args, **kwargs):
+        self.feed = get_object_or_404(CalendarFeed.objects.select_related('user__profile'), token=kwargs['token'])
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_watermark_user(self):
+        return self.feed.user
+
+    def get(self, request, *args, **kwargs):
+        return self.get_conditional(request, self.stream_feed, *args, **kwargs)
+
+    def stream_feed(self, request, *args, **kwargs):
+        user = self.feed.user
+        # A subscription has no session, so the owner's time zone is applied here
+        tz = user.profile.get_timezone()
+        since = local_midnight(timezone.localdate() - timedelta(days=FEED_PAST_DAYS))
+        lines = stream_calendar(
+            # Open recurring series are included however long ago they started
+            user.tasks.filter(Q(due_date__gte=since) | Q(repeats=True, done=False)),
+            request.get_host(),
+            tz,
+            f'Tasks of {user.username}',
+        )
+        response = StreamingHttpResponse(
+            streaming_content(request, lines), content_type='text/calendar; charset=utf-8',
+        )
+        response['Content-Disposition'] = 'inline; filename="tasks.ics"'
+        return response
+
+
+class CalendarFeedResetView(LoginRequiredMixin, View):
+    """Create the subscription link, or replace it so old subscribers lose access"""
+
+    def post(self, request, *args, **kwargs):
+        feed, created = CalendarFeed.objects.get_or_create(user=request.user)
+        if created:
+            messages.success(request, '📅 Your calendar subscription link is ready.')
+        else:
+            feed.reset_token()
+            messages.success(request, '🔄 Calendar link reset. Old subscriptions will stop updating.')
+        return redirect('calender:month')
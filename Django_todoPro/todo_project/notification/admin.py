@@ -1,3 +1,6 @@
 from django.contrib import admin
+from .models import Notification, OutboxMessage, DeadLetter
 
-# Register your models here.
+admin.site.register(Notification)
+admin.site.register(OutboxMessage)
+admin.site.register(DeadLetter)
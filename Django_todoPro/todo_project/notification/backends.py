@@ -0,0 +1,66 @@
+import json
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.core.mail import send_mail
+
+
+class DeliveryError(Exception):
+    """A delivery failed but may succeed if retried"""
+
+
+class PermanentDeliveryError(DeliveryError):
+    """A delivery can never succeed; it goes straight to the dead-letter table"""
+
+
+# A backend is any class whose deliver(notification) sends one notification, raising
+# DeliveryError to retry it later or PermanentDeliveryError to dead-letter it
+
+
+class EmailBackend:
+    """Sends through Django's EMAIL_BACKEND (console or locmem in development)"""
+
+    def deliver(self, notification):
+        recipient = notification.user.email
+        if not recipient:
+            raise PermanentDeliveryError(f'User {notification.user.username} has no email address.')
+        send_mail(
+            subject='Task reminder',
+            message=notification.message,
+            from_email=None,
+            recipient_list=[recipient],
+        )
+
+
+class WebhookBackend:
+    """POSTs the notification as JSON to NOTIFICATION_WEBHOOK_URL"""
+
+    def __init__(self, url=None, timeout=None):
+        self.url = url or getattr(settings, 'NOTIFICATION_WEBHOOK_URL', None)
+        self.timeout = timeout or getattr(settings, 'NOTIFICATION_WEBHOOK_TIMEOUT', 5)
+
+    def deliver(self, notification):
+        if not self.url:
+            raise PermanentDeliveryError('NOTIFICATION_WEBHOOK_URL is not configured.')
+        body = json.dumps({
+            'id': notification.pk,
+            'user_id': notification.user_id,
+            'task_id': notification.task_id,
+            'kind': notification.kind,
+            'message': notification.message,
+            'due_at': notification.due_at.isoformat(),
+        }).encode()
+        request = urllib.request.Request(
+            self.url, data=body, method='POST', headers={'Content-Type': 'application/json'},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+        except urllib.error.HTTPError as error:
+            # Client errors will not go away on retry; server errors might
+            if 400 <= error.code < 500 and error.code != 429:
+                raise PermanentDeliveryError(f'Webhook rejected the notification: HTTP {error.code}')
+            raise DeliveryError(f'Webhook failed: HTTP {error.code}')
+        except (urllib.error.URLError, TimeoutError, OSError) as error:
+            raise DeliveryError(f'Webhook unreachable: {error}')
@@ -0,0 +1,43 @@
+import signal
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from notification.scheduler import ReminderScheduler
+
+
+class Command(BaseCommand):
+    help = 'Run the reminder scheduler, writing a Notification when each pending task falls due'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lookahead', type=int, default=3600,
+                            help='Seconds of upcoming due moments to keep loaded (default: 3600)')
+        parser.add_argument('--chunk-size', type=int, default=10000,
+                            help='Tasks read per index range query (default: 10000)')
+        parser.add_argument('--max-scheduled', type=int, default=500000,
+                            help='Upper bound on due moments held in memory (default: 500000)')
+        parser.add_argument('--feed-interval', type=float, default=5.0,
+                            help='Seconds between change feed checks (default: 5)')
+        parser.add_argument('--catch-up', type=int, default=0,
+                            help='Also remind about due moments up to this many seconds before start')
+        parser.add_argument('--once', action='store_true',
+                            help='Process what is due now and exit (for cron or testing)')
+
+    def handle(self, *args, **options):
+        scheduler = ReminderScheduler(
+            lookahead=timedelta(seconds=options['lookahead']),
+            chunk_size=options['chunk_size'],
+            max_scheduled=options['max_scheduled'],
+            feed_interval=options['feed_interval'],
+            catch_up=timedelta(seconds=options['catch_up']),
+        )
+
+        if options['once']:
+            scheduler.run_once()
+        else:
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, lambda *args: scheduler.stop())
+            self.stdout.write('Reminder scheduler running; press Ctrl+C to stop.')
+            scheduler.run()
+
+        self.stdout.write(self.style.SUCCESS(f'Wrote {scheduler.notified} notification(s).'))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('todo', '0010_task_updated_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('due', 'Task due')], default='due', max_length=20)),
+                ('message', models.CharField(max_length=255)),
+                ('due_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('read', models.BooleanField(default=False)),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='todo.task')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-due_at'],
+                'indexes': [models.Index(fields=['user', '-due_at'], name='notification_user_due_idx')],
+                'constraints': [models.UniqueConstraint(fields=('task', 'kind', 'due_at'), name='notification_once_per_due')],
+            },
+        ),
+    ]
@@ -1,3 +1,88 @@
 from django.db import models
+from django.utils import timezone
+from django.contrib.auth.models import User
+from todo.models import Task
 
-# Create your models here.
+
+class Notification(models.Model):
+    """A reminder produced when a task reaches its due moment"""
+    KIND_DUE = 'due'
+    KIND_CHOICES = [
+        (KIND_DUE, 'Task due'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='notifications')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default=KIND_DUE)
+    message = models.CharField(max_length=255)
+    due_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    read = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ['-due_at']
+        constraints = [
+            # A restarted scheduler must not remind twice for the same due moment
+            models.UniqueConstraint(fields=['task', 'kind', 'due_at'], name='notification_once_per_due'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-due_at'], name='notification_user_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.message} ({self.user.username})"
+
+
+class OutboxMessage(models.Model):
+    """One delivery of a Notification over one channel, claimed and retried by workers"""
+    STATUS_PENDING = 'pending'
+    STATUS_IN_FLIGHT = 'in_flight'
+    STATUS_DELIVERED = 'delivered'
+    STATUS_DEAD = 'dead'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_IN_FLIGHT, 'In flight'),
+        (STATUS_DELIVERED, 'Delivered'),
+        (STATUS_DEAD, 'Dead'),
+    ]
+
+    notification = models.ForeignKey(Notification, on_delete=models.CASCADE, related_name='outbox_messages')
+    channel = models.CharField(max_length=20)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claim_token = models.CharField(max_length=32, blank=True, default='')
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['notification', 'channel'], name='outbox_once_per_channel'),
+        ]
+        indexes = [
+            # Claiming: the oldest due pending messages first
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_claim_idx'),
+            # Throughput metrics
+            models.Index(fields=['status', 'delivered_at'], name='outbox_delivered_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.channel} delivery of notification #{self.notification_id} ({self.status})"
+
+
+class DeadLetter(models.Model):
+    """A delivery that ran out of retries or failed permanently"""
+    outbox_message = models.OneToOneField(OutboxMessage, on_delete=models.CASCADE, related_name='dead_letter')
+    notification = models.ForeignKey(Notification, on_delete=models.CASCADE, related_name='dead_letters')
+    channel = models.CharField(max_length=20)
+    attempts = models.PositiveIntegerField()
+    error = models.TextField(blank=True, default='')
+    failed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-failed_at']
+
+    def __str__(self):
+        return f"Dead {self.channel} delivery of notification #{self.notification_id}"
@@ -0,0 +1,231 @@
+import logging
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .backends import PermanentDeliveryError
+from .models import OutboxMessage, DeadLetter
+
+logger = logging.getLogger(__name__)
+
+
+def get_channels():
+    return getattr(settings, 'NOTIFICATION_CHANNELS', ['email'])
+
+
+def get_backends():
+    paths = settings.NOTIFICATION_BACKENDS
+    return {channel: import_string(paths[channel])() for channel in get_channels()}
+
+
+def enqueue(notification_ids, channels=None):
+    """Queue one delivery per notification and channel; already queued ones are left alone"""
+    channels = channels or get_channels()
+    OutboxMessage.objects.bulk_create(
+        [
+            OutboxMessage(notification_id=notification_id, channel=channel)
+            for notification_id in notification_ids
+            for channel in channels
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def retry_delay(attempts, base=None, cap=None):
+    """Exponential backoff with full jitter"""
+    base = base or getattr(settings, 'NOTIFICATION_RETRY_BASE', 30)
+    cap = cap or getattr(settings, 'NOTIFICATION_RETRY_MAX_DELAY', 6 * 60 * 60)
+    return timedelta(seconds=random.uniform(0, min(cap, base * 2 ** (attempts - 1))))
+
+
+def claim_batch(limit):
+    """
+    Mark up to ``limit`` due pending messages as in flight for this worker.
+
+    Databases with SKIP LOCKED let concurrent workers claim disjoint rows
+    without blocking each other. SQLite has no row locks, so there the claim
+    is a conditional UPDATE that only takes rows that are still pending;
+    the claim token tells this worker which rows it won.
+    """
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    due = (
+        OutboxMessage.objects
+        .filter(status=OutboxMessage.STATUS_PENDING, next_attempt_at__lte=now)
+        .order_by('next_attempt_at', 'id')
+    )
+
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        ids = list(due.values_list('id', flat=True)[:limit])
+        OutboxMessage.objects.filter(id__in=ids, status=OutboxMessage.STATUS_PENDING).update(
+            status=OutboxMessage.STATUS_IN_FLIGHT,
+            claim_token=token,
+            claimed_at=now,
+        )
+
+    return list(
+        OutboxMessage.objects
+        .filter(claim_token=token, status=OutboxMessage.STATUS_IN_FLIGHT)
+        .select_related('notification__user')
+    )
+
+
+def dead_letter(message):
+    """Give up on ``message``; its attempts and last_error must already be set"""
+    with transaction.atomic():
+        message.status = OutboxMessage.STATUS_DEAD
+        message.save(update_fields=['status', 'attempts', 'last_error'])
+        DeadLetter.objects.create(
+            outbox_message=message,
+            notification_id=message.notification_id,
+            channel=message.channel,
+            attempts=message.attempts,
+            error=message.last_error,
+        )
+    logger.warning('Dead-lettered %s: %s', message, message.last_error)
+
+
+def requeue_stale(visibility_timeout, max_attempts):
+    """
+    Release messages claimed by workers that died before reporting back.
+
+    A lost claim counts as an attempt, so a message that crashes every worker
+    that takes it is dead-lettered after ``max_attempts`` instead of looping.
+    Returns the numbers of requeued and dead-lettered messages.
+    """
+    stale = OutboxMessage.objects.filter(
+        status=OutboxMessage.STATUS_IN_FLIGHT,
+        claimed_at__lt=timezone.now() - visibility_timeout,
+    )
+    error = 'The worker did not report back in time'
+    with transaction.atomic():
+        exhausted = list(stale.filter(attempts__gte=max_attempts - 1))
+        for message in exhausted:
+            message.attempts += 1
+            message.last_error = error
+            dead_letter(message)
+        requeued = stale.update(
+            status=OutboxMessage.STATUS_PENDING, claim_token='', attempts=F('attempts') + 1, last_error=error,
+        )
+    return requeued, len(exhausted)
+
+
+def queue_stats(window=timedelta(minutes=5)):
+    """Queue depth, lag and recent throughput, computed from the outbox table"""
+    now = timezone.now()
+    due = OutboxMessage.objects.filter(
+        status=OutboxMessage.STATUS_PENDING, next_attempt_at__lte=now,
+    ).aggregate(count=Count('id'), oldest=Min('next_attempt_at'))
+    by_status = dict(
+        OutboxMessage.objects.order_by().values_list('status').annotate(count=Count('id'))
+    )
+    delivered_recently = OutboxMessage.objects.filter(
+        status=OutboxMessage.STATUS_DELIVERED, delivered_at__gte=now - window,
+    ).count()
+
+    return {
+        'pending': by_status.get(OutboxMessage.STATUS_PENDING, 0),
+        'due': due['count'],
+        'in_flight': by_status.get(OutboxMessage.STATUS_IN_FLIGHT, 0),
+        'delivered': by_status.get(OutboxMessage.STATUS_DELIVERED, 0),
+        'dead': by_status.get(OutboxMessage.STATUS_DEAD, 0),
+        'lag_seconds': round((now - due['oldest']).total_seconds(), 3) if due['oldest'] else 0.0,
+        'throughput_per_second': round(delivered_recently / window.total_seconds(), 3),
+    }
+
+
+class DeliveryWorker:
+    """
+    Claims batches from the outbox and delivers them on a thread pool.
+
+    Only the network calls run in the pool; claiming and recording results
+    stay on the worker's own thread and database connection.
+    """
+
+    def __init__(self, threads=8, batch_size=100, max_attempts=5, backends=None,
+                 visibility_timeout=timedelta(minutes=5)):
+        self.threads = threads
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backends = backends or get_backends()
+        self.visibility_timeout = visibility_timeout
+        self.pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='notification-delivery')
+        self.started = time.monotonic()
+        self.delivered = 0
+        self.retried = 0
+        self.dead = 0
+        self.stopped = False
+
+    def deliver(self, message):
+        backend = self.backends.get(message.channel)
+        if backend is None:
+            raise PermanentDeliveryError(f'No backend configured for channel "{message.channel}".')
+        backend.deliver(message.notification)
+
+    def process_batch(self):
+        _, dead = requeue_stale(self.visibility_timeout, self.max_attempts)
+        self.dead += dead
+        messages = claim_batch(self.batch_size)
+        if not messages:
+            return 0
+
+        futures = [(message, self.pool.submit(self.deliver, message)) for message in messages]
+        now = timezone.now()
+        delivered_ids = []
+        for message, future in futures:
+            error = future.exception()
+            if error is None:
+                delivered_ids.append(message.pk)
+            else:
+                self.record_failure(message, error, now)
+
+        OutboxMessage.objects.filter(pk__in=delivered_ids).update(
+            status=OutboxMessage.STATUS_DELIVERED,
+            attempts=F('attempts') + 1,
+            delivered_at=now,
+            last_error='',
+        )
+        self.delivered += len(delivered_ids)
+        return len(messages)
+
+    def record_failure(self, message, error, now):
+        message.attempts += 1
+        message.last_error = f'{type(error).__name__}: {error}'
+        permanent = isinstance(error, PermanentDeliveryError)
+
+        if permanent or message.attempts >= self.max_attempts:
+            dead_letter(message)
+            self.dead += 1
+        else:
+            message.status = OutboxMessage.STATUS_PENDING
+            message.next_attempt_at = now + retry_delay(message.attempts)
+            message.save(update_fields=['status', 'attempts', 'last_error', 'next_attempt_at'])
+            self.retried += 1
+
+    def stats(self):
+        elapsed = time.monotonic() - self.started
+        return {
+            'delivered': self.delivered,
+            'retried': self.retried,
+            'dead': self.dead,
+            'throughput_per_second': round(self.delivered / elapsed, 3) if elapsed else 0.0,
+        }
+
+    def run(self, poll_interval=1.0):
+        while not self.stopped:
+            if not self.process_batch():
+                time.sleep(poll_interval)
+        self.pool.shutdown(wait=True)
+
+    def stop(self):
+        self.stopped = True
@@ -0,0 +1,202 @@
+import heapq
+import logging
+import threading
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from todo.models import Task
+from .models import Notification
+from .outbox import enqueue
+
+logger = logging.getLogger(__name__)
+
+# due_at is the deadline in the owner's time zone, the moment a task expires
+TASK_FIELDS = ('id', 'user_id', 'title', 'due_at')
+
+
+class ReminderScheduler:
+    """
+    Fires a Notification when each pending task reaches its due moment.
+
+    Upcoming due moments live in a min-heap. Tasks are loaded incrementally
+    in (due_at, id) order through the partial pending-deadline index, only as
+    far ahead as ``lookahead``, and at most ``max_scheduled`` at a time, so
+    a million pending tasks never have to be in memory at once.
+
+    Edits arrive through a change feed over (updated_at, id): a changed task
+    inside the loaded window is rescheduled, and a completed one is dropped.
+    Deleted tasks are caught when their entry fires, because every batch of
+    due tasks is re-read (one query) before notifications are written.
+
+    Between iterations the loop sleeps until the next deadline, the next
+    feed check or the next window refill, whichever comes first.
+    """
+
+    def __init__(self, lookahead=timedelta(hours=1), chunk_size=10000, max_scheduled=500000,
+                 feed_interval=5.0, batch_size=500, catch_up=timedelta(0), clock=timezone.now):
+        self.lookahead = lookahead
+        self.chunk_size = chunk_size
+        self.max_scheduled = max_scheduled
+        self.feed_interval = feed_interval
+        self.batch_size = batch_size
+        self.clock = clock
+
+        started_at = clock()
+        # Due moments before this are never reminded about
+        self.start_from = started_at - catch_up
+        self.heap = []
+        # task id -> the due moment its live heap entry is for
+        self.scheduled = {}
+        # Everything with due_at < loaded_until has been loaded
+        self.loaded_until = self.start_from
+        self.load_cursor = (self.start_from, 0)
+        self.feed_cursor = (started_at, 0)
+        self.wakeup = threading.Event()
+        self.stopped = False
+        self.notified = 0
+
+    # Scheduling
+
+    def schedule(self, task_id, due_at):
+        if due_at < self.start_from:
+            self.scheduled.pop(task_id, None)
+            return
+        if self.scheduled.get(task_id) == due_at:
+            return
+        self.scheduled[task_id] = due_at
+        heapq.heappush(self.heap, (due_at, task_id))
+
+    def unschedule(self, task_id):
+        # The heap entry stays behind and is skipped when it surfaces
+        self.scheduled.pop(task_id, None)
+
+    def _after(self, field, cursor):
+        """(field, id) > cursor, with the leading column also usable as an index range"""
+        value, pk = cursor
+        return Q(**{f'{field}__gte': value}) & (Q(**{f'{field}__gt': value}) | Q(**{field: value, 'id__gt': pk}))
+
+    def is_loaded(self, task_id, due_at):
+        """Whether the loader has already passed (due_at, task_id), so only the feed can schedule it"""
+        return due_at < self.loaded_until or (due_at, task_id) <= self.load_cursor
+
+    def refill_at(self):
+        """The window is topped up once less than half of the lookahead is left loaded"""
+        return self.loaded_until - self.lookahead / 2
+
+    def load_window(self, now):
+        """Load pending tasks due before now + lookahead, one index range chunk at a time"""
+        if now < self.refill_at():
+            return
+        horizon = now + self.lookahead
+        while self.loaded_until < horizon and len(self.scheduled) < self.max_scheduled:
+            rows = list(
+                Task.objects.filter(self._after('due_at', self.load_cursor), done=False, due_at__lt=horizon)
+                .order_by('due_at', 'id')
+                .values_list(*TASK_FIELDS)[:self.chunk_size]
+            )
+            for task_id, user_id, title, due_at in rows:
+                self.schedule(task_id, due_at)
+
+            if len(rows) < self.chunk_size:
+                self.loaded_until = horizon
+                if rows:
+                    self.load_cursor = (rows[-1][3], rows[-1][0])
+                break
+            self.load_cursor = (rows[-1][3], rows[-1][0])
+            self.loaded_until = rows[-1][3]
+
+    def poll_changes(self):
+        """Apply task writes since the last poll to the loaded window"""
+        while True:
+            rows = list(
+                Task.objects.filter(self._after('updated_at', self.feed_cursor))
+                .order_by('updated_at', 'id')
+                .values_list(*TASK_FIELDS, 'done', 'updated_at')[:self.chunk_size]
+            )
+            for task_id, user_id, title, due_at, done, updated_at in rows:
+                if done or not self.is_loaded(task_id, due_at):
+                    # Completed, or not reached by the loader yet; it picks it up later
+                    self.unschedule(task_id)
+                else:
+                    self.schedule(task_id, due_at)
+            if rows:
+                self.feed_cursor = (rows[-1][-1], rows[-1][0])
+            if len(rows) < self.chunk_size:
+                return
+
+    # Firing
+
+    def pop_due(self, now):
+        due = {}
+        while self.heap and self.heap[0][0] <= now:
+            due_at, task_id = heapq.heappop(self.heap)
+            if self.scheduled.get(task_id) == due_at:
+                del self.scheduled[task_id]
+                due[task_id] = due_at
+        return due
+
+    def fire_due(self, now):
+        due = self.pop_due(now)
+        ids = list(due)
+        for start in range(0, len(ids), self.batch_size):
+            chunk = ids[start:start + self.batch_size]
+            notifications = []
+            current = Task.objects.filter(pk__in=chunk, done=False).values_list(*TASK_FIELDS)
+            for task_id, user_id, title, due_at in current:
+                # Skip tasks deleted or rescheduled since they were loaded
+                if due_at != due[task_id] or user_id is None:
+                    continue
+                notifications.append(Notification(
+                    user_id=user_id,
+                    task_id=task_id,
+                    kind=Notification.KIND_DUE,
+                    message=f'Task "{title}" is due.'[:255],
+                    due_at=due_at,
+                ))
+            Notification.objects.bulk_create(notifications, ignore_conflicts=True)
+            self.notified += len(notifications)
+            self.enqueue(notifications)
+        return len(due)
+
+    def enqueue(self, notifications):
+        """Hand the batch to the delivery outbox; ids are re-read since ignore_conflicts leaves them unset"""
+        if not notifications:
+            return
+        ids = Notification.objects.filter(
+            task_id__in=[notification.task_id for notification in notifications],
+            due_at__in={notification.due_at for notification in notifications},
+            kind=Notification.KIND_DUE,
+        ).values_list('id', flat=True)
+        enqueue(list(ids))
+
+    # Loop
+
+    def next_wakeup(self, now):
+        """Seconds to sleep before there can be anything to do"""
+        timeouts = [self.feed_interval]
+        if self.heap:
+            timeouts.append((self.heap[0][0] - now).total_seconds())
+        if len(self.scheduled) < self.max_scheduled:
+            timeouts.append((self.refill_at() - now).total_seconds())
+        return max(0.0, min(timeouts))
+
+    def run_once(self):
+        now = self.clock()
+        self.poll_changes()
+        self.load_window(now)
+        self.fire_due(now)
+        return self.next_wakeup(now)
+
+    def run(self):
+        logger.info('Reminder scheduler started')
+        while not self.stopped:
+            timeout = self.run_once()
+            self.wakeup.wait(timeout)
+            self.wakeup.clear()
+        logger.info('Reminder scheduler stopped after %d notification(s)', self.notified)
+
+    def stop(self):
+        self.stopped = True
+        self.wakeup.set()
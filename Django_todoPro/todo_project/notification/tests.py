@@ -1,3 +1,143 @@
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.models import User
 from django.test import TestCase
+from django.utils import timezone
+
+from todo.models import Task
+from .backends import DeliveryError, PermanentDeliveryError
+from .models import DeadLetter, Notification, OutboxMessage
+from .outbox import DeliveryWorker, claim_batch, enqueue, requeue_stale
+from .scheduler import ReminderScheduler
+
+
+class ReminderSchedulerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='secret-pass')
+        today = timezone.localdate()
+        self.morning = timezone.make_aware(datetime.combine(today, time(10, 0)))
+        self.now = self.morning
+        self.scheduler = ReminderScheduler(clock=lambda: self.now)
+
+    def test_task_due_later_today_fires_at_its_due_time(self):
+        # The shape TaskForm saves: the due date at local midnight, the time separately
+        midnight = timezone.make_aware(datetime.combine(self.morning.date(), time.min))
+        task = Task.objects.create(user=self.user, title='Evening call', due_date=midnight, due_time=time(18, 0))
+
+        self.scheduler.run_once()
+        self.assertFalse(Notification.objects.exists())
+
+        self.now = self.morning.replace(hour=18)
+        self.scheduler.run_once()
+        notification = Notification.objects.get()
+        self.assertEqual(notification.task, task)
+        self.assertEqual(notification.due_at, task.due_at)
+
+    def test_completed_task_is_not_reminded(self):
+        task = Task.objects.create(user=self.user, title='Report', due_date=self.morning + timedelta(minutes=30),
+                                   due_time=time(10, 30))
+        self.scheduler.run_once()
+        task.done = True
+        task.save()
+
+        self.now = self.morning + timedelta(hours=1)
+        self.scheduler.run_once()
+        self.assertFalse(Notification.objects.exists())
+
+    def test_edit_at_the_chunk_boundary_stays_scheduled(self):
+        tasks = [
+            Task.objects.create(user=self.user, title=f'Call {n}', due_date=self.morning + timedelta(minutes=30),
+                                due_time=time(10, 30))
+            for n in range(3)
+        ]
+        # Stops after one chunk: loaded_until is then the due moment of all three
+        self.scheduler.chunk_size = self.scheduler.max_scheduled = 2
+        self.scheduler.run_once()
+        self.assertEqual(self.scheduler.load_cursor, (tasks[1].due_at, tasks[1].pk))
+
+        # Already passed by the loader, so dropping it here would lose it for good
+        # An edit on the scheduler's clock, which the change feed follows
+        Task.objects.filter(pk=tasks[0].pk).update(title='Call first', updated_at=self.now + timedelta(seconds=1))
+        self.scheduler.max_scheduled = 500000
+        self.scheduler.run_once()
+
+        self.now = self.morning + timedelta(hours=1)
+        self.scheduler.run_once()
+        self.assertEqual(sorted(Notification.objects.values_list('task_id', flat=True)), [task.pk for task in tasks])
+
+
+class FakeBackend:
+    def __init__(self, error=None):
+        self.error = error
+        self.delivered = []
+
+    def deliver(self, notification):
+        if self.error:
+            raise self.error
+        self.delivered.append(notification.pk)
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('alice', email='alice@example.com', password='secret-pass')
+        task = Task.objects.create(user=user, title='Report', due_date=timezone.now())
+        self.notification = Notification.objects.create(
+            user=user, task=task, message='Report is due', due_at=task.due_at,
+        )
+        enqueue([self.notification.pk], channels=['email'])
+        self.message = OutboxMessage.objects.get()
+
+    def make_worker(self, backend, max_attempts=3):
+        worker = DeliveryWorker(threads=1, max_attempts=max_attempts, backends={'email': backend})
+        self.addCleanup(worker.pool.shutdown)
+        return worker
+
+    def test_claimed_messages_are_not_claimed_again(self):
+        self.assertEqual(claim_batch(10), [self.message])
+        self.assertEqual(claim_batch(10), [])
+        self.message.refresh_from_db()
+        self.assertEqual(self.message.status, OutboxMessage.STATUS_IN_FLIGHT)
+
+    def test_delivered_message_is_recorded(self):
+        backend = FakeBackend()
+        self.assertEqual(self.make_worker(backend).process_batch(), 1)
+        self.assertEqual(backend.delivered, [self.notification.pk])
+        self.message.refresh_from_db()
+        self.assertEqual((self.message.status, self.message.attempts), (OutboxMessage.STATUS_DELIVERED, 1))
+
+    def test_failed_delivery_is_retried_later(self):
+        self.make_worker(FakeBackend(DeliveryError('timeout'))).process_batch()
+        self.message.refresh_from_db()
+        self.assertEqual((self.message.status, self.message.attempts), (OutboxMessage.STATUS_PENDING, 1))
+        self.assertEqual(self.message.last_error, 'DeliveryError: timeout')
+        self.assertGreaterEqual(self.message.next_attempt_at, self.message.claimed_at)
+
+    def test_delivery_is_dead_lettered_after_max_attempts(self):
+        worker = self.make_worker(FakeBackend(DeliveryError('timeout')), max_attempts=2)
+        with self.assertLogs('notification.outbox', 'WARNING'):
+            for _ in range(2):
+                OutboxMessage.objects.update(next_attempt_at=timezone.now())
+                worker.process_batch()
+        self.message.refresh_from_db()
+        self.assertEqual((self.message.status, self.message.attempts), (OutboxMessage.STATUS_DEAD, 2))
+        self.assertEqual(DeadLetter.objects.get().attempts, 2)
+
+    def test_permanent_failure_is_dead_lettered_at_once(self):
+        with self.assertLogs('notification.outbox', 'WARNING'):
+            self.make_worker(FakeBackend(PermanentDeliveryError('no address'))).process_batch()
+        self.assertEqual(DeadLetter.objects.get().outbox_message, self.message)
+
+    def test_lost_claim_counts_as_an_attempt(self):
+        claim_batch(10)
+        OutboxMessage.objects.update(claimed_at=timezone.now() - timedelta(minutes=10))
+        self.assertEqual(requeue_stale(timedelta(minutes=5), max_attempts=2), (1, 0))
+        self.message.refresh_from_db()
+        self.assertEqual((self.message.status, self.message.attempts), (OutboxMessage.STATUS_PENDING, 1))
 
-# Create your tests here.
+        claim_batch(10)
+        OutboxMessage.objects.update(claimed_at=timezone.now() - timedelta(minutes=10))
+        with self.assertLogs('notification.outbox', 'WARNING'):
+            self.assertEqual(requeue_stale(timedelta(minutes=5), max_attempts=2), (0, 1))
+        self.message.refresh_from_db()
+        self.assertEqual((self.message.status, self.message.attempts), (OutboxMessage.STATUS_DEAD, 2))
+        self.assertTrue(DeadLetter.objects.filter(outbox_message=self.message).exists())
@@ -0,0 +1,8 @@
+from django.urls import path
+from .views import DeliveryQueueStatsView
+
+app_name = 'notification'
+
+urlpatterns = [
+    path('queue/stats/', DeliveryQueueStatsView.as_view(), name='queue_stats'),
+]
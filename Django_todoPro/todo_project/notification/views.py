@@ -1,3 +1,17 @@
-from django.shortcuts import render
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.http import JsonResponse
+from django.views import View
 
-# Create your views here.
+from .outbox import queue_stats
+
+
+class DeliveryQueueStatsView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """Outbox depth, lag and throughput for staff"""
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, *args, **kwargs):
+        response = JsonResponse(queue_stats())
+        response['Cache-Control'] = 'no-store'
+        return response
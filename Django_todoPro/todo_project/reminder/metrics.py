@@ -0,0 +1,297 @@
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.views import View
+
+from todo.models import ApiToken
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds; +Inf is implied
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# The metrics of the request being served; sync_to_async copies it into the ORM's thread
+_current_request = ContextVar('request_metrics', default=None)
+
+# Literals and IN lists, so the same statement with other values groups together
+SQL_PLACEHOLDERS_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+SQL_IN_LIST_RE = re.compile(r'\bIN \((?:\?|%s|\d+)(?:, ?(?:\?|%s|\d+))*\)', re.IGNORECASE)
+
+
+def normalize_sql(sql):
+    sql = SQL_IN_LIST_RE.sub('IN (...)', sql)
+    return SQL_PLACEHOLDERS_RE.sub('?', sql)
+
+
+class Histogram:
+    """A Prometheus histogram with one series per label tuple; safe to share between threads"""
+
+    def __init__(self, name, help, labels, buckets):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            counts = self.series.get(label_values)
+            if counts is None:
+                # One count per bucket, then +Inf, then the sum
+                counts = self.series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+    def collect(self):
+        with self.lock:
+            series = {labels: list(counts) for labels, counts in self.series.items()}
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} histogram'
+        for label_values, counts in sorted(series.items()):
+            labels = format_labels(self.labels, label_values)
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += count
+                yield f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+            yield f'{self.name}_sum{{{labels}}} {counts[-1]}'
+            yield f'{self.name}_count{{{labels}}} {cumulative}'
+
+
+class CounterMetric:
+    """A Prometheus counter with one series per label tuple"""
+
+    def __init__(self, name, help, labels):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.series = Counter()
+        self.lock = threading.Lock()
+
+    def inc(self, label_values, amount=1):
+        with self.lock:
+            self.series[label_values] += amount
+
+    def collect(self):
+        with self.lock:
+            series = dict(self.series)
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} counter'
+        for label_values, value in sorted(series.items()):
+            yield f'{self.name}{{{format_labels(self.labels, label_values)}}} {value}'
+
+
+def format_labels(names, values):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{name}="{escape(value)}"' for name, value in zip(names, values))
+
+
+REQUESTS = CounterMetric('reminder_requests_total', 'Requests served.', ('view', 'method', 'status'))
+SLOW_REQUESTS = CounterMetric(
+    'reminder_slow_requests_total', 'Requests over a METRICS_* threshold.', ('view', 'method'),
+)
+LATENCY = Histogram(
+    'reminder_request_duration_seconds', 'Time to produce the response.', ('view', 'method'), LATENCY_BUCKETS,
+)
+DB_QUERIES = Histogram(
+    'reminder_request_db_queries', 'Database queries per request.', ('view', 'method'), QUERY_BUCKETS,
+)
+DB_TIME = Histogram(
+    'reminder_request_db_duration_seconds', 'Time spent in database queries per request.',
+    ('view', 'method'), LATENCY_BUCKETS,
+)
+TEMPLATE_TIME = Histogram(
+    'reminder_request_template_duration_seconds', 'Time spent rendering the TemplateResponse per request.',
+    ('view', 'method'), LATENCY_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    'reminder_response_size_bytes', 'Response body size; streamed bodies only when they set Content-Length.',
+    ('view', 'method'), SIZE_BUCKETS,
+)
+METRICS = (REQUESTS, SLOW_REQUESTS, LATENCY, DB_QUERIES, DB_TIME, TEMPLATE_TIME, RESPONSE_SIZE)
+
+
+def render_metrics():
+    """Every metric in the Prometheus text exposition format"""
+    return '\n'.join(line for metric in METRICS for line in metric.collect()) + '\n'
+
+
+class RequestMetrics:
+    """What one request spent, filled in by record_query and the middleware"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.statements = Counter()
+
+    def repeated_statements(self, threshold):
+        """(count, normalized SQL) of statements run at least ``threshold`` times: likely N+1 loops"""
+        return [(count, sql) for sql, count in self.statements.most_common() if count >= threshold]
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = _current_request.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_time += time.perf_counter() - started
+        metrics.queries += 1
+        metrics.statements[normalize_sql(sql)] += 1
+
+
+def install_query_recorder(connection):
+    # The same wrapper as connection.execute_wrapper(), kept for the connection's
+    # lifetime: each thread (and the async ORM's thread) has its own connection
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@receiver(connection_created)
+def install_query_recorder_on_connect(sender, connection, **kwargs):
+    install_query_recorder(connection)
+
+
+class RequestMetricsMiddleware:
+    """
+    Record the latency, database queries and time, template render time and
+    response size of every request, by resolved view name, in the process's
+    histograms (served at /metrics/ by MetricsView).
+
+    Requests over a METRICS_* threshold are logged with their repeated
+    statements, which is how an N+1 query loop shows up. Put it first in
+    MIDDLEWARE so the latency covers the other middleware too.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        # Connections opened before this module was loaded
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection)
+        metrics = RequestMetrics()
+        token = _current_request.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_request.reset(token)
+        self.record(request, response, metrics)
+        return response
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current_request.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_request.reset(token)
+        self.record(request, response, metrics)
+        return response
+
+    def process_template_response(self, request, response):
+        # The handler renders the response after this hook; time that render
+        metrics = _current_request.get()
+        if metrics is not None:
+            render = response.render
+
+            def timed_render():
+                started = time.perf_counter()
+                try:
+                    return render()
+                finally:
+                    metrics.template_time += time.perf_counter() - started
+
+            response.render = timed_render
+        return response
+
+    def record(self, request, response, metrics):
+        latency = time.perf_counter() - metrics.started
+        match = request.resolver_match
+        view = match.view_name if match else '<unresolved>'
+        labels = (view, request.method)
+
+        REQUESTS.inc((*labels, response.status_code))
+        LATENCY.observe(labels, latency)
+        DB_QUERIES.observe(labels, metrics.queries)
+        DB_TIME.observe(labels, metrics.db_time)
+        TEMPLATE_TIME.observe(labels, metrics.template_time)
+        size = self.response_size(response)
+        if size is not None:
+            RESPONSE_SIZE.observe(labels, size)
+
+        repeated = metrics.repeated_statements(settings.METRICS_N_PLUS_ONE_THRESHOLD)
+        if (
+            latency * 1000 >= settings.METRICS_SLOW_REQUEST_MS
+            or metrics.db_time * 1000 >= settings.METRICS_SLOW_DB_MS
+            or metrics.queries >= settings.METRICS_MAX_QUERIES
+            or repeated
+        ):
+            SLOW_REQUESTS.inc(labels)
+            self.log_request(request, response, view, latency, metrics, size, repeated)
+
+    def response_size(self, response):
+        if not response.streaming:
+            return len(response.content)
+        if response.has_header('Content-Length'):
+            return int(response['Content-Length'])
+        return None
+
+    def log_request(self, request, response, view, latency, metrics, size, repeated):
+        message = (
+            f'{request.method} {request.path} ({view}) {response.status_code}: {latency * 1000:.0f} ms, '
+            f'{metrics.queries} queries in {metrics.db_time * 1000:.0f} ms, '
+            f'template {metrics.template_time * 1000:.0f} ms, '
+            f'{"streamed" if size is None else f"{size} bytes"}'
+        )
+        for count, sql in repeated:
+            message += f'\n    N+1? {count}x {sql}'
+        logger.warning('Slow request %s', message)
+
+
+class MetricsView(View):
+    """
+    The request metrics in Prometheus text format, for staff only.
+
+    A browser signed in as staff can open it; a scraper authenticates with
+    a staff user's API token (``Authorization: Bearer <key>``, see
+    create_api_token). Each process keeps its own histograms, so scrape
+    every worker.
+    """
+
+    def get(self, request):
+        user = request.user
+        scheme, _, key = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() == 'bearer' and key.strip():
+            user = ApiToken.authenticate(key.strip())
+        if user is None or not (user.is_active and user.is_staff):
+            return HttpResponse('Staff only.', status=403, content_type='text/plain')
+        return HttpResponse(render_metrics(), content_type=PROMETHEUS_CONTENT_TYPE)
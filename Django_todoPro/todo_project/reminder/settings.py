@@ -10,24 +10,34 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
-# Quick-start development settings - unsuitable for production
+# Environment: DJANGO_ENV=prod selects the production defaults below, anything else development.
+# Each default can still be overridden through its DJANGO_* variable.
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
+DJANGO_ENV = os.environ.get('DJANGO_ENV', 'dev')
+PRODUCTION = DJANGO_ENV == 'prod'
+
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-ipyxb9@vxs^6f1u(c0)-e1$cu0zw3+^e$_ea2uxemmmr8(&6cu'
+SECRET_KEY = os.environ.get(
+    'DJANGO_SECRET_KEY',
+    '' if PRODUCTION else 'django-insecure-ipyxb9@vxs^6f1u(c0)-e1$cu0zw3+^e$_ea2uxemmmr8(&6cu',
+)
+if not SECRET_KEY:
+    raise ImproperlyConfigured('Set DJANGO_SECRET_KEY when DJANGO_ENV=prod.')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
-
-ALLOWED_HOSTS = []
+DEBUG = os.environ.get('DJANGO_DEBUG', '0' if PRODUCTION else '1') == '1'
 
-STATIC_URL = '/static/'
+ALLOWED_HOSTS = [host for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if host]
 
 
 # Application definition
@@ -43,11 +53,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'reminder.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'todo.middleware.UserTimezoneMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -69,21 +81,179 @@ TEMPLATES = [
     },
 ]
 
-
-
 WSGI_APPLICATION = 'reminder.wsgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
+# DJANGO_DB_ENGINE=postgresql replaces the SQLite file with the PostgreSQL database named by DJANGO_DB_*
+DB_ENGINE = os.environ.get('DJANGO_DB_ENGINE', 'sqlite3')
+
+# Seconds a connection is kept for later requests; 0 opens one per request.
+# Off by default in development, where runserver starts a thread per request, and
+# under ASGI (reminder/asgi.py), where connections should come from the pool instead.
+DB_CONN_MAX_AGE = int(os.environ.get(
+    'DJANGO_DB_CONN_MAX_AGE',
+    60 if PRODUCTION and os.environ.get('DJANGO_ASYNC_VIEWS', '') != '1' else 0,
+))
+
+# DJANGO_DB_POOL=1 uses psycopg's connection pool (pip install "psycopg[pool]"); PostgreSQL only
+DB_POOL = os.environ.get('DJANGO_DB_POOL', '') == '1'
+
+# DJANGO_SQLITE_PROFILE picks the SQLite tuning below ("default" keeps SQLite's own settings).
+# "tuned" switches the file to WAL for good, so it is opt-in: db.sqlite3 is the committed dev database.
+SQLITE_PROFILE = os.environ.get('DJANGO_SQLITE_PROFILE', 'default')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DJANGO_DB_NAME', 'reminder'),
+            'USER': os.environ.get('DJANGO_DB_USER', ''),
+            'PASSWORD': os.environ.get('DJANGO_DB_PASSWORD', ''),
+            'HOST': os.environ.get('DJANGO_DB_HOST', ''),
+            'PORT': os.environ.get('DJANGO_DB_PORT', ''),
+            'OPTIONS': {},
+        }
+    }
+    if DB_POOL:
+        # Per process and per database alias
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DJANGO_DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ.get('DJANGO_DB_POOL_MAX_SIZE', 10)),
+            # Seconds a request waits for a free connection
+            'timeout': int(os.environ.get('DJANGO_DB_POOL_TIMEOUT', 10)),
+        }
+elif DB_ENGINE == 'sqlite3':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DJANGO_DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # Take the write lock when a transaction starts. A deferred transaction
+                # that reads first and then writes fails at once with "database is
+                # locked" when another writer got in between; busy_timeout cannot help it.
+                'transaction_mode': 'IMMEDIATE' if SQLITE_PROFILE == 'tuned' else None,
+            },
+        }
+    }
+else:
+    raise ImproperlyConfigured(f'DJANGO_DB_ENGINE must be "sqlite3" or "postgresql", not {DB_ENGINE!r}.')
+
+# The pool keeps connections open itself, and Django does not allow both
+DATABASES['default']['CONN_MAX_AGE'] = 0 if DB_POOL and DB_ENGINE == 'postgresql' else DB_CONN_MAX_AGE
+# Check a kept connection still works before a request reuses it
+DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+# DJANGO_DB_READ_REPLICA=1 sends reads to a read-only connection (see todo/database.py).
+# With SQLite that is the same file opened read-only; under WAL its readers never wait for the writer.
+# With PostgreSQL it is DJANGO_DB_REPLICA_HOST.
+if os.environ.get('DJANGO_DB_READ_REPLICA', '') == '1':
+    replica = dict(DATABASES['default'], OPTIONS=dict(DATABASES['default']['OPTIONS']), TEST={'MIRROR': 'default'})
+    if DB_ENGINE == 'postgresql':
+        replica['HOST'] = os.environ.get('DJANGO_DB_REPLICA_HOST', replica['HOST'])
+    else:
+        replica['NAME'] = f'file:{replica["NAME"]}?mode=ro'
+        replica['OPTIONS'].pop('transaction_mode')
+    DATABASES['replica'] = replica
+    DATABASE_ROUTERS = ['todo.database.ReadReplicaRouter']
+
+# Run on every new SQLite connection (see todo/database.py)
+SQLITE_PROFILES = {
+    'default': {},
+    'tuned': {
+        # Readers no longer block the writer, nor the writer readers
+        'journal_mode': 'WAL',
+        # Safe with WAL: a crash can lose the last commits, never corrupt the file
+        'synchronous': 'NORMAL',
+        # Milliseconds to wait for the write lock before "database is locked"
+        'busy_timeout': 5000,
+        # Negative means KiB: 20 MB of page cache per connection
+        'cache_size': -20000,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+    },
+}
+SQLITE_PRAGMAS = SQLITE_PROFILES[SQLITE_PROFILE]
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'reminder',
     }
 }
 
+# Rendered task cards on the task list (see todo/fragments.py)
+TASK_CARD_CACHE_ALIAS = 'default'
+TASK_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+# Users without tasks (UsersWithoutTasksView). True reads the per-user task counters, a snapshot
+# kept current as each user's first task is created and last one deleted; False asks the task table.
+USERS_WITHOUT_TASKS_FROM_COUNTERS = True
+
+
+# Task archive (see todo/archive.py): the archive_tasks command moves tasks done
+# at least this many days ago out of the task table
+
+TASK_ARCHIVE_AFTER_DAYS = 90
+
+
+# Request metrics (see reminder/metrics.py), served to staff at /metrics/.
+# A request over any of these limits is logged with its repeated queries.
+
+METRICS_SLOW_REQUEST_MS = 500
+METRICS_SLOW_DB_MS = 200
+METRICS_MAX_QUERIES = 30
+# The same statement run this many times in one request is reported as a likely N+1 loop
+METRICS_N_PLUS_ONE_THRESHOLD = 5
+
+
+# Email
+# https://docs.djangoproject.com/en/5.2/topics/email/
+
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+DEFAULT_FROM_EMAIL = 'reminders@localhost'
+
+
+# Notification delivery (see notification/outbox.py)
+
+NOTIFICATION_CHANNELS = ['email']
+NOTIFICATION_BACKENDS = {
+    'email': 'notification.backends.EmailBackend',
+    'webhook': 'notification.backends.WebhookBackend',
+}
+NOTIFICATION_WEBHOOK_URL = None
+NOTIFICATION_WEBHOOK_TIMEOUT = 5
+NOTIFICATION_RETRY_BASE = 30
+NOTIFICATION_RETRY_MAX_DELAY = 60 * 60 * 6
+
+
+# Async views (see todo/async_views.py and "Deploying with ASGI" in README.md)
+# reminder/asgi.py turns this on; under WSGI every async request would need its own event loop
+
+ASYNC_VIEWS = os.environ.get('DJANGO_ASYNC_VIEWS', '') == '1'
+LONG_POLL_TIMEOUT = 25
+LONG_POLL_INTERVAL = 1.0
+
+
+# Live task updates over Server-Sent Events (see todo/events.py); served under ASGI only
+
+TASK_EVENT_BROKER = 'todo.events.LocalBroker'
+TASK_EVENT_HISTORY_SIZE = 10000
+TASK_EVENT_QUEUE_SIZE = 1000
+# A user with more tasks than this in one bulk write gets one event without a task
+TASK_EVENT_BULK_LIMIT = 50
+TASK_EVENT_HEARTBEAT = 15
+# Seconds between checks for tasks whose deadline has passed
+TASK_EVENT_EXPIRY_INTERVAL = 60
+TASK_EVENT_RETRY = 3000
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -0,0 +1,58 @@
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from todo.models import ApiToken
+from .metrics import Histogram, normalize_sql
+
+
+class MetricsHelperTests(SimpleTestCase):
+    def test_statements_with_other_values_group_together(self):
+        self.assertEqual(
+            normalize_sql("SELECT * FROM todo_task WHERE id IN (1, 2, 3) AND title = 'it''s' LIMIT 21"),
+            'SELECT * FROM todo_task WHERE id IN (...) AND title = ? LIMIT ?',
+        )
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram('latency', 'Latency.', ('view',), (0.1, 1.0))
+        for value in (0.05, 0.5, 5.0):
+            histogram.observe(('home',), value)
+        self.assertEqual(list(histogram.collect())[2:], [
+            'latency_bucket{view="home",le="0.1"} 1',
+            'latency_bucket{view="home",le="1.0"} 2',
+            'latency_bucket{view="home",le="+Inf"} 3',
+            'latency_sum{view="home"} 5.55',
+            'latency_count{view="home"} 3',
+        ])
+
+
+class MetricsViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', password='secret-pass')
+        cls.staff = User.objects.create_user('ops', password='secret-pass', is_staff=True)
+
+    def test_staff_only(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+
+    def test_scrape_with_a_staff_token(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('todo:task_list'))
+        self.client.logout()
+
+        _, key = ApiToken.create_for(self.staff, name='prometheus')
+        response = self.client.get(reverse('metrics'), headers={'Authorization': f'Bearer {key}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertRegex(body, r'reminder_requests_total\{view="todo:task_list",method="GET",status="200"\} \d+')
+        self.assertRegex(body, r'reminder_request_db_queries_count\{view="todo:task_list",method="GET"\} \d+')
+
+    def test_repeated_statements_are_logged(self):
+        self.client.force_login(self.user)
+        with self.settings(METRICS_N_PLUS_ONE_THRESHOLD=1), self.assertLogs('reminder.metrics', 'WARNING') as logs:
+            self.client.get(reverse('todo:task_list'))
+        self.assertIn('(todo:task_list) 200', logs.output[0])
+        self.assertIn('N+1? 1x SELECT', logs.output[0])
@@ -17,7 +17,12 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from .metrics import MetricsView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
     path('', include('todo.urls')),  # Main app URLs
+    path('calendar/', include('calender.urls')),
+    path('notifications/', include('notification.urls')),
 ]
\ No newline at end of file
@@ -1,4 +1,8 @@
 from django.contrib import admin
-from .models import Task
+from .models import Task, TaskArchive, RecurrenceRule, OccurrenceException, ApiToken
 
-admin.site.register(Task)
\ No newline at end of file
+admin.site.register(Task)
+admin.site.register(TaskArchive)
+admin.site.register(RecurrenceRule)
+admin.site.register(OccurrenceException)
+admin.site.register(ApiToken)
\ No newline at end of file
@@ -0,0 +1,405 @@
+import asyncio
+import json
+import math
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+
+from .forms import TaskForm
+from .importer import TRUE_VALUES
+from .models import ApiToken, Task, TaskArchive, UserProfile
+from .pagination import InvalidCursor, KeysetPaginator
+
+# Fields a client may read (and select with ?fields=); only TaskForm's are writable
+API_FIELDS = ('id', 'title', 'due_date', 'due_time', 'due_at', 'done', 'repeats', 'updated_at')
+# The list's cursor key, always read even when not among the selected fields
+API_CURSOR_KEY = ('due_date', 'id')
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 200
+API_MAX_BATCH_SIZE = 500
+
+
+class ApiError(Exception):
+    def __init__(self, status, message, errors=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.errors = errors
+
+    def response(self):
+        data = {'error': self.message}
+        if self.errors:
+            data['errors'] = self.errors
+        response = api_response(data, status=self.status)
+        if self.status == 401:
+            response['WWW-Authenticate'] = 'Bearer'
+        return response
+
+
+def api_response(data, status=200):
+    return JsonResponse(data, status=status, safe=False, encoder=DjangoJSONEncoder)
+
+
+def serialize_task(task, fields):
+    return {name: getattr(task, name) for name in fields}
+
+
+class TaskPayloadValidator:
+    """
+    Validate API payloads with TaskForm's fields, as TaskImporter does for rows.
+
+    With ``partial`` only the fields present in the payload are cleaned, so
+    a PATCH can change one field without resending the others.
+    """
+
+    def __init__(self):
+        self.fields = TaskForm().fields
+
+    def validate(self, item, partial=False):
+        if not isinstance(item, dict):
+            return None, {'__all__': ['Expected a JSON object.']}
+
+        errors = {}
+        unknown = item.keys() - set(API_FIELDS)
+        if unknown:
+            errors['__all__'] = [f'Unknown field(s): {", ".join(sorted(unknown))}.']
+
+        data = dict(item)
+        if isinstance(data.get('done'), str):
+            data['done'] = data['done'].strip().lower() in TRUE_VALUES
+
+        cleaned_data = {}
+        for name, field in self.fields.items():
+            if partial and name not in data:
+                continue
+            value = field.widget.value_from_datadict(data, {}, name)
+            try:
+                cleaned_data[name] = field.clean(value)
+            except ValidationError as error:
+                errors[name] = error.messages
+        return cleaned_data, errors
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ApiView(View):
+    """
+    Base for the JSON API.
+
+    Requests authenticate with an ``Authorization: Bearer <key>`` header
+    (see ApiToken) and never touch request.user, the session or messages,
+    so those middlewares do no database or cookie work for API calls.
+    A bearer token is not sent automatically by browsers like a cookie, so
+    CSRF protection is not needed.
+    """
+    http_method_names = ['get', 'post', 'put', 'patch', 'delete', 'head', 'options']
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            self.user = self.authenticate(request)
+            return super().dispatch(request, *args, **kwargs)
+        except ApiError as error:
+            return error.response()
+
+    def get_token_key(self, request):
+        scheme, _, key = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() != 'bearer' or not key.strip():
+            raise ApiError(401, 'Authentication credentials were not provided.')
+        return key.strip()
+
+    def authenticate(self, request):
+        user = ApiToken.authenticate(self.get_token_key(request))
+        if user is None:
+            raise ApiError(401, 'Invalid API token.')
+        return user
+
+    def http_method_not_allowed(self, request, *args, **kwargs):
+        response = ApiError(405, f'Method {request.method} not allowed.').response()
+        response['Allow'] = ', '.join(self._allowed_methods())
+        return response
+
+    def read_json(self):
+        try:
+            return json.loads(self.request.body or b'null')
+        except (ValueError, UnicodeDecodeError):
+            raise ApiError(400, 'Request body is not valid JSON.')
+
+    def get_fields(self):
+        """The ?fields= sparse fieldset, in the order given"""
+        value = self.request.GET.get('fields')
+        if not value:
+            return API_FIELDS
+        fields = tuple(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+        unknown = set(fields) - set(API_FIELDS)
+        if unknown or not fields:
+            raise ApiError(400, f'Unknown field(s): {", ".join(sorted(unknown)) or value}.')
+        return fields
+
+    def get_tasks(self):
+        return Task.objects.filter(user=self.user)
+
+
+class TaskApiListView(ApiView):
+    """
+    GET: cursor-paged task list. POST: create one task, or a list of them.
+    PATCH: update a list of tasks, each identified by its ``id``.
+
+    The list is read with values() over just the selected fields plus the
+    (due_date, id) key, so no model instances are built. Batch writes are
+    all-or-nothing: every item is validated first, then the batch is
+    written with one bulk_create or bulk_update in a transaction.
+    """
+
+    def get_paginator(self, fields):
+        querysets = [self.get_tasks()]
+        # ?archived=1 reads the archived tasks too, in the same pages
+        if self.request.GET.get('archived', '').strip().lower() in TRUE_VALUES:
+            querysets.append(TaskArchive.objects.filter(user=self.user))
+
+        done = self.request.GET.get('done')
+        if done is not None:
+            querysets = [tasks.filter(done=done.strip().lower() in TRUE_VALUES) for tasks in querysets]
+        if self.request.GET.get('expired', '').strip().lower() in TRUE_VALUES:
+            querysets = [tasks.expired() for tasks in querysets]
+
+        try:
+            limit = min(max(int(self.request.GET.get('limit', API_PAGE_SIZE)), 1), API_MAX_PAGE_SIZE)
+        except ValueError:
+            raise ApiError(400, 'limit must be an integer.')
+
+        rows = [tasks.values(*dict.fromkeys(fields + API_CURSOR_KEY)) for tasks in querysets]
+        return KeysetPaginator(rows[0], limit, ordering=API_CURSOR_KEY, union=rows[1:])
+
+    def page_response(self, page, fields):
+        return api_response({
+            'results': [{name: row[name] for name in fields} for row in page],
+            'next_cursor': page.next_cursor,
+            'previous_cursor': page.previous_cursor,
+        })
+
+    def get(self, request):
+        fields = self.get_fields()
+        paginator = self.get_paginator(fields)
+        try:
+            page = paginator.get_page(request.GET.get('cursor'))
+        except InvalidCursor:
+            raise ApiError(400, 'Invalid page cursor.')
+        return self.page_response(page, fields)
+
+    def get_batch(self, data):
+        if len(data) > API_MAX_BATCH_SIZE:
+            raise ApiError(400, f'At most {API_MAX_BATCH_SIZE} tasks can be written per request.')
+        return data
+
+    def post(self, request):
+        # Reject a bad ?fields= before anything is written, so a retry cannot create the tasks twice
+        fields = self.get_fields()
+        data = self.read_json()
+        many = isinstance(data, list)
+        items = self.get_batch(data) if many else [data]
+
+        validator = TaskPayloadValidator()
+        tasks = []
+        errors = {}
+        for index, item in enumerate(items):
+            cleaned_data, item_errors = validator.validate(item)
+            if item_errors:
+                errors[index] = item_errors
+            else:
+                tasks.append(Task(user=self.user, **cleaned_data))
+        if errors:
+            raise ApiError(400, 'Validation failed.', errors if many else errors[0])
+
+        with transaction.atomic():
+            Task.objects.bulk_create(tasks)
+
+        created = [serialize_task(task, fields) for task in tasks]
+        return api_response(created if many else created[0], status=201)
+
+    def patch(self, request):
+        fields = self.get_fields()
+        data = self.read_json()
+        if not isinstance(data, list):
+            raise ApiError(400, 'Expected a JSON list of tasks, each with an "id".')
+        items = self.get_batch(data)
+
+        ids = [item.get('id') if isinstance(item, dict) else None for item in items]
+        tasks = self.get_tasks().in_bulk([pk for pk in ids if isinstance(pk, int)])
+
+        validator = TaskPayloadValidator()
+        changed_fields = set()
+        seen = set()
+        errors = {}
+        for index, (pk, item) in enumerate(zip(ids, items)):
+            task = tasks.get(pk)
+            if task is None or pk in seen:
+                errors[index] = {'id': ['Duplicate task id.' if pk in seen else 'Task not found.']}
+                continue
+            seen.add(pk)
+            cleaned_data, item_errors = validator.validate(item, partial=True)
+            if item_errors:
+                errors[index] = item_errors
+                continue
+            for name, value in cleaned_data.items():
+                setattr(task, name, value)
+            changed_fields.update(cleaned_data)
+        if errors:
+            raise ApiError(400, 'Validation failed.', errors)
+
+        updated = [tasks[pk] for pk in ids]
+        if changed_fields:
+            # bulk_update goes through TaskQuerySet.update, which keeps counters and updated_at right
+            with transaction.atomic():
+                Task.objects.bulk_update(updated, sorted(changed_fields), batch_size=API_MAX_BATCH_SIZE)
+
+        # Re-read the rows: due_at and updated_at are recomputed in the database, not on these instances
+        rows = self.get_tasks().filter(pk__in=ids).values(*dict.fromkeys(fields + ('id',)))
+        rows = {row['id']: row for row in rows}
+        return api_response([{name: rows[pk][name] for name in fields} for pk in ids])
+
+
+class TaskApiDetailView(ApiView):
+    """GET, PATCH/PUT or DELETE a single task"""
+
+    def get(self, request, pk):
+        fields = self.get_fields()
+        row = self.get_tasks().filter(pk=pk).values(*fields).first()
+        if row is None:
+            raise ApiError(404, 'Task not found.')
+        return api_response(row)
+
+    def update(self, pk, partial):
+        fields = self.get_fields()
+        try:
+            task = self.get_tasks().get(pk=pk)
+        except Task.DoesNotExist:
+            raise ApiError(404, 'Task not found.')
+
+        cleaned_data, errors = TaskPayloadValidator().validate(self.read_json(), partial=partial)
+        if errors:
+            raise ApiError(400, 'Validation failed.', errors)
+        for name, value in cleaned_data.items():
+            setattr(task, name, value)
+        task.save()
+        return api_response(serialize_task(task, fields))
+
+    def patch(self, request, pk):
+        return self.update(pk, partial=True)
+
+    def put(self, request, pk):
+        return self.update(pk, partial=False)
+
+    def delete(self, request, pk):
+        deleted, _ = self.get_tasks().filter(pk=pk).delete()
+        if not deleted:
+            raise ApiError(404, 'Task not found.')
+        return HttpResponse(status=204)
+
+
+class AsyncApiView(ApiView):
+    """
+    ApiView for async views; subclasses define every handler as a coroutine.
+
+    Reads use the async ORM. Writes keep their transactional sync code and
+    run it in a thread with sync_to_async.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            self.user = await self.aauthenticate(request)
+            # View.dispatch only picks the handler; ApiView.dispatch would authenticate again
+            return await View.dispatch(self, request, *args, **kwargs)
+        except ApiError as error:
+            return error.response()
+
+    async def aauthenticate(self, request):
+        user = await ApiToken.aauthenticate(self.get_token_key(request))
+        if user is None:
+            raise ApiError(401, 'Invalid API token.')
+        return user
+
+    async def http_method_not_allowed(self, request, *args, **kwargs):
+        return super().http_method_not_allowed(request, *args, **kwargs)
+
+
+class AsyncTaskApiListView(AsyncApiView, TaskApiListView):
+    """Async version of TaskApiListView"""
+
+    async def get(self, request):
+        fields = self.get_fields()
+        paginator = self.get_paginator(fields)
+        try:
+            page = await paginator.aget_page(request.GET.get('cursor'))
+        except InvalidCursor:
+            raise ApiError(400, 'Invalid page cursor.')
+        return self.page_response(page, fields)
+
+    async def post(self, request):
+        return await sync_to_async(super().post)(request)
+
+    async def patch(self, request):
+        return await sync_to_async(super().patch)(request)
+
+
+class AsyncTaskApiDetailView(AsyncApiView, TaskApiDetailView):
+    """Async version of TaskApiDetailView"""
+
+    async def get(self, request, pk):
+        fields = self.get_fields()
+        row = await self.get_tasks().filter(pk=pk).values(*fields).afirst()
+        if row is None:
+            raise ApiError(404, 'Task not found.')
+        return api_response(row)
+
+    async def patch(self, request, pk):
+        return await sync_to_async(self.update)(pk, partial=True)
+
+    async def put(self, request, pk):
+        return await sync_to_async(self.update)(pk, partial=False)
+
+    async def delete(self, request, pk):
+        return await sync_to_async(super().delete)(request, pk)
+
+
+class TaskApiChangesView(AsyncApiView):
+    """
+    Long poll for changes to the user's tasks.
+
+    GET ?since=<version> answers as soon as the tasks_version watermark on
+    UserProfile differs from ``since``, or with ``"changed": false`` after
+    ``timeout`` seconds (at most LONG_POLL_TIMEOUT). Without ``since`` it
+    answers at once with the current version to start from.
+
+    While it waits a request is a sleeping coroutine, not a blocked thread,
+    so this view is only offered async.
+    """
+
+    async def get(self, request):
+        try:
+            since = int(request.GET['since']) if 'since' in request.GET else None
+            timeout = float(request.GET.get('timeout', settings.LONG_POLL_TIMEOUT))
+        except ValueError:
+            raise ApiError(400, 'since and timeout must be numbers.')
+        # float() also accepts nan and inf; a nan deadline would never pass
+        if not math.isfinite(timeout) or timeout < 0:
+            raise ApiError(400, 'timeout must be a finite number of seconds, 0 or more.')
+        timeout = min(timeout, settings.LONG_POLL_TIMEOUT)
+
+        versions = UserProfile.objects.filter(user=self.user).values_list('tasks_version', flat=True)
+        deadline = time.monotonic() + timeout
+        while True:
+            version = await versions.afirst() or 0
+            if since is None or version != since:
+                return api_response({'version': version, 'changed': since is not None})
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return api_response({'version': version, 'changed': False})
+            await asyncio.sleep(min(settings.LONG_POLL_INTERVAL, remaining))
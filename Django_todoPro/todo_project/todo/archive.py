@@ -0,0 +1,83 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from .models import Task, TaskArchive, UserProfile
+
+ARCHIVE_BATCH_SIZE = 1000
+
+
+def archivable_tasks(older_than=None, now=None):
+    """
+    Completed one-off tasks untouched for ``older_than`` (TASK_ARCHIVE_AFTER_DAYS).
+
+    A done task's updated_at is when it was completed or last edited since,
+    so these have been done at least that long. Recurring series keep their
+    rule and exceptions, so they stay in the task table.
+    """
+    if older_than is None:
+        older_than = timedelta(days=settings.TASK_ARCHIVE_AFTER_DAYS)
+    cutoff = (now or timezone.now()) - older_than
+    return Task.objects.filter(done=True, repeats=False, updated_at__lt=cutoff)
+
+
+def copy_to_archive(task_ids, using):
+    """INSERT ... SELECT the ``task_ids`` rows into the archive table, without a round trip per row"""
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(Task._meta.get_field(name).column) for name in TaskArchive.COPIED_FIELDS)
+    placeholders = ', '.join(['%s'] * len(task_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {quote(TaskArchive._meta.db_table)} ({columns}) '
+            f'SELECT {columns} FROM {quote(Task._meta.db_table)} '
+            f'WHERE {quote(Task._meta.pk.column)} IN ({placeholders})',
+            list(task_ids),
+        )
+        return cursor.rowcount
+
+
+def archive_batch(tasks, batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Move up to ``batch_size`` of ``tasks`` (oldest first) to TaskArchive in one transaction.
+
+    The rows are copied with INSERT ... SELECT, then removed through
+    TaskQuerySet.delete(), which keeps the profile counters, cached cards,
+    search index and live events right and deletes the tasks' reminders.
+    Returns the number of tasks moved; 0 once there is nothing left.
+    """
+    using = router.db_for_write(Task)
+    with transaction.atomic(using=using):
+        candidates = tasks.using(using).order_by('updated_at', 'id')
+        if connections[using].features.has_select_for_update_skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+        rows = list(candidates.values_list('id', 'user_id')[:batch_size])
+        if not rows:
+            return 0
+
+        task_ids = [task_id for task_id, _ in rows]
+        copy_to_archive(task_ids, using)
+        Task.objects.using(using).filter(pk__in=task_ids).delete()
+
+        archived = {}
+        for _, user_id in rows:
+            if user_id is not None:
+                archived[user_id] = archived.get(user_id, 0) + 1
+        UserProfile.apply_task_counter_deltas(
+            {user_id: {'tasks_archived': count} for user_id, count in archived.items()}
+        )
+    return len(rows)
+
+
+def archive_tasks(older_than=None, batch_size=ARCHIVE_BATCH_SIZE, user_ids=None):
+    """Archive every archivable task, one short transaction per batch; yields each batch's count"""
+    tasks = archivable_tasks(older_than)
+    if user_ids:
+        tasks = tasks.filter(user_id__in=user_ids)
+    while True:
+        moved = archive_batch(tasks, batch_size)
+        if not moved:
+            return
+        yield moved
@@ -0,0 +1,234 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth.views import redirect_to_login
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.template.response import TemplateResponse
+from django.utils import timezone
+from django.views.generic import View
+
+from .conditional import AsyncTaskWatermarkMixin
+from .events import get_hub, sse_comment, sse_reset, sse_retry
+from .forms import TaskBulkActionForm
+from .fragments import render_task_cards
+from .models import ApiToken, Task, UserProfile
+from .pagination import InvalidCursor, KeysetPaginator
+from .views import upcoming_window
+
+
+class AsyncLoginRequiredMixin:
+    """
+    LoginRequiredMixin for async views.
+
+    The user is resolved with request.auser() and stored back on
+    request.user, so templates and later code never load it again.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        request.user = await request.auser()
+        if not request.user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class AsyncTemplateView(View):
+    """
+    Render ``template_name`` with the context from an async get_context_data().
+
+    The TemplateResponse is rendered by Django's async handler in a thread,
+    like a sync view's template.
+    """
+    template_name = None
+
+    async def get_context_data(self, **kwargs):
+        return {'view': self, **kwargs}
+
+    async def get(self, request, *args, **kwargs):
+        context = await self.get_context_data(**kwargs)
+        return TemplateResponse(request, self.template_name, context)
+
+
+class AsyncTaskPageView(AsyncLoginRequiredMixin, AsyncTaskWatermarkMixin, AsyncTemplateView):
+    """
+    Base for the async task pages.
+
+    Queries go through the async ORM, so a request waiting on the database
+    does not hold a worker thread of its own.
+    """
+    paginate_by = 50
+    cursor_kwarg = 'cursor'
+
+    async def aget_profile(self):
+        return await UserProfile.objects.filter(user=self.request.user).afirst()
+
+    def get_tasks(self):
+        return Task.objects.filter(user=self.request.user)
+
+    async def aget_page(self, queryset):
+        paginator = KeysetPaginator(queryset, self.paginate_by, ordering=('due_at', 'id'))
+        try:
+            page = await paginator.aget_page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor:
+            raise Http404('Invalid page cursor.')
+        return {
+            'paginator': paginator,
+            'page_obj': page,
+            'is_paginated': page.has_other_pages(),
+        }
+
+
+class AsyncTaskListView(AsyncTaskPageView):
+    """Async version of TaskListView"""
+    template_name = 'todo/index.html'
+
+    async def get_context_data(self, **kwargs):
+        context = await super().get_context_data(**kwargs)
+        context.update(await self.aget_page(self.get_tasks().select_related('recurrence').by_deadline()))
+        tasks = context['tasks'] = context['object_list'] = context['page_obj'].object_list
+
+        if self.profile is not None:
+            context['expired_count'] = self.profile.tasks_expired
+            context['total_tasks'] = self.profile.tasks_total
+
+        today = timezone.now()
+        context['today_date'] = today
+        Task.flag_expired(tasks, today)
+        await Task.aattach_occurrences(tasks, *upcoming_window())
+        # Cache lookups and card rendering are synchronous
+        await sync_to_async(render_task_cards)(tasks)
+        context['bulk_form'] = TaskBulkActionForm()
+
+        if not await self.request.session.aget('welcome_shown'):
+            messages.info(self.request, f'Welcome to your task manager, {self.request.user.username}! Here are all your tasks.')
+            await self.request.session.aset('welcome_shown', True)
+
+        return context
+
+
+class AsyncTaskDetailView(AsyncTaskPageView):
+    """Async version of TaskDetailView"""
+    template_name = 'todo/task_detail.html'
+
+    async def get_context_data(self, **kwargs):
+        context = await super().get_context_data(**kwargs)
+        try:
+            task = await self.get_tasks().select_related('recurrence', 'user').aget(pk=kwargs['pk'])
+        except Task.DoesNotExist:
+            raise Http404('No task found matching the query')
+
+        context['task'] = context['object'] = task
+        context['is_expired'] = task.is_past_due_and_incomplete()
+        await Task.aattach_occurrences([task], *upcoming_window())
+
+        if task.is_past_due_and_incomplete():
+            messages.warning(
+                self.request,
+                f'⚠️ This task "{task.title}" is past its due date ({task.due_date.strftime("%Y-%m-%d")})!'
+            )
+
+        if task.done:
+            messages.success(
+                self.request,
+                f'🎉 Great job! Task "{task.title}" is completed!'
+            )
+
+        return context
+
+
+class AsyncExpiredTasksListView(AsyncTaskPageView):
+    """Async version of ExpiredTasksListView"""
+    template_name = 'todo/expired_tasks.html'
+
+    async def get_context_data(self, **kwargs):
+        context = await super().get_context_data(**kwargs)
+        tasks = self.get_tasks().expired().by_deadline()
+        context.update(await self.aget_page(tasks))
+        context['expired_tasks'] = context['object_list'] = context['page_obj'].object_list
+
+        expired_count = self.profile.tasks_expired if self.profile is not None else 0
+        context['expired_count'] = expired_count
+        context['today_date'] = timezone.now()
+
+        if expired_count == 0:
+            messages.success(
+                self.request,
+                '✅ Excellent! You have no expired tasks. Keep up the good work!'
+            )
+        elif expired_count == 1:
+            messages.warning(
+                self.request,
+                f'⚠️ You have 1 expired task. Consider completing it soon!'
+            )
+        else:
+            messages.warning(
+                self.request,
+                f'⚠️ You have {expired_count} expired tasks. Consider prioritizing these!'
+            )
+
+        return context
+
+
+class TaskEventStreamView(View):
+    """
+    Server-Sent Events stream of the user's task changes (see todo/events.py).
+
+    A reconnecting EventSource sends Last-Event-ID, and the stream resumes
+    after it; when that is no longer possible a ``reset`` event tells the
+    client to refetch. The user comes from the session, which EventSource
+    sends, or from an API bearer token.
+
+    Only served under ASGI: an idle stream is a suspended coroutine waiting
+    on its queue, so one worker can hold thousands of them.
+    """
+
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            return HttpResponse('Live updates need the ASGI deployment.', status=501, content_type='text/plain')
+
+        user = await self.aget_user(request)
+        if user is None:
+            return HttpResponse('Authentication required.', status=401, content_type='text/plain')
+
+        hub = get_hub()
+        # Subscribe before replaying, so no event falls between the two
+        subscription = hub.subscribe(user.pk)
+        last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+        backlog = hub.replay(user.pk, last_event_id) if last_event_id else []
+
+        response = StreamingHttpResponse(self.stream(subscription, backlog), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Ask nginx not to buffer the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def aget_user(self, request):
+        scheme, _, key = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() == 'bearer' and key.strip():
+            return await ApiToken.aauthenticate(key.strip())
+        user = await request.auser()
+        return user if user.is_authenticated else None
+
+    async def stream(self, subscription, backlog):
+        try:
+            yield sse_retry(settings.TASK_EVENT_RETRY)
+            if backlog is None:
+                yield sse_reset()
+                backlog = []
+            replayed = set()
+            for event in backlog:
+                replayed.add(event.id)
+                yield event.to_sse()
+
+            while True:
+                event = await subscription.get(timeout=settings.TASK_EVENT_HEARTBEAT)
+                if subscription.overflowed:
+                    subscription.overflowed = False
+                    yield sse_reset()
+                if event is None:
+                    # Keeps proxies from closing an idle connection
+                    yield sse_comment('keep-alive')
+                elif event.id not in replayed:
+                    yield event.to_sse()
+        finally:
+            subscription.close()
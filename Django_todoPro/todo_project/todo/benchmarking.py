@@ -0,0 +1,72 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.utils import timezone
+
+from .models import Task
+
+
+def summarize(workload, profile, latencies, errors, elapsed):
+    """Request count, throughput and p50/p95/p99 latency in milliseconds of one workload"""
+    latencies = sorted(latencies)
+
+    def percentile(fraction):
+        if not latencies:
+            return None
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * fraction))] * 1000, 1)
+
+    return {
+        'workload': workload,
+        'profile': profile,
+        'requests': len(latencies),
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': round(statistics.median(latencies) * 1000, 1) if latencies else None,
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+    }
+
+
+def run_profile_in_child(command, profile, environ, arguments):
+    """
+    The results of ``command --profile <profile> --json *arguments`` run in a
+    fresh process with ``environ`` added, so its settings and URLconf are
+    built for that profile.
+    """
+    env = dict(os.environ, **environ)
+    env['DJANGO_SETTINGS_MODULE'] = settings.SETTINGS_MODULE
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(settings.BASE_DIR), env.get('PYTHONPATH')]))
+    process = subprocess.run(
+        [sys.executable, '-m', 'django', command, '--profile', profile, '--json', *map(str, arguments)],
+        env=env, capture_output=True, text=True,
+    )
+    if process.returncode:
+        raise CommandError(f'The {profile} run failed:\n{process.stderr}')
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def create_tasks(users, count):
+    """``count`` tasks spread round-robin over ``users``, due an hour apart from now"""
+    now = timezone.now()
+    Task.objects.bulk_create(
+        [
+            Task(user=users[number % len(users)], title=f'Task {number}', due_date=now + timedelta(hours=number))
+            for number in range(count)
+        ],
+        batch_size=1000,
+    )
+
+
+def table_lines(results, columns, width=10, widths=None):
+    """Right-aligned header and result lines; ``widths`` overrides ``width`` per column"""
+    widths = {column: width for column in columns} | (widths or {})
+    yield ' '.join(f'{column:>{widths[column]}}' for column in columns)
+    for result in results:
+        yield ' '.join(f'{str(result[column]):>{widths[column]}}' for column in columns)
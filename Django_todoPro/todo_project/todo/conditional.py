@@ -0,0 +1,110 @@
+import datetime
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.middleware.csrf import get_token
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+
+def csrf_fingerprint(request):
+    """A digest of the CSRF secret that the page's form tokens are masked from"""
+    get_token(request)
+    return hashlib.sha256(request.META['CSRF_COOKIE'].encode()).hexdigest()[:16]
+
+
+def task_watermark(user, profile, fingerprint=None):
+    """
+    (etag, last_modified timestamp) for ``user``'s tasks as of today, in the
+    current time zone; a ``fingerprint`` of the page's other inputs is added
+    to the etag.
+    """
+    today = timezone.localdate()
+    version = f'{user.pk}-{profile.tasks_version}-{today.isoformat()}'
+    etag = f'"tasks-{version}-{fingerprint}"' if fingerprint else f'"tasks-{version}"'
+
+    start_of_today = timezone.make_aware(datetime.datetime.combine(today, datetime.time.min))
+    last_modified = max(profile.tasks_modified_at or profile.join_date, start_of_today)
+    return etag, int(last_modified.timestamp())
+
+
+def set_task_validators(response, etag, last_modified):
+    response.headers.setdefault('ETag', etag)
+    response.headers.setdefault('Last-Modified', http_date(last_modified))
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+class TaskWatermarkMixin:
+    """
+    Answer GETs with 304 Not Modified while the user's tasks are unchanged.
+
+    The ETag and Last-Modified come from the per-user watermark on
+    UserProfile (tasks_version / tasks_modified_at), so a revalidation costs
+    one profile lookup: no task query and no template rendering. Tasks
+    expire without any write, so once the profile's next deadline has passed
+    the expired count is refreshed first, which moves the watermark. Today's
+    date stays part of the validator for the date-relative page labels.
+
+    Pages embed forms, so the CSRF secret is part of the ETag as well: after
+    a new login rotates it, a 304 would keep a cached page whose tokens are
+    rejected. Views without forms set ``etag_includes_csrf = False``.
+    """
+
+    etag_includes_csrf = True
+
+    def get_watermark_user(self):
+        return self.request.user
+
+    def get_task_watermark(self):
+        user = self.get_watermark_user()
+        if not hasattr(user, 'profile'):
+            return None, None
+        if user.profile.expiry_passed():
+            user.profile.refresh_expired()
+        fingerprint = csrf_fingerprint(self.request) if self.etag_includes_csrf else None
+        return task_watermark(user, user.profile, fingerprint)
+
+    def get(self, request, *args, **kwargs):
+        return self.get_conditional(request, super().get, *args, **kwargs)
+
+    def get_conditional(self, request, render, *args, **kwargs):
+        """``render(request, *args, **kwargs)``, or a 304 while the user's tasks are unchanged"""
+        etag, last_modified = self.get_task_watermark()
+
+        # Queued flash messages must reach the user, so never skip the render then
+        if etag is None or len(messages.get_messages(request)):
+            return render(request, *args, **kwargs)
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = render(request, *args, **kwargs)
+        return set_task_validators(response, etag, last_modified)
+
+
+class AsyncTaskWatermarkMixin:
+    """
+    TaskWatermarkMixin for async views.
+
+    The view provides ``aget_profile()``; the profile is kept as
+    ``self.profile`` so the page can reuse its counters.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        self.profile = await self.aget_profile()
+        if self.profile is None:
+            return await super().get(request, *args, **kwargs)
+        if self.profile.expiry_passed():
+            await sync_to_async(self.profile.refresh_expired)()
+
+        # The session was loaded by request.auser(), so reading queued messages does no query
+        if len(messages.get_messages(request)):
+            return await super().get(request, *args, **kwargs)
+
+        etag, last_modified = task_watermark(request.user, self.profile, csrf_fingerprint(request))
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = await super().get(request, *args, **kwargs)
+        return set_task_validators(response, etag, last_modified)
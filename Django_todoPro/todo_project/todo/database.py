@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_DB_ALIAS = 'replica'
+
+# PRAGMAs that change the database file rather than the connection; a
+# read-only connection cannot run them and inherits them from the file
+FILE_PRAGMAS = {'journal_mode'}
+
+
+def is_read_only(connection):
+    return 'mode=ro' in str(connection.settings_dict['NAME'])
+
+
+def apply_sqlite_pragmas(connection):
+    """
+    Run the SQLITE_PRAGMAS profile on a new SQLite connection.
+
+    Called from the connection_created receiver in todo/models.py, so every
+    connection (request threads, the async ORM's thread, management
+    commands) gets the same settings before its first query.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    read_only = is_read_only(connection)
+    for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+        if read_only and name in FILE_PRAGMAS:
+            continue
+        connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+def sqlite_pragma_values(connection, names):
+    """The current value of each PRAGMA in ``names`` on ``connection``"""
+    connection.ensure_connection()
+    return {name: connection.connection.execute(f'PRAGMA {name}').fetchone()[0] for name in names}
+
+
+class ReadReplicaRouter:
+    """
+    Send reads to the ``replica`` database and writes to ``default``.
+
+    Reads made inside a transaction on ``default`` stay there, so they see
+    that transaction's own writes (counter recounts, the outbox claim,
+    anything read back before commit). Migrations only run on ``default``;
+    the replica is the same data, so relations across the two are allowed.
+    """
+
+    def db_for_read(self, model, **hints):
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return REPLICA_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,255 @@
+import asyncio
+import itertools
+import json
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+EVENT_CREATED = 'created'
+EVENT_UPDATED = 'updated'
+EVENT_DELETED = 'deleted'
+EVENT_EXPIRED = 'expired'
+# Sent instead of events the stream could not deliver; the client should refetch
+EVENT_RESET = 'reset'
+
+EVENT_TASK_FIELDS = ('id', 'title', 'due_date', 'due_time', 'due_at', 'done', 'repeats', 'updated_at')
+
+
+class TaskEvent:
+    """One change to one of a user's tasks, or to many of them when ``task`` is None"""
+    __slots__ = ('id', 'user_id', 'type', 'task_id', 'task')
+
+    def __init__(self, id, user_id, type, task_id=None, task=None):
+        self.id = id
+        self.user_id = user_id
+        self.type = type
+        self.task_id = task_id
+        self.task = task
+
+    def to_sse(self):
+        data = json.dumps({'id': self.task_id, 'task': self.task}, cls=DjangoJSONEncoder, separators=(',', ':'))
+        return f'id: {self.id}\nevent: {self.type}\ndata: {data}\n\n'
+
+
+class LocalBroker:
+    """
+    Fans events out to subscribers in this process; the default broker.
+
+    Event ids are ``<epoch>-<sequence>``, where the epoch identifies this
+    broker instance, so an id from before a restart is never mistaken for
+    a recent one. The last ``history_size`` events are kept for replay.
+
+    A broker shared between processes (Redis pub/sub, PostgreSQL
+    LISTEN/NOTIFY) can replace it through TASK_EVENT_BROKER by providing
+    the same publish / subscribe / replay methods.
+    """
+
+    def __init__(self, history_size=10000):
+        self.epoch = format(time.time_ns(), 'x')
+        self.sequence = itertools.count(1)
+        self.history = deque(maxlen=history_size)
+        # user id -> set of callbacks
+        self.subscribers = {}
+        self.lock = threading.Lock()
+
+    def publish(self, user_id, type, task_id=None, task=None):
+        with self.lock:
+            event = TaskEvent(f'{self.epoch}-{next(self.sequence)}', user_id, type, task_id, task)
+            self.history.append(event)
+            callbacks = list(self.subscribers.get(user_id, ()))
+        for callback in callbacks:
+            callback(event)
+        return event
+
+    def subscribe(self, user_id, callback):
+        """Call ``callback(event)`` for each event of ``user_id``; returns the unsubscribe function"""
+        with self.lock:
+            self.subscribers.setdefault(user_id, set()).add(callback)
+
+        def unsubscribe():
+            with self.lock:
+                callbacks = self.subscribers.get(user_id)
+                if callbacks is not None:
+                    callbacks.discard(callback)
+                    if not callbacks:
+                        del self.subscribers[user_id]
+
+        return unsubscribe
+
+    def subscribed_users(self):
+        with self.lock:
+            return list(self.subscribers)
+
+    def parse_id(self, event_id):
+        epoch, _, sequence = (event_id or '').partition('-')
+        if epoch != self.epoch or not sequence.isdigit():
+            return None
+        return int(sequence)
+
+    def replay(self, user_id, last_event_id):
+        """
+        The user's events after ``last_event_id``, or None when some of them
+        may be gone (unknown id, another broker instance, trimmed history).
+        """
+        after = self.parse_id(last_event_id)
+        with self.lock:
+            if after is None or (self.history and self.parse_id(self.history[0].id) > after + 1):
+                return None
+            return [
+                event for event in self.history
+                if event.user_id == user_id and self.parse_id(event.id) > after
+            ]
+
+
+class Subscription:
+    """
+    The queue of one user's events for one open stream.
+
+    The broker may publish from any thread, so events are handed to the
+    subscriber's event loop with call_soon_threadsafe. An idle subscription
+    is just this object and an empty queue; no thread and no polling.
+    """
+
+    def __init__(self, broker, user_id, queue_size):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.overflowed = False
+        self.unsubscribe = broker.subscribe(user_id, self.deliver)
+
+    def deliver(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self.put, event)
+        except RuntimeError:
+            # The stream's event loop is gone; it unsubscribes when it closes
+            pass
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # A client that stops reading must not make us buffer without limit
+            self.overflowed = True
+
+    async def get(self, timeout):
+        """The next event, or None after ``timeout`` seconds without one"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.unsubscribe()
+
+
+class TaskEventHub:
+    """
+    Publishes task changes and opens subscriptions through the configured broker.
+
+    Changes are published when the surrounding transaction commits, so a
+    client never hears about a change it cannot read yet, or one that was
+    rolled back. While anyone is subscribed, a watcher on the event loop
+    announces the tasks whose deadline (Task.due_at) has passed, which
+    happens without any write.
+    """
+
+    def __init__(self, broker):
+        self.broker = broker
+        self.expiry_watcher = None
+
+    def publish(self, user_id, type, task_id=None, task=None):
+        if user_id is None:
+            return
+        transaction.on_commit(lambda: self.broker.publish(user_id, type, task_id, task))
+
+    def publish_tasks(self, type, tasks):
+        deleted = type == EVENT_DELETED
+        self.publish_many(type, [(task.user_id, task.pk, None if deleted else serialize_task(task)) for task in tasks])
+
+    def publish_many(self, type, items):
+        """
+        Publish (user_id, task_id, task) items: one event each, or one event
+        without a task for a user with more than TASK_EVENT_BULK_LIMIT of
+        them, so bulk writes cannot flood the history.
+        """
+        by_user = {}
+        for user_id, task_id, task in items:
+            by_user.setdefault(user_id, []).append((task_id, task))
+        for user_id, user_items in by_user.items():
+            if len(user_items) > settings.TASK_EVENT_BULK_LIMIT:
+                self.publish(user_id, type)
+                continue
+            for task_id, task in user_items:
+                self.publish(user_id, type, task_id, task)
+
+    def subscribe(self, user_id):
+        self.start_expiry_watcher()
+        return Subscription(self.broker, user_id, settings.TASK_EVENT_QUEUE_SIZE)
+
+    def replay(self, user_id, last_event_id):
+        return self.broker.replay(user_id, last_event_id)
+
+    # Expiry
+
+    def start_expiry_watcher(self):
+        loop = asyncio.get_running_loop()
+        watcher = self.expiry_watcher
+        if watcher is None or watcher.done() or watcher.get_loop() is not loop:
+            self.expiry_watcher = loop.create_task(self.watch_expiry())
+
+    async def watch_expiry(self):
+        since = timezone.now()
+        while True:
+            await asyncio.sleep(settings.TASK_EVENT_EXPIRY_INTERVAL)
+            user_ids = self.broker.subscribed_users()
+            if not user_ids:
+                return
+            now = timezone.now()
+            await self.publish_expired(user_ids, since, now)
+            since = now
+
+    async def publish_expired(self, user_ids, since, now):
+        """Announce the open tasks whose deadline passed in (since, now]"""
+        from .models import Task
+
+        tasks = Task.objects.filter(
+            user_id__in=user_ids, done=False, repeats=False, due_at__gt=since, due_at__lte=now,
+        )
+        async for task in tasks.aiterator():
+            self.broker.publish(task.user_id, EVENT_EXPIRED, task.pk, serialize_task(task))
+
+
+def serialize_task(task):
+    return {name: getattr(task, name) for name in EVENT_TASK_FIELDS}
+
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_hub():
+    """The process-wide hub, with the broker named by TASK_EVENT_BROKER"""
+    global _hub
+    if _hub is None:
+        with _hub_lock:
+            if _hub is None:
+                broker_class = import_string(settings.TASK_EVENT_BROKER)
+                _hub = TaskEventHub(broker_class(history_size=settings.TASK_EVENT_HISTORY_SIZE))
+    return _hub
+
+
+def sse_reset():
+    return f'event: {EVENT_RESET}\ndata: {{}}\n\n'
+
+
+def sse_comment(text=''):
+    return f': {text}\n\n'
+
+
+def sse_retry(milliseconds):
+    return f'retry: {milliseconds}\n\n'
@@ -0,0 +1,38 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+EXPORT_FIELDS = ['id', 'title', 'due_date', 'due_time', 'done', 'updated_at']
+EXPORT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    """A file-like object whose write() hands the line back to csv.writer's caller"""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(tasks, archived=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Stream tuples straight from the cursor without building model instances.
+    With ``archived`` (TaskArchive rows), both are read as one UNION ALL.
+    """
+    rows = tasks.order_by().values_list(*EXPORT_FIELDS)
+    if archived is not None:
+        rows = rows.union(archived.order_by().values_list(*EXPORT_FIELDS), all=True)
+    return rows.order_by('due_date', 'id').iterator(chunk_size=chunk_size)
+
+
+def stream_csv(tasks, archived=None):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in export_rows(tasks, archived):
+        yield writer.writerow(row)
+
+
+def stream_ndjson(tasks, archived=None):
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    for row in export_rows(tasks, archived):
+        yield encoder.encode(dict(zip(EXPORT_FIELDS, row))) + '\n'
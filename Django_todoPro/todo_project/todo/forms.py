@@ -1,9 +1,14 @@
+from datetime import datetime, time, timedelta
+
 from django import forms
+from django.conf import settings
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth.models import User
-from .models import UserProfile, Task
 from django.utils import timezone
 
+from .models import UserProfile, Task, RecurrenceRule, OccurrenceException, timezone_names
+from .recurrence import WEEKDAYS, MAX_COUNT
+
 
 class UserRegistrationForm(UserCreationForm):
     """Form for user registration - Question 3"""
@@ -91,9 +96,14 @@ class UserProfileForm(forms.ModelForm):
         'class': 'form-control'
     }))
 
+    # Blank keeps the server's TIME_ZONE
+    time_zone = forms.ChoiceField(required=False, widget=forms.Select(attrs={
+        'class': 'form-control'
+    }))
+
     class Meta:
         model = UserProfile
-        fields = ['phone', 'address', 'bio', 'birth_date']
+        fields = ['phone', 'address', 'bio', 'birth_date', 'time_zone']
         widgets = {
             'phone': forms.TextInput(attrs={'class': 'form-control'}),
             'address': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
@@ -105,6 +115,10 @@ class UserProfileForm(forms.ModelForm):
         self.user = kwargs.pop('user', None)
         super().__init__(*args, **kwargs)
 
+        self.fields['time_zone'].choices = [('', f'Server default ({settings.TIME_ZONE})')] + [
+            (name, name) for name in timezone_names()
+        ]
+
         if self.user:
             self.fields['email'].initial = self.user.email
             self.fields['first_name'].initial = self.user.first_name
@@ -149,4 +163,200 @@ class TaskForm(forms.ModelForm):
             'done': forms.CheckboxInput(attrs={
                 'class': 'form-check-input'
             }),
-        }
\ No newline at end of file
+        }
+
+
+class RecurrenceForm(forms.ModelForm):
+    """Optional repetition for a task, shown under TaskForm with the 'recurrence' prefix"""
+    freq = forms.ChoiceField(
+        choices=[('', 'Does not repeat')] + RecurrenceRule.FREQ_CHOICES,
+        required=False,
+        label='Repeat',
+        widget=forms.Select(attrs={'class': 'form-control'}),
+    )
+    byweekday = forms.MultipleChoiceField(
+        choices=list(zip(WEEKDAYS, ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'))),
+        required=False,
+        label='On',
+        widget=forms.CheckboxSelectMultiple,
+    )
+
+    class Meta:
+        model = RecurrenceRule
+        fields = ['freq', 'interval', 'byweekday', 'until', 'count']
+        widgets = {
+            'interval': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'min': 1
+            }),
+            'until': forms.DateInput(attrs={
+                'type': 'date',
+                'class': 'form-control'
+            }),
+            'count': forms.NumberInput(attrs={
+                'class': 'form-control',
+                'min': 1,
+                'max': MAX_COUNT,
+                'placeholder': 'Forever'
+            }),
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['interval'].required = False
+        if self.instance.byweekday:
+            self.initial['byweekday'] = self.instance.byweekday.split(',')
+
+    def clean_byweekday(self):
+        return ','.join(day for day in WEEKDAYS if day in self.cleaned_data['byweekday'])
+
+    def clean_interval(self):
+        return self.cleaned_data['interval'] or 1
+
+    def _post_clean(self):
+        # Nothing to validate on the model when the task does not repeat
+        if self.cleaned_data.get('freq'):
+            super()._post_clean()
+
+    def save_for(self, task):
+        """Create, update or remove the task's rule to match the form"""
+        if not self.cleaned_data.get('freq'):
+            RecurrenceRule.objects.filter(task=task).delete()
+            return None
+        rule = super().save(commit=False)
+        rule.task = task
+        rule.save()
+        return rule
+
+
+class OccurrenceStatusForm(forms.Form):
+    """Complete, skip or reopen one occurrence of a recurring task"""
+    STATUS_PENDING = 'pending'
+    STATUS_CHOICES = OccurrenceException.STATUS_CHOICES + [(STATUS_PENDING, 'Not done')]
+
+    status = forms.ChoiceField(choices=STATUS_CHOICES, initial=OccurrenceException.STATUS_DONE)
+
+
+class TaskIdsField(forms.Field):
+    """A list of task ids posted from the task list checkboxes"""
+    widget = forms.MultipleHiddenInput
+
+    def to_python(self, value):
+        if not value:
+            return []
+        if not isinstance(value, (list, tuple)):
+            value = [value]
+        try:
+            return [int(task_id) for task_id in value]
+        except (TypeError, ValueError):
+            raise forms.ValidationError('Invalid task selection.')
+
+
+class TaskBulkActionForm(forms.Form):
+    """Form for applying one action to many tasks at once"""
+    ACTION_COMPLETE = 'complete'
+    ACTION_UNCOMPLETE = 'uncomplete'
+    ACTION_DELETE = 'delete'
+    ACTION_SHIFT = 'shift'
+    ACTION_CHOICES = [
+        (ACTION_COMPLETE, 'Mark as completed'),
+        (ACTION_UNCOMPLETE, 'Mark as not completed'),
+        (ACTION_DELETE, 'Delete'),
+        (ACTION_SHIFT, 'Shift due date'),
+    ]
+
+    SCOPE_SELECTED = 'selected'
+    SCOPE_EXPIRED = 'expired'
+    SCOPE_CHOICES = [
+        (SCOPE_SELECTED, 'Selected tasks'),
+        (SCOPE_EXPIRED, 'All expired tasks'),
+    ]
+
+    action = forms.ChoiceField(choices=ACTION_CHOICES, widget=forms.Select(attrs={
+        'class': 'form-control'
+    }))
+
+    scope = forms.ChoiceField(choices=SCOPE_CHOICES, initial=SCOPE_SELECTED, widget=forms.Select(attrs={
+        'class': 'form-control'
+    }))
+
+    task_ids = TaskIdsField(required=False)
+
+    days = forms.IntegerField(required=False, min_value=-3650, max_value=3650, widget=forms.NumberInput(attrs={
+        'class': 'form-control',
+        'placeholder': 'Days (+/-)'
+    }))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('scope') == self.SCOPE_SELECTED and not cleaned_data.get('task_ids'):
+            self.add_error('task_ids', 'Select at least one task.')
+        if cleaned_data.get('action') == self.ACTION_SHIFT and not cleaned_data.get('days'):
+            self.add_error('days', 'Enter the number of days to shift the due date by.')
+        return cleaned_data
+
+    def get_tasks(self, user):
+        """The tasks this action applies to, always scoped to the user's own tasks"""
+        if self.cleaned_data['scope'] == self.SCOPE_EXPIRED:
+            return user.tasks.expired()
+        return user.tasks.filter(pk__in=self.cleaned_data['task_ids'])
+
+
+class TaskExportForm(forms.Form):
+    """Query string filters for the task export"""
+    FORMAT_CSV = 'csv'
+    FORMAT_NDJSON = 'ndjson'
+    FORMAT_CHOICES = [
+        (FORMAT_CSV, 'CSV'),
+        (FORMAT_NDJSON, 'NDJSON'),
+    ]
+
+    format = forms.ChoiceField(choices=FORMAT_CHOICES, required=False)
+    done = forms.NullBooleanField(required=False)
+    expired = forms.BooleanField(required=False)
+    due_after = forms.DateField(required=False)
+    due_before = forms.DateField(required=False)
+    # Include the tasks moved to the archive table
+    archived = forms.BooleanField(required=False)
+
+    def clean_format(self):
+        return self.cleaned_data['format'] or self.FORMAT_CSV
+
+    def get_archived_tasks(self, user):
+        """The archived tasks matching the filters, or None when they are not asked for"""
+        if not self.cleaned_data['archived']:
+            return None
+        return self.filter_tasks(user.archived_tasks.all())
+
+    def get_tasks(self, user):
+        return self.filter_tasks(user.tasks.all())
+
+    def filter_tasks(self, tasks):
+        if self.cleaned_data['expired']:
+            tasks = tasks.expired()
+        if self.cleaned_data['done'] is not None:
+            tasks = tasks.filter(done=self.cleaned_data['done'])
+
+        due_after = self.cleaned_data['due_after']
+        due_before = self.cleaned_data['due_before']
+        return tasks.due_between(
+            start=due_after and timezone.make_aware(datetime.combine(due_after, time.min)),
+            end=due_before and timezone.make_aware(datetime.combine(due_before + timedelta(days=1), time.min)),
+        )
+
+
+class TaskImportForm(forms.Form):
+    """Upload form for importing tasks from CSV or JSON"""
+    FORMAT_CHOICES = [
+        ('csv', 'CSV'),
+        ('json', 'JSON / NDJSON'),
+    ]
+
+    file = forms.FileField(widget=forms.ClearableFileInput(attrs={
+        'class': 'form-control',
+        'accept': '.csv,.json,.ndjson'
+    }))
+
+    format = forms.ChoiceField(choices=FORMAT_CHOICES, widget=forms.Select(attrs={
+        'class': 'form-control'
+    }))
@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+CARD_TEMPLATE = 'todo/task_card.html'
+
+
+def get_card_cache():
+    return caches[getattr(settings, 'TASK_CARD_CACHE_ALIAS', 'default')]
+
+
+def card_cache_key(user_id, task_id):
+    return f'todo:task_card:{user_id}:{task_id}'
+
+
+def card_version(task):
+    """
+    Cached HTML is only reused while the task, its expired flag, the time
+    zone its dates are shown in and, for a recurring task, its listed
+    occurrences are unchanged.
+    """
+    version = f'{task.updated_at.isoformat()}:{int(task.is_expired)}:{timezone.get_current_timezone_name()}'
+    occurrences = getattr(task, 'occurrences', None)
+    if occurrences:
+        version += ':' + ','.join(f'{occurrence.date.isoformat()}{occurrence.status or ""}' for occurrence in occurrences)
+    return version
+
+
+def render_task_cards(tasks):
+    """
+    Attach the rendered ``card_html`` to each task, rendering only the cards
+    whose cached fragment is missing or stale.
+
+    Expects ``is_expired`` to be set already (see Task.flag_expired). The
+    whole page costs one get_many and at most one set_many on the cache.
+    """
+    cache = get_card_cache()
+    keys = {task.pk: card_cache_key(task.user_id, task.pk) for task in tasks}
+    cached = cache.get_many(list(keys.values()))
+
+    fresh = {}
+    for task in tasks:
+        key = keys[task.pk]
+        version = card_version(task)
+        hit = cached.get(key)
+        if hit is not None and hit[0] == version:
+            html = hit[1]
+        else:
+            html = render_to_string(CARD_TEMPLATE, {'task': task})
+            fresh[key] = (version, html)
+        task.card_html = mark_safe(html)
+
+    if fresh:
+        cache.set_many(fresh, getattr(settings, 'TASK_CARD_CACHE_TIMEOUT', 60 * 60 * 24))
+    return tasks
+
+
+def invalidate_task_card(task_id, *user_ids):
+    get_card_cache().delete_many([card_cache_key(user_id, task_id) for user_id in set(user_ids)])
@@ -0,0 +1,159 @@
+import csv
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+
+from .forms import TaskForm
+from .models import Task
+
+IMPORT_BATCH_SIZE = 1000
+JSON_READ_SIZE = 64 * 1024
+MAX_JSON_VALUE_SIZE = 1024 * 1024
+TRUE_VALUES = {'1', 'true', 't', 'yes', 'y', 'on'}
+
+
+class ImportFormatError(Exception):
+    pass
+
+
+def iter_csv_rows(stream):
+    """Rows from a CSV text stream with a header line"""
+    yield from csv.DictReader(stream)
+
+
+def iter_json_rows(stream):
+    """
+    Objects from a text stream holding either a JSON array or NDJSON.
+
+    Reads fixed-size chunks and decodes one value at a time, so a large
+    array never has to be loaded in full.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    eof = False
+
+    while True:
+        # Skip whitespace and array punctuation between values
+        while position < len(buffer) and buffer[position] in ' \t\r\n,[]':
+            position += 1
+
+        if position >= len(buffer):
+            if eof:
+                return
+            buffer = stream.read(JSON_READ_SIZE)
+            position = 0
+            eof = not buffer
+            continue
+
+        try:
+            value, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof or len(buffer) - position > MAX_JSON_VALUE_SIZE:
+                raise ImportFormatError(f'Invalid JSON near: {buffer[position:position + 40]!r}')
+            chunk = stream.read(JSON_READ_SIZE)
+            buffer = buffer[position:] + chunk
+            position = 0
+            eof = not chunk
+            continue
+
+        if not isinstance(value, dict):
+            raise ImportFormatError('Each imported task must be a JSON object.')
+        yield value
+        position = end
+
+
+def iter_rows(stream, format):
+    if format == 'csv':
+        return iter_csv_rows(stream)
+    if format in ('json', 'ndjson'):
+        return iter_json_rows(stream)
+    raise ImportFormatError(f'Unsupported import format: {format}')
+
+
+class ImportReport:
+    """Outcome of an import; keeps at most ``max_errors`` error details"""
+
+    def __init__(self, max_errors=100):
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+        self.max_errors = max_errors
+
+    def add_error(self, row_number, errors):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((row_number, errors))
+
+
+class TaskImporter:
+    """
+    Validate rows with TaskForm's rules and insert them with bulk_create.
+
+    The form's fields are bound once and reused for every row, which avoids
+    the per-instance field deepcopy of building a TaskForm for each row.
+    Rows are consumed lazily and inserted ``batch_size`` at a time, each
+    batch in its own transaction, so memory stays bounded however large
+    the input is. Invalid rows are reported and skipped.
+    """
+
+    def __init__(self, user, batch_size=IMPORT_BATCH_SIZE, on_error=None, max_errors=100):
+        self.user = user
+        self.batch_size = batch_size
+        self.on_error = on_error
+        self.report = ImportReport(max_errors=max_errors)
+        self.fields = TaskForm().fields
+
+    def clean_row(self, row):
+        data = {field: row.get(field) for field in TaskForm.Meta.fields}
+        done = data.get('done')
+        if isinstance(done, str):
+            data['done'] = done.strip().lower() in TRUE_VALUES
+        return data
+
+    def validate_row(self, row):
+        """Return (cleaned_data, errors) for one row using TaskForm's fields and widgets"""
+        data = self.clean_row(row)
+        cleaned_data = {}
+        errors = {}
+        for name, field in self.fields.items():
+            value = field.widget.value_from_datadict(data, {}, name)
+            try:
+                cleaned_data[name] = field.clean(value)
+            except ValidationError as error:
+                errors[name] = error.messages
+        return cleaned_data, errors
+
+    def add_error(self, row_number, errors):
+        self.report.add_error(row_number, errors)
+        if self.on_error:
+            self.on_error(row_number, errors)
+
+    def flush(self, batch):
+        if not batch:
+            return
+        try:
+            with transaction.atomic():
+                Task.objects.bulk_create([task for _, task in batch], batch_size=self.batch_size)
+        except DatabaseError as error:
+            for row_number, _ in batch:
+                self.add_error(row_number, {'__all__': [str(error)]})
+        else:
+            self.report.created += len(batch)
+        batch.clear()
+
+    def run(self, rows):
+        batch = []
+        for row_number, row in enumerate(rows, start=1):
+            cleaned_data, errors = self.validate_row(row)
+            if errors:
+                self.add_error(row_number, errors)
+                continue
+
+            batch.append((row_number, Task(user=self.user, **cleaned_data)))
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+
+        self.flush(batch)
+        return self.report
@@ -0,0 +1,47 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from todo.archive import ARCHIVE_BATCH_SIZE, archivable_tasks, archive_tasks
+
+
+class Command(BaseCommand):
+    help = (
+        'Move tasks completed more than --days days ago into the archive table, in batches '
+        'of one INSERT ... SELECT and DELETE transaction each (run nightly)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.TASK_ARCHIVE_AFTER_DAYS,
+                            help='Archive tasks done for more than this many days')
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE, help='Tasks moved per transaction')
+        parser.add_argument('--pause', type=float, default=0,
+                            help='Seconds to wait between batches, to let other writers in')
+        parser.add_argument(
+            '--user-id', type=int, action='append', dest='user_ids',
+            help='Only archive these users\' tasks (may be given more than once)',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Only count the tasks that would be archived')
+
+    def handle(self, *args, **options):
+        if options['days'] < 0 or options['batch_size'] < 1:
+            raise CommandError('--days must be 0 or more and --batch-size at least 1.')
+        older_than = timedelta(days=options['days'])
+
+        if options['dry_run']:
+            tasks = archivable_tasks(older_than)
+            if options['user_ids']:
+                tasks = tasks.filter(user_id__in=options['user_ids'])
+            self.stdout.write(f'{tasks.count()} task(s) would be archived.')
+            return
+
+        total = 0
+        for moved in archive_tasks(older_than, options['batch_size'], options['user_ids']):
+            total += moved
+            self.stdout.write(f'Archived {moved} task(s) ({total} so far).')
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        self.stdout.write(self.style.SUCCESS(f'Archived {total} task(s).'))
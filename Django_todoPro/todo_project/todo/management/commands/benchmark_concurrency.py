@@ -0,0 +1,144 @@
+import asyncio
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+
+from todo.benchmarking import create_tasks, run_profile_in_child, summarize, table_lines
+from todo.models import ApiToken, UserProfile
+
+PROFILES = ('wsgi', 'asgi')
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare how many concurrent JSON list and long-poll requests one worker serves '
+        'under WSGI (sync views, a fixed pool of threads) and ASGI (async views, one event loop). '
+        'Runs against a throwaway test database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', choices=PROFILES + ('both',), default='both',
+                            help='Deployment profile to measure; "both" runs each in its own process')
+        parser.add_argument('--clients', type=int, default=64,
+                            help='Concurrent clients, each sending its requests one after another')
+        parser.add_argument('--threads', type=int, default=8,
+                            help='Request threads of the WSGI worker')
+        parser.add_argument('--requests', type=int, default=20, help='List requests per client')
+        parser.add_argument('--tasks', type=int, default=1000, help='Tasks created for the benchmark user')
+        parser.add_argument('--poll-timeout', type=float, default=1.0,
+                            help='Seconds each long poll waits for a change that never comes')
+        parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+
+    def handle(self, *args, **options):
+        if options['profile'] == 'both':
+            results = []
+            for profile in PROFILES:
+                results.extend(self.run_child(profile, options))
+        else:
+            results = self.run_profile(options['profile'], options)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results))
+        else:
+            self.print_table(results)
+
+    # Processes
+
+    def run_child(self, profile, options):
+        """Measure one profile in a fresh process, so its URLconf routes the matching views"""
+        self.stderr.write(f'Measuring {profile}...')
+        return run_profile_in_child('benchmark_concurrency', profile, {
+            'DJANGO_ASYNC_VIEWS': '1' if profile == 'asgi' else '0',
+        }, [
+            '--clients', options['clients'], '--threads', options['threads'],
+            '--requests', options['requests'], '--tasks', options['tasks'],
+            '--poll-timeout', options['poll_timeout'],
+        ])
+
+    def run_profile(self, profile, options):
+        if settings.ASYNC_VIEWS != (profile == 'asgi'):
+            raise CommandError(
+                f'The {profile} profile needs DJANGO_ASYNC_VIEWS={int(profile == "asgi")}; '
+                'or use --profile both.'
+            )
+
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver']):
+                key, version = self.create_data(options['tasks'])
+                headers = {'Authorization': f'Bearer {key}'}
+                poll_path = f'/api/tasks/changes/?since={version}&timeout={options["poll_timeout"]}'
+                run = self.run_asgi if profile == 'asgi' else self.run_wsgi
+                return [
+                    run('list', '/api/tasks/?limit=50', headers, options['requests'], options),
+                    run('long-poll', poll_path, headers, 1, options),
+                ]
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def create_data(self, count):
+        user = User.objects.create_user('benchmark', password=None)
+        create_tasks([user], count)
+        _, key = ApiToken.create_for(user, name='benchmark')
+        return key, UserProfile.objects.get(user=user).tasks_version
+
+    # Load generators
+
+    def run_wsgi(self, workload, path, headers, per_client, options):
+        """``clients`` threads, but only ``threads`` requests in the handler at a time"""
+        workers = threading.BoundedSemaphore(options['threads'])
+        latencies = []
+        errors = []
+
+        def client_loop():
+            client = Client()
+            for _ in range(per_client):
+                started = time.perf_counter()
+                with workers:
+                    response = client.get(path, headers=headers)
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    errors.append(response.status_code)
+
+        threads = [threading.Thread(target=client_loop) for _ in range(options['clients'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return summarize(workload, 'wsgi', latencies, len(errors), time.perf_counter() - started)
+
+    def run_asgi(self, workload, path, headers, per_client, options):
+        """``clients`` coroutines on one event loop"""
+        latencies = []
+        errors = []
+
+        async def client_loop():
+            client = AsyncClient()
+            for _ in range(per_client):
+                started = time.perf_counter()
+                response = await client.get(path, headers=headers)
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    errors.append(response.status_code)
+
+        async def main():
+            await asyncio.gather(*(client_loop() for _ in range(options['clients'])))
+
+        started = time.perf_counter()
+        asyncio.run(main())
+        return summarize(workload, 'asgi', latencies, len(errors), time.perf_counter() - started)
+
+    # Output
+
+    def print_table(self, results):
+        columns = ('workload', 'profile', 'requests', 'errors', 'seconds', 'rps', 'p50_ms', 'p95_ms', 'p99_ms')
+        for line in table_lines(results, columns):
+            self.stdout.write(line)
@@ -0,0 +1,165 @@
+import json
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection, connections
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from todo.benchmarking import create_tasks, run_profile_in_child, summarize, table_lines
+from todo.models import ApiToken
+
+# name -> (DJANGO_DB_CONN_MAX_AGE, DJANGO_DB_POOL)
+PROFILES = {
+    'per-request': ('0', '0'),
+    'persistent': ('600', '0'),
+    'pool': ('0', '1'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure what opening a database connection costs each request: one connection '
+        'per request (CONN_MAX_AGE=0), persistent connections, and psycopg\'s pool '
+        '(PostgreSQL only). Runs JSON list requests against a throwaway test database '
+        'of the configured engine, or a SQLite file.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', choices=tuple(PROFILES) + ('all',), default='all',
+                            help='Connection profile to measure; "all" runs each in its own process')
+        parser.add_argument('--threads', type=int, default=4, help='Request threads, like a WSGI worker')
+        parser.add_argument('--requests', type=int, default=250, help='Requests per thread')
+        parser.add_argument('--tasks', type=int, default=200, help='Tasks created for the benchmark user')
+        parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+
+    def handle(self, *args, **options):
+        if options['profile'] == 'all':
+            results = []
+            for profile in PROFILES:
+                if profile == 'pool' and settings.DB_ENGINE != 'postgresql':
+                    self.stderr.write('Skipping pool: it needs DJANGO_DB_ENGINE=postgresql.')
+                    continue
+                results.extend(self.run_child(profile, options))
+        else:
+            results = self.run_profile(options['profile'], options)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results))
+        else:
+            self.print_table(results)
+
+    # Processes
+
+    def run_child(self, profile, options):
+        """Measure one profile in a fresh process, whose settings build the matching DATABASES"""
+        conn_max_age, pool = PROFILES[profile]
+        self.stderr.write(f'Measuring {profile}...')
+        return run_profile_in_child('benchmark_connections', profile, {
+            'DJANGO_DB_CONN_MAX_AGE': conn_max_age, 'DJANGO_DB_POOL': pool,
+        }, [
+            '--threads', options['threads'], '--requests', options['requests'], '--tasks', options['tasks'],
+        ])
+
+    def run_profile(self, profile, options):
+        conn_max_age, pool = PROFILES[profile]
+        if settings.DB_POOL != (pool == '1') or connection.settings_dict['CONN_MAX_AGE'] != int(conn_max_age):
+            raise CommandError(
+                f'The {profile} profile needs DJANGO_DB_CONN_MAX_AGE={conn_max_age} '
+                f'and DJANGO_DB_POOL={pool}; or use --profile all.'
+            )
+        if pool == '1' and connection.vendor != 'postgresql':
+            raise CommandError('The pool profile needs DJANGO_DB_ENGINE=postgresql.')
+
+        with tempfile.TemporaryDirectory() as directory:
+            if connection.vendor == 'sqlite':
+                # The in-memory test database never closes its connection, which is what is measured here
+                connection.settings_dict['TEST']['NAME'] = str(Path(directory) / 'benchmark.sqlite3')
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                with override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver']):
+                    key = self.create_data(options['tasks'])
+                    close_old_connections()
+                    result = self.run_load(profile, {'Authorization': f'Bearer {key}'}, options)
+                result['connect_ms'] = self.measure_connect()
+                return [result]
+            finally:
+                connections.close_all()
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def create_data(self, count):
+        user = User.objects.create_user('benchmark', password=None)
+        create_tasks([user], count)
+        # Set now, so the token's hourly last_used_at update does not land in the run
+        token, key = ApiToken.create_for(user, name='benchmark')
+        ApiToken.objects.filter(pk=token.pk).update(last_used_at=timezone.now())
+        return key
+
+    # Load
+
+    def run_load(self, profile, headers, options):
+        """
+        Send the requests from ``threads`` threads, closing connections the way
+        Django's request handler does: close_old_connections() when a request
+        starts and when it finishes (the test client skips both).
+        """
+        latencies = []
+        errors = []
+        opened = []
+
+        def count_connection(sender, connection, **kwargs):
+            opened.append(connection.alias)
+
+        def client_loop():
+            client = Client()
+            try:
+                for _ in range(options['requests']):
+                    started = time.perf_counter()
+                    close_old_connections()
+                    response = client.get('/api/tasks/?limit=20', headers=headers)
+                    close_old_connections()
+                    latencies.append(time.perf_counter() - started)
+                    if response.status_code != 200:
+                        errors.append(response.status_code)
+            finally:
+                connections.close_all()
+
+        connection_created.connect(count_connection)
+        try:
+            threads = [threading.Thread(target=client_loop) for _ in range(options['threads'])]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+        finally:
+            connection_created.disconnect(count_connection)
+
+        result = summarize('list', profile, latencies, len(errors), elapsed)
+        result['connections'] = len(opened)
+        return result
+
+    def measure_connect(self, samples=50):
+        """Average milliseconds to open a new connection and make it ready for queries"""
+        connection.close()
+        started = time.perf_counter()
+        for _ in range(samples):
+            connection.connect()
+            connection.close()
+        return round((time.perf_counter() - started) / samples * 1000, 2)
+
+    # Output
+
+    def print_table(self, results):
+        columns = ('workload', 'profile', 'requests', 'connections', 'connect_ms',
+                   'errors', 'rps', 'p50_ms', 'p95_ms', 'p99_ms')
+        for line in table_lines(results, columns, width=11):
+            self.stdout.write(line)
@@ -0,0 +1,186 @@
+import json
+import random
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections, transaction
+from django.utils import timezone
+
+from todo.benchmarking import create_tasks, run_profile_in_child, summarize, table_lines
+from todo.database import REPLICA_DB_ALIAS, sqlite_pragma_values
+from todo.models import Task
+from todo.pagination import KeysetPaginator
+
+# name -> (DJANGO_SQLITE_PROFILE, DJANGO_DB_READ_REPLICA)
+PROFILES = {
+    'default': ('default', '0'),
+    'tuned': ('tuned', '0'),
+    'replica': ('tuned', '1'),
+}
+
+REPORTED_PRAGMAS = ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size', 'mmap_size')
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure concurrent task writes and reads against a throwaway SQLite file, '
+        'with SQLite\'s default settings, the tuned profile, and the tuned profile plus '
+        'the read-replica router. Reports throughput, latency and "database is locked" errors.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profile', choices=tuple(PROFILES) + ('all',), default='all',
+                            help='Database profile to measure; "all" runs each in its own process')
+        parser.add_argument('--writers', type=int, default=8, help='Threads creating and updating tasks')
+        parser.add_argument('--readers', type=int, default=8, help='Threads reading task list pages meanwhile')
+        parser.add_argument('--writes', type=int, default=100, help='Write transactions per writer')
+        parser.add_argument('--tasks', type=int, default=5000, help='Tasks created before the run')
+        parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+
+    def handle(self, *args, **options):
+        if options['profile'] == 'all':
+            results = []
+            for profile in PROFILES:
+                results.extend(self.run_child(profile, options))
+        else:
+            results = self.run_profile(options['profile'], options)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results))
+        else:
+            self.print_table(results)
+
+    # Processes
+
+    def run_child(self, profile, options):
+        """Measure one profile in a fresh process, whose settings build the matching DATABASES"""
+        sqlite_profile, replica = PROFILES[profile]
+        self.stderr.write(f'Measuring {profile}...')
+        return run_profile_in_child('benchmark_database', profile, {
+            'DJANGO_SQLITE_PROFILE': sqlite_profile, 'DJANGO_DB_READ_REPLICA': replica,
+        }, [
+            '--writers', options['writers'], '--readers', options['readers'],
+            '--writes', options['writes'], '--tasks', options['tasks'],
+        ])
+
+    def run_profile(self, profile, options):
+        if connection.vendor != 'sqlite':
+            raise CommandError(f'This benchmark measures SQLite (current backend: {connection.vendor}).')
+        sqlite_profile, replica = PROFILES[profile]
+        if settings.SQLITE_PROFILE != sqlite_profile or (REPLICA_DB_ALIAS in settings.DATABASES) != (replica == '1'):
+            raise CommandError(
+                f'The {profile} profile needs DJANGO_SQLITE_PROFILE={sqlite_profile} '
+                f'and DJANGO_DB_READ_REPLICA={replica}; or use --profile all.'
+            )
+
+        with tempfile.TemporaryDirectory() as directory:
+            # A file, not the in-memory test database: locking is what is being measured
+            name = str(Path(directory) / 'benchmark.sqlite3')
+            connection.settings_dict['TEST']['NAME'] = name
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            if REPLICA_DB_ALIAS in connections:
+                connections[REPLICA_DB_ALIAS].settings_dict['NAME'] = f'file:{name}?mode=ro'
+            try:
+                pragmas = sqlite_pragma_values(connection, REPORTED_PRAGMAS)
+                user_ids = self.create_data(options['writers'], options['tasks'])
+                connections.close_all()
+                results = self.run_load(profile, user_ids, options)
+                for result in results:
+                    result['pragmas'] = pragmas
+                return results
+            finally:
+                connections.close_all()
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def create_data(self, writers, count):
+        users = [User.objects.create_user(f'benchmark{number}', password=None) for number in range(writers)]
+        create_tasks(users, count)
+        return [user.pk for user in users]
+
+    # Load
+
+    def run_load(self, profile, user_ids, options):
+        """
+        Writers alternate creating a task and toggling one (read, then write,
+        in one transaction, like the edit view) while readers page through
+        task lists until the writers are done.
+        """
+        writing = threading.Event()
+        writing.set()
+        write_latencies, read_latencies = [], []
+        write_errors, read_errors = [], []
+
+        def writer(user_id):
+            rng = random.Random(user_id)
+            try:
+                for number in range(options['writes']):
+                    started = time.perf_counter()
+                    try:
+                        with transaction.atomic():
+                            if number % 2:
+                                task = Task.objects.filter(user_id=user_id).order_by('?').first()
+                                task.done = not task.done
+                                task.save()
+                            else:
+                                Task.objects.create(
+                                    user_id=user_id, title=f'Benchmark {number}',
+                                    due_date=timezone.now() + timedelta(days=rng.randint(0, 30)),
+                                )
+                    except OperationalError as error:
+                        write_errors.append(str(error))
+                    write_latencies.append(time.perf_counter() - started)
+            finally:
+                connections.close_all()
+
+        def reader(user_id):
+            try:
+                while writing.is_set():
+                    started = time.perf_counter()
+                    try:
+                        paginator = KeysetPaginator(Task.objects.filter(user_id=user_id), 50)
+                        page = paginator.get_page()
+                        if page.has_next():
+                            paginator.get_page(page.next_cursor)
+                    except OperationalError as error:
+                        read_errors.append(str(error))
+                    read_latencies.append(time.perf_counter() - started)
+            finally:
+                connections.close_all()
+
+        writers = [threading.Thread(target=writer, args=(user_id,)) for user_id in user_ids]
+        readers = [
+            threading.Thread(target=reader, args=(user_ids[number % len(user_ids)],))
+            for number in range(options['readers'])
+        ]
+        started = time.perf_counter()
+        for thread in writers + readers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        writing.clear()
+        for thread in readers:
+            thread.join()
+
+        return [
+            summarize('write', profile, write_latencies, len(write_errors), elapsed),
+            summarize('read', profile, read_latencies, len(read_errors), elapsed),
+        ]
+
+    # Output
+
+    def print_table(self, results):
+        columns = ('workload', 'profile', 'requests', 'errors', 'seconds', 'rps', 'p50_ms', 'p95_ms', 'p99_ms')
+        for line in table_lines(results, columns):
+            self.stdout.write(line)
+        pragmas = {}
+        for result in results:
+            pragmas.setdefault(result['profile'], result['pragmas'])
+        for profile, values in pragmas.items():
+            self.stdout.write(f'{profile}: ' + ', '.join(f'{name}={value}' for name, value in values.items()))
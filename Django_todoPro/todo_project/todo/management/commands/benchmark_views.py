@@ -0,0 +1,296 @@
+import gc
+import json
+import logging
+import statistics
+import time
+import tracemalloc
+from contextlib import ExitStack
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from todo.benchmarking import summarize, table_lines
+from todo.models import ApiToken, RecurrenceRule, Task
+from todo.synthetic import DatasetSpec, clear_dataset, generate_dataset
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'views.json'
+
+# Todo URLs that are not measured, and why
+SKIPPED_VIEWS = {
+    'logout': 'ends the session',
+    'task_events': 'an event stream that never ends',
+    'api_task_changes': 'a long poll that waits for a change',
+}
+
+SEARCH_QUERY = 'report'
+
+
+def view_requests(task_id, done_ids, recurring_id, day, api_key):
+    """
+    (url name, method, path, data, headers) for every measured todo URL.
+
+    POST-only views come last and repeat the same change (completing done
+    tasks, marking an occurrence done), so every repeat does the same work.
+    """
+    api = {'Authorization': f'Bearer {api_key}'}
+    task = {'pk': task_id}
+
+    def get(name, query='', headers=None, **kwargs):
+        return (name, 'GET', reverse(f'todo:{name}', kwargs=kwargs or None) + query, None, headers or {})
+
+    return [
+        get('home'),
+        get('login'),
+        get('register'),
+        get('profile'),
+        get('profile_edit'),
+        get('task_list'),
+        get('task_create'),
+        get('task_detail', **task),
+        get('task_edit', **task),
+        get('task_delete', **task),
+        get('task_update_status', **task),
+        get('task_search', f'?q={SEARCH_QUERY}'),
+        get('task_export', '?format=csv'),
+        get('task_import'),
+        get('api_task_list', '?limit=50', api),
+        get('api_task_detail', headers=api, **task),
+        get('expired_tasks_list'),
+        get('users_without_tasks'),
+        (
+            'task_bulk', 'POST', reverse('todo:task_bulk'),
+            {'action': 'complete', 'scope': 'selected', 'task_ids': done_ids}, {},
+        ),
+        (
+            'occurrence_status', 'POST',
+            reverse('todo:occurrence_status', kwargs={'pk': recurring_id, 'day': day.isoformat()}),
+            {'status': 'done'}, {},
+        ),
+    ]
+
+
+def baseline_key(result):
+    return f'{result["view"]}@{result["tasks"]}'
+
+
+def find_regressions(results, baseline, tolerance, min_delta_ms, min_delta_kb):
+    """
+    Messages for the results that are worse than their baseline entry.
+
+    Latency and peak memory may grow by ``tolerance`` (a fraction), and also
+    by the absolute slack, so sub-millisecond noise never fails a run. Query
+    counts do not depend on the machine, so any increase is a regression.
+    """
+    regressions = []
+    for result in results:
+        old = baseline.get(baseline_key(result))
+        if old is None:
+            continue
+        key = baseline_key(result)
+        if result['status'] != old['status']:
+            regressions.append(f'{key}: status {old["status"]} -> {result["status"]}')
+        if (
+            result['p95_ms'] > old['p95_ms'] * (1 + tolerance)
+            and result['p95_ms'] - old['p95_ms'] > min_delta_ms
+        ):
+            regressions.append(f'{key}: p95 {old["p95_ms"]} ms -> {result["p95_ms"]} ms')
+        if result['queries'] > old['queries']:
+            regressions.append(f'{key}: {old["queries"]} -> {result["queries"]} queries')
+        if (
+            result['peak_kb'] > old['peak_kb'] * (1 + tolerance)
+            and result['peak_kb'] - old['peak_kb'] > min_delta_kb
+        ):
+            regressions.append(f'{key}: peak memory {old["peak_kb"]} KB -> {result["peak_kb"]} KB')
+    return regressions
+
+
+class Command(BaseCommand):
+    help = (
+        'Request every todo URL through the test client against synthetic datasets of several sizes '
+        '(see generate_dataset), and report p50/p95 latency, queries and peak memory per view. '
+        'Compares with a JSON baseline, which must exist unless --save-baseline records it, and fails on '
+        'regressions. Runs against a throwaway test database.'
+    )
+
+    def add_arguments(self, parser):
+        defaults = DatasetSpec()
+        parser.add_argument('--sizes', default='1000,10000',
+                            help='Comma-separated total task counts; each is measured on a fresh dataset')
+        parser.add_argument('--users', type=int, default=50, help='Users the tasks are spread over')
+        parser.add_argument('--skew', type=float, default=defaults.skew, help='See generate_dataset --skew')
+        parser.add_argument('--seed', type=int, default=defaults.seed, help='Random seed of the dataset')
+        parser.add_argument('--repeat', type=int, default=50, help='Timed requests per view and size')
+        parser.add_argument('--warmup', type=int, default=2, help='Untimed requests per view and size first')
+        parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE, help='Baseline JSON file')
+        parser.add_argument('--save-baseline', action='store_true',
+                            help='Write the results to --baseline instead of comparing with it')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed growth of p95 latency and peak memory, as a fraction')
+        parser.add_argument('--min-delta-ms', type=float, default=5.0,
+                            help='p95 growth below this many milliseconds is never a regression')
+        parser.add_argument('--min-delta-kb', type=float, default=64.0,
+                            help='Peak memory growth below this many KB is never a regression')
+        parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',')]
+        except ValueError:
+            raise CommandError('--sizes must be comma-separated numbers, e.g. 1000,10000.')
+        if min(sizes) < 1 or options['users'] < 1 or options['repeat'] < 1:
+            raise CommandError('--sizes, --users and --repeat must be at least 1.')
+        # Before the run, which takes minutes; a comparison without a baseline would pass silently
+        if not options['save_baseline'] and not options['baseline'].exists():
+            raise CommandError(
+                f'No baseline at {options["baseline"]}; record one on this machine with --save-baseline.'
+            )
+
+        results = self.run(sizes, options)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results))
+        else:
+            self.print_table(results)
+
+        if options['save_baseline']:
+            self.save_baseline(options['baseline'], results, sizes, options)
+            return
+        baseline = json.loads(options['baseline'].read_text())['results']
+        regressions = find_regressions(
+            results, baseline, options['tolerance'], options['min_delta_ms'], options['min_delta_kb'],
+        )
+        if regressions:
+            raise CommandError(
+                f'{len(regressions)} regression(s) against {options["baseline"]}:\n' + '\n'.join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS(f'No regressions against {options["baseline"]}.'))
+
+    def run(self, sizes, options):
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        # Error statuses are in the table; their tracebacks would drown it
+        request_logger = logging.getLogger('django.request')
+        old_level = request_logger.level
+        request_logger.setLevel(logging.CRITICAL)
+        try:
+            with override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver']):
+                results = []
+                for size in sizes:
+                    self.stderr.write(f'Measuring {size} tasks...')
+                    clear_dataset()
+                    spec = DatasetSpec(users=options['users'], tasks=size, skew=options['skew'], seed=options['seed'])
+                    dataset = generate_dataset(spec)
+                    results.extend(self.measure(size, dataset, options))
+                return results
+        finally:
+            request_logger.setLevel(old_level)
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def measure(self, size, dataset, options):
+        """Request each view as the heaviest user, who sees the most tasks"""
+        user = User.objects.get(pk=dataset.heaviest_user_id)
+        # users_without_tasks is for staff
+        user.is_staff = user.is_superuser = True
+        user.save(update_fields=['is_staff', 'is_superuser'])
+        _, key = ApiToken.create_for(user, name='benchmark')
+
+        # A daily series, so tomorrow is always an occurrence
+        recurring = Task.objects.create(
+            user=user, title='Benchmark series', due_date=timezone.now() - timedelta(days=1),
+        )
+        RecurrenceRule.objects.create(task=recurring, freq='DAILY')
+        tasks = user.tasks.order_by('id')
+        task_id = tasks.values_list('id', flat=True)[tasks.count() // 2]
+        done_ids = list(tasks.filter(done=True).values_list('id', flat=True)[:20]) or [task_id]
+        day = timezone.localdate() + timedelta(days=1)
+
+        client = Client(raise_request_exception=False)
+        client.force_login(user)
+        # The first visit stores the welcome flag in the session
+        client.get(reverse('todo:task_list'))
+
+        return [
+            self.measure_view(client, size, *request, options)
+            for request in view_requests(task_id, done_ids, recurring.pk, day, key)
+        ]
+
+    def measure_view(self, client, size, name, method, path, data, headers, options):
+        def send():
+            response = getattr(client, method.lower())(path, data, headers=headers)
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+            return response
+
+        for _ in range(options['warmup']):
+            send()
+
+        latencies, queries, statuses = [], [], []
+        # Like timeit: a collection in the middle of one request would be its p95
+        gc.collect()
+        gc.disable()
+        started = time.perf_counter()
+        try:
+            for _ in range(options['repeat']):
+                with ExitStack() as stack:
+                    captures = [
+                        stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in connections
+                    ]
+                    request_started = time.perf_counter()
+                    response = send()
+                    latencies.append(time.perf_counter() - request_started)
+                queries.append(sum(len(capture) for capture in captures))
+                statuses.append(response.status_code)
+            elapsed = time.perf_counter() - started
+        finally:
+            gc.enable()
+
+        # A separate request: tracing allocations slows everything down
+        tracemalloc.start()
+        try:
+            send()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        stats = summarize(name, str(size), latencies, sum(status >= 500 for status in statuses), elapsed)
+        return {
+            'tasks': size,
+            'view': name,
+            'method': method,
+            'status': max(statuses),
+            'requests': stats['requests'],
+            'errors': stats['errors'],
+            'p50_ms': stats['p50_ms'],
+            'p95_ms': stats['p95_ms'],
+            'queries': round(statistics.median(queries)),
+            'peak_kb': round(peak / 1024, 1),
+        }
+
+    # Output
+
+    def save_baseline(self, path, results, sizes, options):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        baseline = {
+            'created_at': timezone.now().isoformat(),
+            'sizes': sizes,
+            'users': options['users'],
+            'repeat': options['repeat'],
+            'results': {baseline_key(result): result for result in results},
+        }
+        path.write_text(json.dumps(baseline, indent=2) + '\n')
+        self.stdout.write(self.style.SUCCESS(f'Saved the baseline to {path}.'))
+
+    def print_table(self, results):
+        columns = ('tasks', 'view', 'method', 'status', 'p50_ms', 'p95_ms', 'queries', 'peak_kb')
+        for line in table_lines(results, columns, width=8, widths={'view': 20}):
+            self.stdout.write(line)
+        skipped = ', '.join(f'{name} ({reason})' for name, reason in SKIPPED_VIEWS.items())
+        self.stdout.write(f'Not measured: {skipped}')
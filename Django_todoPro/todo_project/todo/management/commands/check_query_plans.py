@@ -0,0 +1,90 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from todo.archive import archivable_tasks
+from todo.models import Task, TaskArchive
+from todo.pagination import KeysetPaginator
+
+# The index each hot queryset must read todo_task through
+EXPECTED_INDEXES = {
+    'task_list': 'task_user_deadline_idx',
+    'expired_tasks_list': 'task_user_pending_deadline_idx',
+    'expired': 'task_pending_deadline_idx',
+    'archive_batch': 'task_updated_idx',
+}
+
+# Tables a hot queryset is meant to read in full; any other SCAN, even one
+# through an index, walks a whole table and fails the check
+FULL_SCANS_ALLOWED = {
+    # Every user is listed, each probing the task table by user_id
+    'users_without_tasks': {'auth_user'},
+}
+
+SCAN_RE = re.compile(r'\bSCAN (\S+)')
+
+
+class Command(BaseCommand):
+    help = 'Run EXPLAIN QUERY PLAN on the hot task querysets and fail on full scans or temp B-tree sorts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user-id', type=int, default=1,
+            help='User id to bind into the per-user querysets (rows do not need to exist)',
+        )
+
+    def get_hot_querysets(self, user_id):
+        """
+        The querysets behind TaskListView, ExpiredTasksListView, TaskQuerySet.expired,
+        users_without_tasks, the archive_tasks batches and the API list with ?archived=1
+        """
+        now = timezone.now()
+        return {
+            'task_list': Task.objects.filter(user_id=user_id).by_deadline(),
+            'expired_tasks_list': Task.objects.filter(user_id=user_id).expired(now).by_deadline(),
+            'expired': Task.objects.expired(now),
+            'users_without_tasks': Task.objects.users_without_tasks().order_by('username', 'id'),
+            'archive_batch': archivable_tasks(now=now).order_by('updated_at', 'id')[:1000],
+            'history': KeysetPaginator(
+                Task.objects.filter(user_id=user_id).values('id', 'due_date'), 50,
+                union=[TaskArchive.objects.filter(user_id=user_id).values('id', 'due_date')],
+            ).page_queryset()[0],
+        }
+
+    def find_problems(self, name, plan):
+        problems = []
+        expected = EXPECTED_INDEXES.get(name)
+        if expected and expected not in plan:
+            problems.append(f'not using {expected}')
+        for line in plan.splitlines():
+            detail = line.strip()
+            scan = SCAN_RE.search(detail)
+            if scan and scan.group(1) not in FULL_SCANS_ALLOWED.get(name, ()):
+                problems.append(detail)
+            if 'USE TEMP B-TREE' in detail:
+                problems.append(detail)
+        return problems
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError(
+                f'EXPLAIN QUERY PLAN checks only support SQLite (current backend: {connection.vendor}).'
+            )
+
+        failures = {}
+        for name, queryset in self.get_hot_querysets(options['user_id']).items():
+            plan = queryset.explain()
+            problems = self.find_problems(name, plan)
+            self.stdout.write(f'{name}:')
+            for line in plan.splitlines():
+                self.stdout.write(f'    {line}')
+            if problems:
+                failures[name] = problems
+
+        if failures:
+            summary = '; '.join(f'{name}: {", ".join(problems)}' for name, problems in failures.items())
+            raise CommandError(f'Query plan check failed: {summary}')
+
+        self.stdout.write(self.style.SUCCESS('All hot querysets use an index without a temp sort.'))
@@ -0,0 +1,22 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from todo.models import ApiToken
+
+
+class Command(BaseCommand):
+    help = 'Create a bearer token for the JSON API; the key is printed once and cannot be recovered'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--name', default='', help='Label to tell tokens apart, e.g. the client using it')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f'User "{options["username"]}" does not exist.')
+
+        token, key = ApiToken.create_for(user, name=options['name'])
+        self.stdout.write(self.style.SUCCESS(f'Created API token {token.prefix}... for {user.username}.'))
+        self.stdout.write(key)
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from todo.synthetic import (
+    SYNTHETIC_BATCH_SIZE, SYNTHETIC_PREFIX, DatasetSpec, clear_dataset, generate_dataset, synthetic_users,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Create synthetic users and tasks for load testing: a skewed number of tasks per user, '
+        'due dates around today, and a realistic share of done, expired and repeating tasks'
+    )
+
+    def add_arguments(self, parser):
+        defaults = DatasetSpec()
+        parser.add_argument('--users', type=int, default=defaults.users, help='Users to create')
+        parser.add_argument('--tasks', type=int, default=defaults.tasks, help='Tasks to create, over all users')
+        parser.add_argument('--skew', type=float, default=defaults.skew,
+                            help='Power-law exponent of tasks per user; 0 spreads them evenly')
+        parser.add_argument('--past-days', type=int, default=defaults.past_days,
+                            help='Earliest due date, in days before today')
+        parser.add_argument('--future-days', type=int, default=defaults.future_days,
+                            help='Latest due date, in days after today')
+        parser.add_argument('--seed', type=int, default=defaults.seed,
+                            help='Random seed; the same seed gives the same data')
+        parser.add_argument('--prefix', default=SYNTHETIC_PREFIX, help='Username prefix of the synthetic users')
+        parser.add_argument('--batch-size', type=int, default=SYNTHETIC_BATCH_SIZE, help='Rows per INSERT')
+        parser.add_argument('--clear', action='store_true',
+                            help='Delete the users with this prefix (and their tasks) first')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['tasks'] < 0 or options['batch_size'] < 1:
+            raise CommandError('--users and --batch-size must be at least 1 and --tasks 0 or more.')
+        if options['past_days'] < 0 or options['future_days'] < 0:
+            raise CommandError('--past-days and --future-days must be 0 or more.')
+        prefix = options['prefix']
+
+        if options['clear']:
+            self.stdout.write(f'Deleted {clear_dataset(prefix)} synthetic user(s).')
+        elif synthetic_users(prefix).exists():
+            raise CommandError(f'Users named "{prefix}-..." already exist; pass --clear or another --prefix.')
+
+        spec = DatasetSpec(
+            users=options['users'], tasks=options['tasks'], skew=options['skew'],
+            past_days=options['past_days'], future_days=options['future_days'],
+            seed=options['seed'], prefix=prefix,
+        )
+        dataset = generate_dataset(spec, options['batch_size'])
+        counts = dataset.task_counts
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {spec.users} user(s) and {spec.tasks} task(s), {dataset.recurring} repeating; '
+            f'tasks per user: max {counts[0]}, median {counts[len(counts) // 2]}, min {counts[-1]}.'
+        ))
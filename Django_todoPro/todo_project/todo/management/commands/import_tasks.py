@@ -0,0 +1,44 @@
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from todo.importer import IMPORT_BATCH_SIZE, ImportFormatError, TaskImporter, iter_rows
+
+
+class Command(BaseCommand):
+    help = 'Import tasks for a user from a CSV or JSON/NDJSON file, streaming and in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or '-' for stdin")
+        parser.add_argument('--user', required=True, help='Username that will own the imported tasks')
+        parser.add_argument('--format', choices=['csv', 'json', 'ndjson'],
+                            help='Input format (default: taken from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f'User "{options["user"]}" does not exist.')
+
+        path = options['path']
+        format = options['format'] or path.rsplit('.', 1)[-1].lower()
+
+        def report_error(row_number, errors):
+            details = '; '.join(f'{field}: {" ".join(messages)}' for field, messages in errors.items())
+            self.stderr.write(f'Row {row_number}: {details}')
+
+        importer = TaskImporter(user, batch_size=options['batch_size'], on_error=report_error, max_errors=0)
+        try:
+            if path == '-':
+                report = importer.run(iter_rows(sys.stdin, format))
+            else:
+                with open(path, newline='', encoding='utf-8') as stream:
+                    report = importer.run(iter_rows(stream, format))
+        except (ImportFormatError, OSError) as error:
+            raise CommandError(str(error))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {report.created} task(s); {report.failed} row(s) failed.'
+        ))
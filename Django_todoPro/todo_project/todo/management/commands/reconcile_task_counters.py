@@ -0,0 +1,36 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from todo.models import Task, UserProfile
+
+
+class Command(BaseCommand):
+    help = 'Recompute task deadlines and the per-user task counters on UserProfile, and fix any drift (run nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user-id', type=int, action='append', dest='user_ids',
+            help='Only reconcile these users (may be given more than once)',
+        )
+
+    def handle(self, *args, **options):
+        users_without_profile = User.objects.filter(profile__isnull=True)
+        if options['user_ids']:
+            users_without_profile = users_without_profile.filter(id__in=options['user_ids'])
+        created = UserProfile.objects.bulk_create(
+            [UserProfile(user=user) for user in users_without_profile.only('id')]
+        )
+        if created:
+            self.stdout.write(f'Created {len(created)} missing profile(s).')
+
+        tasks = Task.objects.all()
+        if options['user_ids']:
+            tasks = tasks.filter(user_id__in=options['user_ids'])
+        moved = tasks.refresh_deadlines()
+        if moved:
+            self.stdout.write(f'Moved {moved} task deadline(s).')
+
+        corrected = UserProfile.recount_task_counters(options['user_ids'])
+        UserProfile.recount_expiry(options['user_ids'])
+
+        self.stdout.write(self.style.SUCCESS(f'Reconciled task counters; {corrected} profile(s) had drifted.'))
@@ -0,0 +1,56 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.utils import timezone
+
+from .models import UserProfile, get_zone
+
+# The signed-in user's time zone name, so it is looked up once per session
+TIMEZONE_SESSION_KEY = '_time_zone'
+
+
+class UserTimezoneMiddleware:
+    """
+    Activate the signed-in user's time zone (UserProfile.time_zone) for the request.
+
+    Dates are then shown in it, and "today", the due date of a new task and
+    the calendar days are all reckoned in it, matching Task.due_at. Works
+    under WSGI and ASGI without a thread hop.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        name = request.session.get(TIMEZONE_SESSION_KEY)
+        if name is None and request.user.is_authenticated:
+            name = request.session[TIMEZONE_SESSION_KEY] = self.get_zone_name(request.user)
+        if name is None:
+            return self.get_response(request)
+        with timezone.override(get_zone(name)):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        name = await request.session.aget(TIMEZONE_SESSION_KEY)
+        if name is None:
+            user = await request.auser()
+            if user.is_authenticated:
+                name = await sync_to_async(self.get_zone_name)(user)
+                await request.session.aset(TIMEZONE_SESSION_KEY, name)
+        if name is None:
+            return await self.get_response(request)
+        with timezone.override(get_zone(name)):
+            return await self.get_response(request)
+
+    def get_zone_name(self, user):
+        return UserProfile.objects.filter(user=user).values_list('time_zone', flat=True).first() or ''
+
+
+def remember_timezone(request, name):
+    """Switch the session to a new zone after the user changed it"""
+    request.session[TIMEZONE_SESSION_KEY] = name or ''
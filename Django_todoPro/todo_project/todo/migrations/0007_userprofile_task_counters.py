@@ -0,0 +1,53 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:34
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+def backfill_task_counters(apps, schema_editor):
+    Task = apps.get_model('todo', 'Task')
+    UserProfile = apps.get_model('todo', 'UserProfile')
+
+    def task_count(condition=Q()):
+        tasks = Task.objects.filter(condition, user=OuterRef('user')).order_by().values('user')
+        return Coalesce(Subquery(tasks.annotate(count=Count('id')).values('count')), 0)
+
+    UserProfile.objects.update(
+        tasks_total=task_count(),
+        tasks_done=task_count(Q(done=True)),
+        tasks_pending=task_count(Q(done=False)),
+        tasks_expired=task_count(Q(due_date__date__lt=timezone.localdate(), done=False)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0006_task_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='tasks_done',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='tasks_expired',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='tasks_pending',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='tasks_total',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_task_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0010_task_updated_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='repeats',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.CreateModel(
+            name='RecurrenceRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('freq', models.CharField(choices=[('DAILY', 'Daily'), ('WEEKLY', 'Weekly'), ('MONTHLY', 'Monthly'), ('YEARLY', 'Yearly')], max_length=10)),
+                ('interval', models.PositiveSmallIntegerField(default=1)),
+                ('byweekday', models.CharField(blank=True, max_length=20)),
+                ('until', models.DateField(blank=True, null=True)),
+                ('count', models.PositiveIntegerField(blank=True, null=True)),
+                ('task', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='recurrence', to='todo.task')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='OccurrenceException',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('occurrence', models.DateField()),
+                ('status', models.CharField(choices=[('done', 'Done'), ('skipped', 'Skipped')], default='done', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occurrence_exceptions', to='todo.task')),
+            ],
+            options={
+                'ordering': ['occurrence'],
+                'constraints': [models.UniqueConstraint(fields=('task', 'occurrence'), name='occurrence_exception_once')],
+            },
+        ),
+    ]
@@ -0,0 +1,78 @@
+from django.db import migrations, OperationalError
+
+# FTS5 index over todo_task.title, kept in sync by the triggers below.
+# Each row also carries its owner as a "u<user_id>" token, so a per-user
+# search is an intersection of two posting lists inside FTS5 and only the
+# user's matches are ranked. Prefix indexes on 2 and 3 characters keep
+# short "abc*" prefix queries fast.
+CREATE_STATEMENTS = [
+    """
+    CREATE VIRTUAL TABLE todo_task_fts USING fts5(
+        title,
+        owner,
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER todo_task_fts_insert AFTER INSERT ON todo_task BEGIN
+        INSERT INTO todo_task_fts(rowid, title, owner) VALUES (new.id, new.title, 'u' || ifnull(new.user_id, ''));
+    END
+    """,
+    """
+    CREATE TRIGGER todo_task_fts_delete AFTER DELETE ON todo_task BEGIN
+        DELETE FROM todo_task_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER todo_task_fts_update AFTER UPDATE OF title, user_id ON todo_task BEGIN
+        UPDATE todo_task_fts SET title = new.title, owner = 'u' || ifnull(new.user_id, '') WHERE rowid = old.id;
+    END
+    """,
+    # Index the rows that already exist
+    """
+    INSERT INTO todo_task_fts(rowid, title, owner)
+    SELECT id, title, 'u' || ifnull(user_id, '') FROM todo_task
+    """,
+]
+
+DROP_STATEMENTS = [
+    'DROP TRIGGER IF EXISTS todo_task_fts_update',
+    'DROP TRIGGER IF EXISTS todo_task_fts_delete',
+    'DROP TRIGGER IF EXISTS todo_task_fts_insert',
+    'DROP TABLE IF EXISTS todo_task_fts',
+]
+
+
+def create_title_index(apps, schema_editor):
+    # Other backends search with icontains (see todo/search.py)
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        except OperationalError:
+            return
+        if not cursor.fetchone()[0]:
+            return
+        for statement in CREATE_STATEMENTS:
+            cursor.execute(statement)
+
+
+def drop_title_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for statement in DROP_STATEMENTS:
+            cursor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0011_recurrence'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_title_index, drop_title_index),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0013_apitoken'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(condition=models.Q(('tasks_total', 0)), fields=['user'], name='profile_no_tasks_idx'),
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:48
+
+from datetime import datetime, time, timedelta
+
+import todo.models
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+def backfill_task_deadlines(apps, schema_editor):
+    # Every profile's time zone is still blank, so deadlines are local to TIME_ZONE
+    Task = apps.get_model('todo', 'Task')
+    UserProfile = apps.get_model('todo', 'UserProfile')
+    tz = timezone.get_default_timezone()
+
+    tasks = []
+    for task in Task.objects.only('id', 'due_date', 'due_time').iterator(chunk_size=2000):
+        day = timezone.localtime(task.due_date, tz).date()
+        if task.due_time is not None:
+            task.due_at = timezone.make_aware(datetime.combine(day, task.due_time), tz)
+        else:
+            task.due_at = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min), tz)
+        tasks.append(task)
+        if len(tasks) == 2000:
+            Task.objects.bulk_update(tasks, ['due_at'])
+            tasks = []
+    Task.objects.bulk_update(tasks, ['due_at'])
+
+    now = timezone.now()
+    open_tasks = Task.objects.filter(user=OuterRef('user'), done=False, repeats=False).order_by()
+    expired = open_tasks.filter(due_at__lt=now).values('user').annotate(count=Count('id')).values('count')
+    upcoming = open_tasks.filter(due_at__gte=now).order_by('due_at').values('due_at')[:1]
+    UserProfile.objects.update(
+        tasks_expired=Coalesce(Subquery(expired), 0),
+        tasks_next_expiry=Subquery(upcoming),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0014_userprofile_no_tasks_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_user_pending_due_idx',
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='due_at',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='tasks_next_expiry',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='time_zone',
+            field=models.CharField(blank=True, default='', max_length=63, validators=[todo.models.validate_timezone]),
+        ),
+        migrations.RunPython(backfill_task_deadlines, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='task',
+            name='due_at',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['user', 'due_at'], name='task_user_deadline_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('done', False)), fields=['user', 'due_at'], name='task_user_pending_deadline_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('done', False)), fields=['due_at'], name='task_pending_deadline_idx'),
+        ),
+    ]
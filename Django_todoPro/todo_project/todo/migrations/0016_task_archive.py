@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:54
+
+import django.db.models.deletion
+import django.db.models.functions.datetime
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0015_task_deadline'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='tasks_archived',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='TaskArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200)),
+                ('due_date', models.DateTimeField()),
+                ('due_time', models.TimeField(blank=True, null=True)),
+                ('done', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField()),
+                ('repeats', models.BooleanField(default=False)),
+                ('due_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(db_default=django.db.models.functions.datetime.Now())),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_tasks', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['due_date'],
+                'indexes': [models.Index(fields=['user', 'due_date', 'id'], name='archive_user_due_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-17 03:12
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0016_task_archive'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_pending_due_idx',
+        ),
+    ]
@@ -0,0 +1,23 @@
+from importlib import import_module
+
+from django.db import migrations
+
+title_fts = import_module('todo.migrations.0012_task_title_fts')
+
+
+def rebuild_title_index(apps, schema_editor):
+    # SQLite alters todo_task by copying it into a new table, which drops the
+    # FTS triggers (0015 did); rebuild the index and its triggers from scratch
+    title_fts.drop_title_index(apps, schema_editor)
+    title_fts.create_title_index(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0017_remove_task_pending_due_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_title_index, migrations.RunPython.noop),
+    ]
@@ -1,29 +1,350 @@
-from django.db import models
+import hashlib
+import secrets
+from contextvars import ContextVar
+from datetime import datetime, time, timedelta
+from functools import lru_cache, reduce
+from operator import or_
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError, available_timezones
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
 from django.utils import timezone
-from django.db.models import QuerySet, Manager
+from django.db.models import QuerySet, Manager, Count, Exists, Q, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Least, Now, TruncDate
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
+from .database import apply_sqlite_pragmas
+from .fragments import invalidate_task_card
+from .events import EVENT_CREATED, EVENT_UPDATED, EVENT_DELETED, get_hub
+from .search import SEARCH_LIMIT, search_tasks
+from .recurrence import FREQUENCIES, WEEKDAYS, MAX_COUNT, Occurrence, expand, parse_weekdays
+
+
+# Fields whose changes move the per-user task counters on UserProfile
+COUNTED_TASK_FIELDS = {'user', 'user_id', 'done', 'due_date', 'due_time', 'repeats'}
+
+# Set while a bulk TaskQuerySet operation maintains the counters itself
+_task_counter_signals_suspended = ContextVar('task_counter_signals_suspended', default=False)
+
+# Collects (user_id, task_id, None) for the tasks a TaskQuerySet.delete() removes, to announce them grouped
+_task_deleted_events = ContextVar('task_deleted_events', default=None)
+
+
+# Task fields the deadline (Task.due_at) is computed from
+DEADLINE_TASK_FIELDS = {'user', 'user_id', 'due_date', 'due_time'}
+
+
+def expired_condition(now=None):
+    # A recurring series never expires as a whole; only its occurrences do
+    return Q(due_at__lt=now or timezone.now(), done=False, repeats=False)
+
+
+@lru_cache(maxsize=None)
+def get_zone(name):
+    """The time zone called ``name``, or the default one (TIME_ZONE) for a blank or unknown name"""
+    try:
+        return ZoneInfo(name) if name else timezone.get_default_timezone()
+    except (ZoneInfoNotFoundError, ValueError):
+        return timezone.get_default_timezone()
+
+
+@lru_cache(maxsize=None)
+def timezone_names():
+    """The IANA time zone names, sorted; reading them scans the tz database, so once"""
+    return tuple(sorted(available_timezones()))
+
+
+def validate_timezone(name):
+    if name and name not in timezone_names():
+        raise ValidationError(f'"{name}" is not a known time zone.')
+
+
+def local_midnight(day):
+    """The start of ``day`` in the current time zone"""
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
+def effective_due(due_date, due_time, tz=None):
+    """The moment a task is due: its due date at ``due_time`` (local to ``tz``) when one is set"""
+    if due_time is None:
+        return due_date
+    tz = tz or timezone.get_current_timezone()
+    return timezone.make_aware(datetime.combine(timezone.localtime(due_date, tz).date(), due_time), tz)
+
+
+def task_deadline(due_date, due_time, tz=None):
+    """
+    The moment a task expires: ``due_time`` on its due date when one is set,
+    else the end of the due date, both in ``tz`` (the owner's time zone).
+    """
+    if due_time is not None:
+        return effective_due(due_date, due_time, tz)
+    tz = tz or timezone.get_current_timezone()
+    day = timezone.localtime(due_date, tz).date() + timedelta(days=1)
+    return timezone.make_aware(datetime.combine(day, time.min), tz)
+
+
+def merge_upcoming_deadline(deadlines, task, now):
+    """Keep the earliest deadline per user among the open one-off ``task``s still to expire"""
+    if task.user_id is None or task.done or task.repeats or task.due_at <= now:
+        return deadlines
+    current = deadlines.get(task.user_id)
+    if current is None or task.due_at < current:
+        deadlines[task.user_id] = task.due_at
+    return deadlines
+
+
+def merge_counter_deltas(deltas, user_id, total=0, done=0, expired=0):
+    """Accumulate per-user changes to the UserProfile task counters"""
+    if user_id is None:
+        return deltas
+    changes = deltas.setdefault(user_id, {
+        'tasks_total': 0, 'tasks_done': 0, 'tasks_pending': 0, 'tasks_expired': 0,
+    })
+    changes['tasks_total'] += total
+    changes['tasks_done'] += done
+    changes['tasks_pending'] += total - done
+    changes['tasks_expired'] += expired
+    return deltas
 
 
 class TaskQuerySet(QuerySet):
-    def expired(self):
-        now = timezone.now().date()
-        return self.filter(due_date__lt=now, done=False)
+    def expired(self, now=None):
+        # In deadline order, so the range scan on the pending-deadline index needs no sort
+        return self.filter(expired_condition(now)).by_deadline()
+
+    def by_deadline(self):
+        return self.order_by('due_at', 'id')
+
+    def refresh_deadlines(self, batch_size=1000):
+        """
+        Recompute due_at for these tasks, after a change that bypassed
+        Task.save(): a queryset update of their due date or owner, or a
+        new owner time zone. Returns the number of tasks whose deadline moved.
+
+        Tasks are read and written in id-keyset chunks of ``batch_size``, so
+        only one chunk is in memory at a time.
+        """
+        tasks = self.only('id', 'user_id', 'due_date', 'due_time', 'due_at').order_by('id')
+        # A plain QuerySet, so the counters and events are left to the caller
+        writer = QuerySet(Task, using=self.db)
+        zones = {}
+        moved = 0
+        last_id = 0
+        while chunk := list(tasks.filter(id__gt=last_id)[:batch_size]):
+            last_id = chunk[-1].id
+            zones.update(UserProfile.timezones_for({task.user_id for task in chunk} - zones.keys()))
+            changed = []
+            for task in chunk:
+                due_at = task_deadline(task.due_date, task.due_time, zones.get(task.user_id))
+                if due_at != task.due_at:
+                    task.due_at = due_at
+                    changed.append(task)
+            writer.bulk_update(changed, ['due_at'], batch_size=batch_size)
+            moved += len(changed)
+        return moved
+
+    refresh_deadlines.alters_data = True
+
+    def due_between(self, start=None, end=None):
+        """Tasks due on or after ``start`` and before ``end`` (either may be None)"""
+        queryset = self
+        if start is not None:
+            queryset = queryset.filter(due_date__gte=start)
+        if end is not None:
+            queryset = queryset.filter(due_date__lt=end)
+        return queryset
+
+    def one_off(self):
+        return self.filter(repeats=False)
+
+    def search(self, text, user=None, limit=SEARCH_LIMIT):
+        """Ranked title search within this queryset, optionally one user's (see todo/search.py)"""
+        return search_tasks(self, text, user=user, limit=limit)
+
+    def recurring_between(self, start, end):
+        """Open recurring series that may have occurrences on local dates in [start, end)"""
+        return (
+            self.filter(repeats=True, done=False, due_date__lt=local_midnight(end))
+            .filter(Q(recurrence__until__isnull=True) | Q(recurrence__until__gte=start))
+            .select_related('recurrence')
+        )
+
+    def occurrences_between(self, start, end):
+        """
+        Expanded occurrences on local dates in [start, end), ordered by date.
+
+        Nothing is materialized: each series is expanded in memory for just
+        this window, and the exception rows for the window come from one query.
+        """
+        occurrences = Task.attach_occurrences(list(self.recurring_between(start, end)), start, end)
+        occurrences.sort(key=lambda occurrence: occurrence.sort_key())
+        return occurrences
+
+    def day_buckets(self, start, end):
+        """Per-day task counts for tasks due in [start, end), as one grouped range query"""
+        return (
+            self.due_between(start, end)
+            .annotate(day=TruncDate('due_date'))
+            .values('day')
+            .annotate(
+                total=Count('id'),
+                completed=Count('id', filter=Q(done=True)),
+                expired=Count('id', filter=expired_condition()),
+            )
+            .order_by('day')
+        )
+
+    def weekly_stats(self, weeks=4):
+        """
+        Task counts per week (by due date) for the last ``weeks`` weeks,
+        oldest first, ending with the current week, in a single
+        conditional-aggregate query over just that date range. The totals
+        come from the UserProfile counters instead.
+        """
+        week_start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        week_start -= timedelta(days=week_start.weekday())
+        week_bounds = [
+            (week_start - timedelta(weeks=offset), week_start - timedelta(weeks=offset - 1))
+            for offset in reversed(range(weeks))
+        ]
+
+        aggregates = {}
+        for index, (start, end) in enumerate(week_bounds):
+            in_week = Q(due_date__gte=start, due_date__lt=end)
+            aggregates[f'week_{index}_total'] = Count('id', filter=in_week)
+            aggregates[f'week_{index}_completed'] = Count('id', filter=in_week & Q(done=True))
+        counts = self.due_between(week_bounds[0][0], week_bounds[-1][1]).aggregate(**aggregates)
+
+        weekly = []
+        for index, (start, end) in enumerate(week_bounds):
+            week_total = counts[f'week_{index}_total']
+            week_completed = counts[f'week_{index}_completed']
+            weekly.append({
+                'week_start': start.date(),
+                'total': week_total,
+                'completed': week_completed,
+                'completion_rate': round((week_completed / week_total * 100) if week_total > 0 else 0, 2),
+            })
+        return weekly
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        Task.set_deadlines(objs)
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            if kwargs.get('ignore_conflicts') or kwargs.get('update_conflicts'):
+                # We cannot tell which rows were actually inserted
+                user_ids = {obj.user_id for obj in objs}
+                UserProfile.recount_task_counters(user_ids)
+                UserProfile.recount_expiry(user_ids)
+                UserProfile.touch_tasks(user_ids)
+                for user_id in user_ids:
+                    get_hub().publish(user_id, EVENT_CREATED)
+            else:
+                deltas = {}
+                deadlines = {}
+                now = timezone.now()
+                for obj in objs:
+                    user_id, done, expired = obj.counter_state(now)
+                    merge_counter_deltas(deltas, user_id, total=1, done=int(done), expired=int(expired))
+                    merge_upcoming_deadline(deadlines, obj, now)
+                    obj._counted_state = (user_id, done, expired)
+                UserProfile.apply_task_counter_deltas(deltas, deadlines)
+                get_hub().publish_tasks(EVENT_CREATED, objs)
+        return objs
+
+    def update(self, **kwargs):
+        # auto_now is not applied by QuerySet.update()
+        kwargs.setdefault('updated_at', timezone.now())
+        with transaction.atomic(using=self.db):
+            user_ids = set(self.order_by().values_list('user_id', flat=True).distinct())
+            if DEADLINE_TASK_FIELDS & kwargs.keys():
+                # The rows may stop matching this queryset once updated
+                task_ids = list(self.values_list('pk', flat=True))
+            rows = super().update(**kwargs)
+            if DEADLINE_TASK_FIELDS & kwargs.keys():
+                Task.objects.filter(pk__in=task_ids).refresh_deadlines()
+            if COUNTED_TASK_FIELDS & kwargs.keys():
+                new_user = kwargs.get('user', kwargs.get('user_id'))
+                user_ids.add(getattr(new_user, 'pk', new_user))
+                UserProfile.recount_task_counters(user_ids)
+                UserProfile.recount_expiry(user_ids)
+            # Any change, even a title alone, moves the owners' watermark
+            UserProfile.touch_tasks(user_ids)
+            for user_id in user_ids:
+                get_hub().publish(user_id, EVENT_UPDATED)
+        return rows
+
+    update.alters_data = True
+
+    def delete(self):
+        with transaction.atomic(using=self.db):
+            removed = self.order_by().values('user_id').annotate(
+                removed_total=Count('id'),
+                removed_done=Count('id', filter=Q(done=True)),
+                removed_expired=Count('id', filter=expired_condition()),
+            )
+            deltas = {}
+            for row in removed:
+                merge_counter_deltas(
+                    deltas, row['user_id'],
+                    total=-row['removed_total'], done=-row['removed_done'], expired=-row['removed_expired'],
+                )
+
+            deleted = []
+            token = _task_counter_signals_suspended.set(True)
+            events_token = _task_deleted_events.set(deleted)
+            try:
+                result = super().delete()
+            finally:
+                _task_counter_signals_suspended.reset(token)
+                _task_deleted_events.reset(events_token)
+
+            UserProfile.apply_task_counter_deltas(deltas)
+            get_hub().publish_many(EVENT_DELETED, deleted)
+        return result
+
+    delete.alters_data = True
+    delete.queryset_only = True
 
     def users_without_tasks(self):
-        # Get all users who have at least one task
-        users_with_tasks = self.values_list('user__id', flat=True).distinct()
-        # Return users who are NOT in the above list
-        return User.objects.exclude(id__in=users_with_tasks)
+        # Anti-join: one probe of the (user, due_date) index per user, instead of
+        # a DISTINCT over the whole task table fed into NOT IN
+        return User.objects.filter(~Exists(self.filter(user=OuterRef('pk'))))
 
 
 class TaskManager(Manager):
     def get_queryset(self):
         return TaskQuerySet(self.model, using=self._db)
 
-    def expired(self):
-        return self.get_queryset().expired()
+    def expired(self, now=None):
+        return self.get_queryset().expired(now)
+
+    def by_deadline(self):
+        return self.get_queryset().by_deadline()
+
+    def due_between(self, start=None, end=None):
+        return self.get_queryset().due_between(start, end)
+
+    def one_off(self):
+        return self.get_queryset().one_off()
+
+    def search(self, text, user=None, limit=SEARCH_LIMIT):
+        return self.get_queryset().search(text, user=user, limit=limit)
+
+    def recurring_between(self, start, end):
+        return self.get_queryset().recurring_between(start, end)
+
+    def occurrences_between(self, start, end):
+        return self.get_queryset().occurrences_between(start, end)
+
+    def day_buckets(self, start, end):
+        return self.get_queryset().day_buckets(start, end)
+
+    def weekly_stats(self, weeks=4):
+        return self.get_queryset().weekly_stats(weeks=weeks)
 
     def users_without_tasks(self):
         return self.get_queryset().users_without_tasks()
@@ -36,21 +357,139 @@ class Task(models.Model):
     due_date = models.DateTimeField()
     due_time = models.TimeField(null=True, blank=True)
     done = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Mirrors whether a RecurrenceRule exists, so list and expiry queries need no join
+    repeats = models.BooleanField(default=False, editable=False)
+    # When the task expires (see task_deadline), in the owner's time zone; set on save,
+    # so expiry filters and deadline ordering are plain index range scans
+    due_at = models.DateTimeField(editable=False)
 
     # Use custom manager
     objects = TaskManager()
 
     class Meta:
         ordering = ['due_date']
+        indexes = [
+            # Per-user task list, ordered by due date
+            models.Index(fields=['user', 'due_date'], name='task_user_due_idx'),
+            # Per-user task list, ordered by deadline
+            models.Index(fields=['user', 'due_at'], name='task_user_deadline_idx'),
+            # Per-user expired lookups only ever touch incomplete tasks
+            models.Index(
+                fields=['user', 'due_at'],
+                condition=models.Q(done=False),
+                name='task_user_pending_deadline_idx',
+            ),
+            # Global expired lookups (TaskQuerySet.expired), the live expiry events and the reminder scheduler
+            models.Index(
+                fields=['due_at'],
+                condition=models.Q(done=False),
+                name='task_pending_deadline_idx',
+            ),
+            # Change feed for the reminder scheduler
+            models.Index(fields=['updated_at', 'id'], name='task_updated_idx'),
+        ]
 
     def __str__(self):
         if self.user:
             return f"{self.title} - {self.user.username}"
         return self.title
 
-    def is_past_due_and_incomplete(self):
-        now = timezone.now().date()
-        return self.due_date.date() < now and not self.done
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        deferred = instance.get_deferred_fields()
+        # Remember what the profile counters saw, so save() can apply a delta
+        if not deferred & {'user_id', 'done', 'due_date', 'due_time', 'due_at', 'repeats'}:
+            instance._counted_state = instance.counter_state()
+        # And what due_at was computed from, so save() only recomputes it after a change
+        if not deferred & {'user_id', 'due_date', 'due_time'}:
+            instance._deadline_state = instance.deadline_state()
+        return instance
+
+    def save(self, *args, **kwargs):
+        if self.due_at is None or getattr(self, '_deadline_state', None) != self.deadline_state():
+            self.due_at = task_deadline(self.due_date, self.due_time, UserProfile.timezone_for(self.user_id))
+            self._deadline_state = self.deadline_state()
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'due_at'}
+        super().save(*args, **kwargs)
+
+    def deadline_state(self):
+        return self.user_id, self.due_date, self.due_time
+
+    @staticmethod
+    def set_deadlines(tasks):
+        """Compute due_at for unsaved tasks, with one time zone query for all their owners"""
+        zones = UserProfile.timezones_for({task.user_id for task in tasks})
+        for task in tasks:
+            task.due_at = task_deadline(task.due_date, task.due_time, zones.get(task.user_id))
+            task._deadline_state = task.deadline_state()
+        return tasks
+
+    def is_past_due_and_incomplete(self, now=None):
+        return self.due_at < (now or timezone.now()) and not self.done and not self.repeats
+
+    @staticmethod
+    def flag_expired(tasks, now=None):
+        """
+        Set ``is_expired`` on already-fetched tasks in one pass, against one
+        shared reference time, so templates don't re-evaluate it per row.
+        """
+        now = now or timezone.now()
+        for task in tasks:
+            task.is_expired = task.is_past_due_and_incomplete(now)
+        return tasks
+
+    def get_due_datetime(self):
+        return effective_due(self.due_date, self.due_time)
+
+    def counter_state(self, now=None):
+        """(user_id, done, expired) as counted on the owner's UserProfile"""
+        return self.user_id, self.done, self.is_past_due_and_incomplete(now)
+
+    @staticmethod
+    def attach_occurrences(tasks, start, end):
+        """
+        Set ``occurrences`` on the repeating tasks among already-fetched
+        ``tasks``, for local dates in [start, end), and return them all.
+
+        Expects ``recurrence`` to be select_related. The window's exception
+        rows come from one query, and only if a repeating task is present.
+        """
+        series = [task for task in tasks if task.repeats]
+        if not series:
+            return []
+        rows = Task._occurrence_statuses(series, start, end)
+        return Task._set_occurrences(series, rows, start, end)
+
+    @staticmethod
+    async def aattach_occurrences(tasks, start, end):
+        """Async version of attach_occurrences"""
+        series = [task for task in tasks if task.repeats]
+        if not series:
+            return []
+        rows = [row async for row in Task._occurrence_statuses(series, start, end)]
+        return Task._set_occurrences(series, rows, start, end)
+
+    @staticmethod
+    def _occurrence_statuses(series, start, end):
+        return OccurrenceException.objects.filter(
+            task__in=series, occurrence__gte=start, occurrence__lt=end,
+        ).values_list('task_id', 'occurrence', 'status')
+
+    @staticmethod
+    def _set_occurrences(series, rows, start, end):
+        statuses = {(task_id, occurrence): status for task_id, occurrence, status in rows}
+        occurrences = []
+        for task in series:
+            task.occurrences = [
+                Occurrence(task, day, statuses.get((task.pk, day)))
+                for day in task.recurrence.occurrences(start, end)
+            ]
+            occurrences.extend(task.occurrences)
+        return occurrences
 
     @staticmethod
     def expired_tasks():
@@ -61,6 +500,216 @@ class Task(models.Model):
         return Task.objects.users_without_tasks()
 
 
+class TaskArchiveQuerySet(QuerySet):
+    """The TaskQuerySet filters that history reads apply to archived tasks too"""
+
+    def expired(self, now=None):
+        # Only completed tasks are archived
+        return self.none()
+
+    def due_between(self, start=None, end=None):
+        queryset = self
+        if start is not None:
+            queryset = queryset.filter(due_date__gte=start)
+        if end is not None:
+            queryset = queryset.filter(due_date__lt=end)
+        return queryset
+
+
+class TaskArchive(models.Model):
+    """
+    A completed task moved out of the task table by the archive_tasks command.
+
+    It keeps the task's id and columns, so history reads (the task export,
+    the API with ?archived=1) can read archived and live tasks as one
+    UNION ALL. The task table and its indexes then only hold the tasks
+    people work with.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_tasks', null=True, blank=True)
+    title = models.CharField(max_length=200)
+    due_date = models.DateTimeField()
+    due_time = models.TimeField(null=True, blank=True)
+    done = models.BooleanField(default=True)
+    updated_at = models.DateTimeField()
+    repeats = models.BooleanField(default=False)
+    due_at = models.DateTimeField()
+    archived_at = models.DateTimeField(db_default=Now())
+
+    objects = TaskArchiveQuerySet.as_manager()
+
+    # Columns copied from the task table, in the same order
+    COPIED_FIELDS = ('id', 'user', 'title', 'due_date', 'due_time', 'done', 'updated_at', 'repeats', 'due_at')
+
+    class Meta:
+        ordering = ['due_date']
+        indexes = [
+            # Per-user history in (due_date, id) order; id is not SQLite's rowid here, so it is listed
+            models.Index(fields=['user', 'due_date', 'id'], name='archive_user_due_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+class RecurrenceRule(models.Model):
+    """
+    How a task repeats: the supported subset of an RFC 5545 RRULE.
+
+    The task's due date is the first occurrence (DTSTART) and its due time
+    applies to every occurrence. Occurrences are never stored as rows; they
+    are expanded on demand for the window being shown.
+    """
+    FREQ_CHOICES = [(freq, freq.capitalize()) for freq in FREQUENCIES]
+
+    task = models.OneToOneField(Task, on_delete=models.CASCADE, related_name='recurrence')
+    freq = models.CharField(max_length=10, choices=FREQ_CHOICES)
+    interval = models.PositiveSmallIntegerField(default=1)
+    # Comma-separated weekday codes (MO,WE,FR) for weekly rules
+    byweekday = models.CharField(max_length=20, blank=True)
+    until = models.DateField(null=True, blank=True)
+    count = models.PositiveIntegerField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.to_rrule()} for {self.task.title}"
+
+    def clean(self):
+        parse_weekdays(self.byweekday)
+        if self.byweekday and self.freq != 'WEEKLY':
+            raise ValidationError({'byweekday': 'Weekdays can only be chosen for weekly repetition.'})
+        if self.interval < 1:
+            raise ValidationError({'interval': 'Interval must be at least 1.'})
+        if self.count is not None and not 1 <= self.count <= MAX_COUNT:
+            raise ValidationError({'count': f'Count must be between 1 and {MAX_COUNT}.'})
+
+    def to_rrule(self, start_time=None):
+        """
+        The RRULE value; pass the local ``start_time`` of a timed series.
+
+        RFC 5545 wants UNTIL in the form of DTSTART: a date for all-day series,
+        a floating date-time for the floating DTSTART of timed ones.
+        """
+        parts = [f'FREQ={self.freq}']
+        if self.interval != 1:
+            parts.append(f'INTERVAL={self.interval}')
+        if self.byweekday:
+            parts.append(f'BYDAY={self.byweekday}')
+        if self.until:
+            until = self.until if start_time is None else datetime.combine(self.until, start_time)
+            parts.append(f'UNTIL={until.strftime("%Y%m%d" if start_time is None else "%Y%m%dT%H%M%S")}')
+        if self.count:
+            parts.append(f'COUNT={self.count}')
+        return ';'.join(parts)
+
+    def get_display(self):
+        unit = {'DAILY': 'day', 'WEEKLY': 'week', 'MONTHLY': 'month', 'YEARLY': 'year'}[self.freq]
+        text = f'Every {unit}' if self.interval == 1 else f'Every {self.interval} {unit}s'
+        if self.byweekday:
+            names = dict(zip(WEEKDAYS, ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')))
+            text += ' on ' + ', '.join(names[day] for day in self.byweekday.split(','))
+        if self.until:
+            text += f' until {self.until.strftime("%b %d, %Y")}'
+        if self.count:
+            text += f', {self.count} times'
+        return text
+
+    def occurrences(self, start, end):
+        """Occurrence dates in [start, end); cached per rule and window"""
+        return expand(
+            self.freq, self.interval, self.byweekday, timezone.localtime(self.task.due_date).date(),
+            self.until, self.count, start, end,
+        )
+
+    def occurs_on(self, day):
+        return bool(self.occurrences(day, day + timedelta(days=1)))
+
+
+class OccurrenceException(models.Model):
+    """The only row an occurrence ever gets: it was completed or skipped"""
+    STATUS_DONE = 'done'
+    STATUS_SKIPPED = 'skipped'
+    STATUS_CHOICES = [
+        (STATUS_DONE, 'Done'),
+        (STATUS_SKIPPED, 'Skipped'),
+    ]
+
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='occurrence_exceptions')
+    occurrence = models.DateField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_DONE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['occurrence']
+        constraints = [
+            models.UniqueConstraint(fields=['task', 'occurrence'], name='occurrence_exception_once'),
+        ]
+
+    def __str__(self):
+        return f"{self.task.title} on {self.occurrence}: {self.status}"
+
+
+class ApiToken(models.Model):
+    """
+    Bearer token for the JSON API.
+
+    Only a SHA-256 hash of the key is stored; the key itself is shown once,
+    when the token is created.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='api_tokens')
+    name = models.CharField(max_length=100, blank=True)
+    key_hash = models.CharField(max_length=64, unique=True, editable=False)
+    prefix = models.CharField(max_length=8, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    def __str__(self):
+        return f"{self.prefix}... ({self.name or 'token'}) of {self.user.username}"
+
+    @staticmethod
+    def hash_key(key):
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    @classmethod
+    def create_for(cls, user, name=''):
+        """Create a token and return (token, key); the key cannot be recovered later"""
+        key = secrets.token_urlsafe(32)
+        token = cls.objects.create(user=user, name=name, key_hash=cls.hash_key(key), prefix=key[:8])
+        return token, key
+
+    @classmethod
+    def authenticate(cls, key):
+        """The active user owning ``key``, or None"""
+        try:
+            token = cls.objects.select_related('user').get(key_hash=cls.hash_key(key))
+        except cls.DoesNotExist:
+            return None
+        if not token.is_usable():
+            return None
+        if token.needs_touch():
+            cls.objects.filter(pk=token.pk).update(last_used_at=timezone.now())
+        return token.user
+
+    @classmethod
+    async def aauthenticate(cls, key):
+        """Async version of authenticate"""
+        try:
+            token = await cls.objects.select_related('user').aget(key_hash=cls.hash_key(key))
+        except cls.DoesNotExist:
+            return None
+        if not token.is_usable():
+            return None
+        if token.needs_touch():
+            await cls.objects.filter(pk=token.pk).aupdate(last_used_at=timezone.now())
+        return token.user
+
+    def is_usable(self):
+        return self.user.is_active
+
+    def needs_touch(self):
+        # Record usage at most hourly, so authenticating is normally a single read
+        return self.last_used_at is None or timezone.now() - self.last_used_at > timedelta(hours=1)
+
+
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     phone = models.CharField(max_length=20, blank=True, null=True)
@@ -68,22 +717,171 @@ class UserProfile(models.Model):
     bio = models.TextField(blank=True, null=True)
     birth_date = models.DateField(blank=True, null=True)
     join_date = models.DateTimeField(auto_now_add=True)
+    # IANA name such as "Europe/Paris"; blank means the site's TIME_ZONE
+    time_zone = models.CharField(max_length=63, blank=True, default='', validators=[validate_timezone])
+
+    # Denormalized task counters, maintained on every Task write and
+    # reconciled nightly by the reconcile_task_counters command
+    tasks_total = models.IntegerField(default=0)
+    tasks_done = models.IntegerField(default=0)
+    tasks_pending = models.IntegerField(default=0)
+    tasks_expired = models.IntegerField(default=0)
+    # Completed tasks moved to TaskArchive; not part of the counters above
+    tasks_archived = models.IntegerField(default=0)
+
+    # Moves on every write to the user's tasks; the watermark for conditional GETs
+    tasks_version = models.IntegerField(default=0)
+    tasks_modified_at = models.DateTimeField(null=True, blank=True)
+    # The next deadline of an open task, or an earlier moment: once it passes,
+    # tasks_expired is recounted on the next read (see expiry_passed)
+    tasks_next_expiry = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Users without tasks (UsersWithoutTasksView); only holds their rows
+            models.Index(fields=['user'], condition=models.Q(tasks_total=0), name='profile_no_tasks_idx'),
+        ]
+
+    COUNTER_FIELDS = (
+        'tasks_total', 'tasks_done', 'tasks_pending', 'tasks_expired', 'tasks_archived',
+        'tasks_version', 'tasks_modified_at', 'tasks_next_expiry',
+    )
 
     def __str__(self):
         return f"Profile of {self.user.username}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Task deadlines depend on it; see refresh_deadlines_on_time_zone_change
+        instance._loaded_time_zone = instance.__dict__.get('time_zone')
+        return instance
+
+    def get_timezone(self):
+        return get_zone(self.time_zone)
+
+    @classmethod
+    def timezones_for(cls, user_ids):
+        """{user_id: tzinfo} for ``user_ids``, in one query; users without a zone get the default one"""
+        user_ids = {user_id for user_id in user_ids if user_id is not None}
+        if not user_ids:
+            return {}
+        names = dict(cls.objects.filter(user_id__in=user_ids).values_list('user_id', 'time_zone'))
+        return {user_id: get_zone(names.get(user_id, '')) for user_id in user_ids}
+
+    @classmethod
+    def timezone_for(cls, user_id):
+        return cls.timezones_for([user_id]).get(user_id)
+
+    def save(self, *args, **kwargs):
+        # The counters only move through F() updates; a full save of a stale
+        # instance (e.g. from the User post_save hook) must not overwrite them
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     def get_task_statistics(self):
-        if hasattr(self.user, 'tasks'):
-            total = self.user.tasks.count()
-            completed = self.user.tasks.filter(done=True).count()
-            pending = self.user.tasks.filter(done=False).count()
-            return {
-                'total': total,
-                'completed': completed,
-                'pending': pending,
-                'completion_rate': round((completed / total * 100) if total > 0 else 0, 2)
-            }
-        return {'total': 0, 'completed': 0, 'pending': 0, 'completion_rate': 0}
+        # Archived tasks are completed ones, so the totals still include them
+        total = self.tasks_total + self.tasks_archived
+        completed = self.tasks_done + self.tasks_archived
+        return {
+            'total': total,
+            'completed': completed,
+            'pending': self.tasks_pending,
+            'expired': self.tasks_expired,
+            'archived': self.tasks_archived,
+            'completion_rate': round((completed / total * 100) if total > 0 else 0, 2)
+        }
+
+    def expiry_passed(self, now=None):
+        """Whether a task may have expired since tasks_expired was last counted"""
+        return self.tasks_next_expiry is not None and self.tasks_next_expiry <= (now or timezone.now())
+
+    def refresh_expired(self):
+        """Recount tasks_expired and the next deadline after one passed, and move the watermark"""
+        UserProfile.recount_expiry([self.user_id])
+        UserProfile.touch_tasks([self.user_id])
+        self.refresh_from_db(fields=self.COUNTER_FIELDS)
+
+    @classmethod
+    def apply_task_counter_deltas(cls, deltas, deadlines=None):
+        """
+        Every user in ``deltas`` also has its task watermark moved.
+        ``deadlines`` maps users to an upcoming deadline of one of their tasks.
+        """
+        now = timezone.now()
+        deadlines = deadlines or {}
+        for user_id, changes in deltas.items():
+            changes = {field: F(field) + delta for field, delta in changes.items() if delta}
+            if deadlines.get(user_id) is not None:
+                deadline = Value(deadlines[user_id], output_field=models.DateTimeField())
+                changes['tasks_next_expiry'] = Least(Coalesce('tasks_next_expiry', deadline), deadline)
+            cls.objects.filter(user_id=user_id).update(
+                tasks_version=F('tasks_version') + 1,
+                tasks_modified_at=now,
+                **changes
+            )
+
+    @classmethod
+    def touch_tasks(cls, user_ids):
+        cls.objects.filter(user_id__in=[user_id for user_id in user_ids if user_id is not None]).update(
+            tasks_version=F('tasks_version') + 1,
+            tasks_modified_at=timezone.now(),
+        )
+
+    @classmethod
+    def recount_task_counters(cls, user_ids=None):
+        """
+        Recompute the task counters from the task table.
+
+        Only profiles whose counters have drifted are written. Returns the
+        number of profiles that were corrected.
+        """
+        def task_count(condition=Q(), model=None):
+            tasks = (model or Task).objects.filter(condition, user=OuterRef('user')).order_by().values('user')
+            return Coalesce(Subquery(tasks.annotate(count=Count('id')).values('count')), 0)
+
+        actual = {
+            'tasks_total': task_count(),
+            'tasks_done': task_count(Q(done=True)),
+            'tasks_pending': task_count(Q(done=False)),
+            'tasks_expired': task_count(expired_condition()),
+            'tasks_archived': task_count(model=TaskArchive),
+        }
+
+        profiles = cls.objects.all()
+        if user_ids is not None:
+            profiles = profiles.filter(user_id__in=[user_id for user_id in user_ids if user_id is not None])
+
+        drifted = profiles.alias(**{f'actual_{field}': value for field, value in actual.items()}).filter(
+            reduce(or_, [~Q(**{field: F(f'actual_{field}')}) for field in actual])
+        )
+        return cls.objects.filter(pk__in=drifted.values('pk')).update(**actual)
+
+    @classmethod
+    def recount_expiry(cls, user_ids=None):
+        """Recompute tasks_expired and tasks_next_expiry from the task deadlines, as of now"""
+        now = timezone.now()
+        expired = Task.objects.filter(expired_condition(now), user=OuterRef('user')).order_by().values('user')
+        upcoming = Task.objects.filter(
+            user=OuterRef('user'), done=False, repeats=False, due_at__gte=now,
+        ).order_by('due_at').values('due_at')
+
+        profiles = cls.objects.all()
+        if user_ids is not None:
+            profiles = profiles.filter(user_id__in=[user_id for user_id in user_ids if user_id is not None])
+        return profiles.update(
+            tasks_expired=Coalesce(Subquery(expired.annotate(count=Count('id')).values('count')), 0),
+            tasks_next_expiry=Subquery(upcoming[:1]),
+        )
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    apply_sqlite_pragmas(connection)
 
 
 @receiver(post_save, sender=User)
@@ -95,4 +893,112 @@ def create_user_profile(sender, instance, created, **kwargs):
 @receiver(post_save, sender=User)
 def save_user_profile(sender, instance, **kwargs):
     if hasattr(instance, 'profile'):
-        instance.profile.save()
\ No newline at end of file
+        instance.profile.save()
+
+
+@receiver(post_save, sender=UserProfile)
+def refresh_deadlines_on_time_zone_change(sender, instance, created, update_fields, **kwargs):
+    if update_fields is not None and 'time_zone' not in update_fields:
+        return
+    loaded = getattr(instance, '_loaded_time_zone', None)
+    instance._loaded_time_zone = instance.time_zone
+    if created or loaded is None or loaded == instance.time_zone:
+        return
+    # Deadlines move, so some tasks may expire or stop being expired
+    if Task.objects.filter(user_id=instance.user_id).refresh_deadlines():
+        UserProfile.recount_task_counters([instance.user_id])
+        UserProfile.recount_expiry([instance.user_id])
+        UserProfile.touch_tasks([instance.user_id])
+        get_hub().publish(instance.user_id, EVENT_UPDATED)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def invalidate_task_card_cache(sender, instance, **kwargs):
+    # Connected before the counter receivers, which replace _counted_state
+    previous_state = getattr(instance, '_counted_state', None)
+    previous_user_id = previous_state[0] if previous_state else instance.user_id
+    invalidate_task_card(instance.pk, instance.user_id, previous_user_id)
+
+
+@receiver(post_save, sender=Task)
+def update_task_counters_on_save(sender, instance, created, **kwargs):
+    if _task_counter_signals_suspended.get():
+        return
+
+    new_state = instance.counter_state()
+    old_state = None if created else getattr(instance, '_counted_state', None)
+
+    if not created and old_state is None:
+        # Saved without being loaded from the database; the old state is unknown
+        UserProfile.recount_task_counters([instance.user_id])
+        UserProfile.recount_expiry([instance.user_id])
+        UserProfile.touch_tasks([instance.user_id])
+    else:
+        deltas = {}
+        if old_state is not None:
+            user_id, done, expired = old_state
+            merge_counter_deltas(deltas, user_id, total=-1, done=-int(done), expired=-int(expired))
+        user_id, done, expired = new_state
+        merge_counter_deltas(deltas, user_id, total=1, done=int(done), expired=int(expired))
+        deadlines = merge_upcoming_deadline({}, instance, timezone.now())
+        UserProfile.apply_task_counter_deltas(deltas, deadlines)
+
+    instance._counted_state = new_state
+
+
+@receiver(post_delete, sender=Task)
+def update_task_counters_on_delete(sender, instance, **kwargs):
+    if _task_counter_signals_suspended.get():
+        return
+
+    user_id, done, expired = getattr(instance, '_counted_state', None) or instance.counter_state()
+    deltas = merge_counter_deltas({}, user_id, total=-1, done=-int(done), expired=-int(expired))
+    UserProfile.apply_task_counter_deltas(deltas)
+
+
+def set_task_repeats(rule, repeats):
+    # Goes through TaskQuerySet.update(), which recounts the owner's counters,
+    # moves their watermark and bumps updated_at (so cached cards refresh)
+    Task.objects.filter(pk=rule.task_id).update(repeats=repeats)
+    if RecurrenceRule.task.is_cached(rule):
+        # Keep an in-memory task consistent, in case the caller saves it again
+        task = rule.task
+        task.repeats = repeats
+        task._counted_state = task.counter_state()
+
+
+@receiver(post_save, sender=RecurrenceRule)
+def mark_task_repeating(sender, instance, **kwargs):
+    set_task_repeats(instance, True)
+
+
+@receiver(post_delete, sender=RecurrenceRule)
+def mark_task_one_off(sender, instance, origin=None, **kwargs):
+    # Rules removed along with their task need no update
+    if isinstance(origin, RecurrenceRule) or getattr(origin, 'model', None) is RecurrenceRule:
+        set_task_repeats(instance, False)
+
+
+@receiver(post_save, sender=OccurrenceException)
+@receiver(post_delete, sender=OccurrenceException)
+def touch_tasks_on_occurrence_change(sender, instance, **kwargs):
+    user_ids = list(Task.objects.filter(pk=instance.task_id).values_list('user_id', flat=True))
+    UserProfile.touch_tasks(user_ids)
+    for user_id in user_ids:
+        get_hub().publish(user_id, EVENT_UPDATED, instance.task_id)
+
+
+@receiver(post_save, sender=Task)
+def publish_task_saved(sender, instance, created, **kwargs):
+    get_hub().publish_tasks(EVENT_CREATED if created else EVENT_UPDATED, [instance])
+
+
+@receiver(post_delete, sender=Task)
+def publish_task_deleted(sender, instance, **kwargs):
+    deleted = _task_deleted_events.get()
+    if deleted is not None:
+        # Read now: the pk is cleared once the deletion finishes
+        deleted.append((instance.user_id, instance.pk, None))
+    else:
+        get_hub().publish_tasks(EVENT_DELETED, [instance])
@@ -0,0 +1,178 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+class KeysetPage:
+    """One page of results plus the opaque cursors needed to move around it"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Cursor pagination over a unique, ascending key such as (due_date, id).
+
+    Each page is a single index range read of ``per_page + 1`` rows, so the
+    cost does not grow with how deep the page is, unlike OFFSET paging.
+    Rows may be model instances or values() dicts that include the key.
+
+    ``union`` holds more values() querysets with the same columns (such as
+    archived tasks) to page through together with ``queryset``. Each one
+    gets the cursor condition, and the page is one ORDER BY ... LIMIT over
+    their UNION ALL, which the database can answer by merging index scans.
+    """
+
+    def __init__(self, queryset, per_page, ordering=('due_date', 'id'), union=()):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.union = tuple(union)
+        self.fields = [queryset.model._meta.get_field(name) for name in self.ordering]
+
+    def key_values(self, row):
+        """The ordering key of a model instance or a values() dict, as strings"""
+        if not isinstance(row, dict):
+            return [field.value_to_string(row) for field in self.fields]
+        values = []
+        for name in self.ordering:
+            value = row[name]
+            values.append('' if value is None else value.isoformat() if hasattr(value, 'isoformat') else str(value))
+        return values
+
+    def encode_cursor(self, obj, backwards=False):
+        payload = {
+            'k': self.key_values(obj),
+            'b': int(backwards),
+        }
+        raw = json.dumps(payload, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            payload = json.loads(raw)
+            values = payload['k']
+            if len(values) != len(self.fields):
+                raise InvalidCursor(cursor)
+            key = [field.to_python(value) for field, value in zip(self.fields, values)]
+            return key, bool(payload.get('b'))
+        except (binascii.Error, ValueError, TypeError, KeyError, ValidationError):
+            raise InvalidCursor(cursor)
+
+    def _seek(self, key, backwards):
+        """
+        Build ``(f1, f2, ...) > (v1, v2, ...)`` (or ``<``) as nested Q objects.
+
+        The leading column is also bounded with gte/lte so the database can
+        use it as an index range, not only as a filter.
+        """
+        op = 'lt' if backwards else 'gt'
+        condition = Q()
+        for position in reversed(range(len(self.ordering))):
+            name = self.ordering[position]
+            step = Q(**{f'{name}__{op}': key[position]})
+            if position < len(self.ordering) - 1:
+                step |= Q(**{name: key[position]}) & condition
+            condition = step
+        bound = 'lte' if backwards else 'gte'
+        return Q(**{f'{self.ordering[0]}__{bound}': key[0]}) & condition
+
+    def page_queryset(self, cursor=None):
+        """The queryset of one page's rows (plus one to detect more) and its direction"""
+        backwards = False
+        querysets = [self.queryset, *self.union]
+
+        if cursor:
+            key, backwards = self.decode_cursor(cursor)
+            seek = self._seek(key, backwards)
+            querysets = [queryset.filter(seek) for queryset in querysets]
+
+        queryset = querysets[0]
+        if len(querysets) > 1:
+            queryset = queryset.order_by().union(*[other.order_by() for other in querysets[1:]], all=True)
+        queryset = queryset.order_by(*[f'-{name}' if backwards else name for name in self.ordering])
+        return queryset[:self.per_page + 1], backwards
+
+    def build_page(self, rows, cursor, backwards):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if backwards:
+            rows.reverse()
+            has_next = True
+            has_previous = has_more
+        else:
+            has_next = has_more
+            has_previous = bool(cursor)
+
+        return KeysetPage(
+            rows,
+            next_cursor=self.encode_cursor(rows[-1]) if has_next else None,
+            previous_cursor=self.encode_cursor(rows[0], backwards=True) if has_previous else None,
+        )
+
+    def get_page(self, cursor=None):
+        queryset, backwards = self.page_queryset(cursor)
+        rows = list(queryset)
+        if not rows:
+            # Everything before the cursor is gone; start over from the top
+            return self.get_page() if backwards else KeysetPage(rows)
+        return self.build_page(rows, cursor, backwards)
+
+    async def aget_page(self, cursor=None):
+        """Async version of get_page, reading the rows with the async ORM"""
+        queryset, backwards = self.page_queryset(cursor)
+        rows = [row async for row in queryset]
+        if not rows:
+            return await self.aget_page() if backwards else KeysetPage(rows)
+        return self.build_page(rows, cursor, backwards)
+
+
+class KeysetPaginationMixin:
+    """
+    Plugs KeysetPaginator into ListView in place of Django's page-number paginator.
+
+    The current page is available as ``page_obj`` with ``next_cursor`` and
+    ``previous_cursor``; the object list in the context is the page's rows.
+    """
+    paginate_by = 50
+    cursor_kwarg = 'cursor'
+    keyset_ordering = ('due_date', 'id')
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size, ordering=self.keyset_ordering)
+        try:
+            page = paginator.get_page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor:
+            raise Http404('Invalid page cursor.')
+        return paginator, page, page.object_list, page.has_other_pages()
@@ -0,0 +1,146 @@
+import calendar
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+DAILY = 'DAILY'
+WEEKLY = 'WEEKLY'
+MONTHLY = 'MONTHLY'
+YEARLY = 'YEARLY'
+FREQUENCIES = (DAILY, WEEKLY, MONTHLY, YEARLY)
+WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+
+# Upper bound on COUNT, so a counted rule is always cheap to walk from its start
+MAX_COUNT = 1000
+EXPANSION_CACHE_SIZE = 1024
+
+
+def parse_weekdays(value):
+    """'MO,WE' -> (0, 2); an empty value means the weekday of the start date"""
+    if not value:
+        return ()
+    try:
+        return tuple(sorted({WEEKDAYS.index(day.strip().upper()) for day in value.split(',') if day.strip()}))
+    except ValueError:
+        raise ValidationError(f'Invalid weekday list: {value}')
+
+
+def _add_months(start, months, day):
+    """The ``day``-th of the month ``months`` after ``start``, or None if that month is too short"""
+    index = start.year * 12 + start.month - 1 + months
+    year, month = divmod(index, 12)
+    month += 1
+    if day > calendar.monthrange(year, month)[1]:
+        return None
+    return date(year, month, day)
+
+
+def iter_occurrences(freq, interval, byweekday, dtstart, skip_to=None):
+    """
+    Occurrence dates of an unbounded rule, in order, starting at ``dtstart``.
+
+    With ``skip_to`` the walk jumps straight to the period containing that
+    date instead of stepping through every earlier period.
+    """
+    if freq == DAILY:
+        first = max(0, (skip_to - dtstart).days // interval) if skip_to else 0
+        period = first
+        while True:
+            yield dtstart + timedelta(days=period * interval)
+            period += 1
+
+    elif freq == WEEKLY:
+        days = parse_weekdays(byweekday) or (dtstart.weekday(),)
+        week_start = dtstart - timedelta(days=dtstart.weekday())
+        period = max(0, (skip_to - week_start).days // (7 * interval)) if skip_to else 0
+        while True:
+            current = week_start + timedelta(weeks=period * interval)
+            for weekday in days:
+                day = current + timedelta(days=weekday)
+                if day >= dtstart:
+                    yield day
+            period += 1
+
+    else:
+        step = interval * 12 if freq == YEARLY else interval
+        months_to_skip = 0
+        if skip_to:
+            months_to_skip = (skip_to.year - dtstart.year) * 12 + skip_to.month - dtstart.month
+        period = max(0, months_to_skip // step)
+        while True:
+            day = _add_months(dtstart, period * step, dtstart.day)
+            # Months without this day are skipped, as RFC 5545 requires
+            if day is not None:
+                yield day
+            period += 1
+
+
+@lru_cache(maxsize=EXPANSION_CACHE_SIZE)
+def expand(freq, interval, byweekday, dtstart, until, count, window_start, window_end):
+    """
+    Occurrence dates in [window_start, window_end) as a tuple.
+
+    The result depends only on the arguments, so it is memoised in a bounded
+    LRU cache; an edited rule has different arguments and simply misses it.
+    """
+    end = window_end if until is None else min(window_end, until + timedelta(days=1))
+    if window_start >= end:
+        return ()
+
+    # A counted rule has to be walked from its first occurrence
+    skip_to = None if count else window_start
+    occurrences = []
+    for index, day in enumerate(iter_occurrences(freq, interval, byweekday, dtstart, skip_to)):
+        if day >= end or (count and index >= count):
+            break
+        if day >= window_start:
+            occurrences.append(day)
+    return tuple(occurrences)
+
+
+class Occurrence:
+    """One expanded occurrence of a recurring task; never stored as a row"""
+    is_occurrence = True
+
+    def __init__(self, task, date, status=None):
+        self.task = task
+        self.date = date
+        self.status = status
+
+    @property
+    def done(self):
+        return self.status is not None
+
+    @property
+    def skipped(self):
+        return self.status == 'skipped'
+
+    @property
+    def title(self):
+        return self.task.title
+
+    @property
+    def due_time(self):
+        return self.task.due_time
+
+    @property
+    def pk(self):
+        return self.task.pk
+
+    @property
+    def due_at(self):
+        """When this occurrence expires, like Task.due_at, in the current time zone"""
+        if self.due_time is not None:
+            return timezone.make_aware(datetime.combine(self.date, self.due_time))
+        return timezone.make_aware(datetime.combine(self.date + timedelta(days=1), datetime.min.time()))
+
+    def is_past_due_and_incomplete(self, now=None):
+        return self.due_at < (now or timezone.now()) and not self.done
+
+    def sort_key(self):
+        return self.date, self.due_time is not None, self.due_time or datetime.min.time(), self.task.pk
+
+    def __repr__(self):
+        return f'<Occurrence {self.task.pk} on {self.date}>'
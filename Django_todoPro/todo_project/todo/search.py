@@ -0,0 +1,105 @@
+import re
+from functools import reduce
+from operator import and_
+from weakref import WeakKeyDictionary
+
+from django.db import connections
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+FTS_TABLE = 'todo_task_fts'
+SEARCH_LIMIT = 50
+MAX_SEARCH_TERMS = 8
+
+# Control characters for highlight(), replaced with <mark> after escaping
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_END = '\x03'
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+# connection -> whether it has the FTS5 title index
+_fts_available = WeakKeyDictionary()
+
+
+def search_terms(text):
+    return WORD_RE.findall(text or '')[:MAX_SEARCH_TERMS]
+
+
+def build_match_query(terms, user_id=None):
+    """
+    An FTS5 MATCH expression requiring every term, each as a prefix.
+
+    Terms are quoted, so nothing the user types is parsed as FTS5 syntax.
+    """
+    query = 'title:(' + ' '.join(f'"{term}"*' for term in terms) + ')'
+    if user_id is not None:
+        query = f'owner:u{int(user_id)} AND {query}'
+    return query
+
+
+def has_fts_index(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    if connection not in _fts_available:
+        _fts_available[connection] = FTS_TABLE in connection.introspection.table_names()
+    return _fts_available[connection]
+
+
+def highlight(text):
+    return mark_safe(
+        escape(text).replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>')
+    )
+
+
+def search_tasks(queryset, text, user=None, limit=SEARCH_LIMIT):
+    """
+    Tasks from ``queryset`` whose title matches ``text``, best match first.
+
+    On SQLite the FTS5 index does the matching and BM25 ranking, so no LIKE
+    scan happens. Passing ``user`` narrows the match to that user's rows
+    inside the index, before anything is ranked. The queryset then only
+    filters the ranked rows. Each result gets ``title_html`` with the
+    matched words marked.
+
+    Other backends fall back to an icontains filter per term, latest due first.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return []
+    if user is not None:
+        queryset = queryset.filter(user=user)
+
+    connection = connections[queryset.db]
+    if not has_fts_index(connection):
+        tasks = list(
+            queryset.filter(reduce(and_, [Q(title__icontains=term) for term in terms]))
+            .order_by('-due_date', '-id')[:limit]
+        )
+        for task in tasks:
+            task.title_html = escape(task.title)
+        return tasks
+
+    scope_sql, scope_params = queryset.order_by().values('id').query.sql_with_params()
+    with connection.cursor() as cursor:
+        # "+rowid" keeps SQLite from handing the IN list to FTS5, which would
+        # then run the full-text match once per candidate row
+        cursor.execute(
+            f'SELECT rowid, highlight({FTS_TABLE}, 0, %s, %s) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND +rowid IN ({scope_sql}) '
+            f'ORDER BY bm25({FTS_TABLE}, 1.0, 0.0) LIMIT %s',
+            (
+                HIGHLIGHT_START, HIGHLIGHT_END, build_match_query(terms, getattr(user, 'pk', None)),
+                *scope_params, limit,
+            ),
+        )
+        ranked = cursor.fetchall()
+
+    tasks = queryset.in_bulk([task_id for task_id, _ in ranked])
+    results = []
+    for task_id, title in ranked:
+        task = tasks.get(task_id)
+        if task is not None:
+            task.title_html = highlight(title)
+            results.append(task)
+    return results
@@ -0,0 +1,34 @@
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+
+STREAM_CHUNK_SIZE = 500
+
+
+async def aiterate(iterable, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Iterate a sync iterable, such as a generator reading the ORM, from async code.
+
+    Each chunk of ``chunk_size`` items is produced in the request's sync
+    thread, so the generator keeps its database connection and cursor
+    between chunks, and only one chunk is in memory at a time.
+    """
+    iterator = iter(iterable)
+    next_chunk = sync_to_async(lambda: list(islice(iterator, chunk_size)))
+    while chunk := await next_chunk():
+        for item in chunk:
+            yield item
+
+
+def streaming_content(request, iterable):
+    """
+    The body for a StreamingHttpResponse of ``iterable``.
+
+    Under ASGI Django consumes a sync iterator with sync_to_async(list), which
+    holds the whole body in memory before sending any of it; an async
+    iterator is sent as it is produced.
+    """
+    if isinstance(request, ASGIRequest):
+        return aiterate(iterable)
+    return iterable
@@ -0,0 +1,149 @@
+import random
+from dataclasses import dataclass, field
+from datetime import time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .models import RecurrenceRule, Task, UserProfile
+
+SYNTHETIC_PREFIX = 'synthetic'
+SYNTHETIC_BATCH_SIZE = 5000
+
+VERBS = ('Write', 'Review', 'Call', 'Email', 'Plan', 'Fix', 'Prepare', 'Book', 'Pay', 'Clean', 'Update', 'Read')
+NOUNS = (
+    'report', 'invoice', 'meeting notes', 'dentist', 'budget', 'slides', 'garden', 'tax return',
+    'newsletter', 'car service', 'groceries', 'release', 'backlog', 'flight', 'proposal', 'kitchen',
+)
+TIME_ZONES = ('', '', '', 'Europe/London', 'Europe/Berlin', 'America/New_York', 'Asia/Tokyo', 'Australia/Sydney')
+
+
+@dataclass
+class DatasetSpec:
+    """The shape of a synthetic dataset; the defaults look like a small real deployment"""
+    users: int = 100
+    tasks: int = 10000
+    # Tasks per user follow a power law: user k gets a share proportional to 1 / k**skew
+    skew: float = 1.0
+    past_days: int = 120
+    future_days: int = 60
+    # Chance that a task is done, for tasks due in the past and in the future
+    done_past: float = 0.75
+    done_future: float = 0.1
+    due_time_rate: float = 0.4
+    recurring_rate: float = 0.02
+    seed: int = 42
+    prefix: str = SYNTHETIC_PREFIX
+
+
+@dataclass
+class Dataset:
+    spec: DatasetSpec
+    user_ids: list = field(default_factory=list)
+    # Tasks per user, in the order of user_ids (heaviest first)
+    task_counts: list = field(default_factory=list)
+    recurring: int = 0
+
+    @property
+    def heaviest_user_id(self):
+        return self.user_ids[0] if self.user_ids else None
+
+
+def skewed_counts(total, users, skew):
+    """Split ``total`` tasks over ``users``: a few heavy users and a long tail, heaviest first"""
+    weights = [1 / rank ** skew for rank in range(1, users + 1)]
+    scale = total / sum(weights)
+    counts = [int(weight * scale) for weight in weights]
+    for index in range(total - sum(counts)):
+        counts[index % users] += 1
+    return counts
+
+
+def synthetic_users(prefix=SYNTHETIC_PREFIX):
+    return User.objects.filter(username__startswith=f'{prefix}-')
+
+
+def clear_dataset(prefix=SYNTHETIC_PREFIX):
+    """Delete the synthetic users and their tasks; tasks first, in bulk, so the counters path stays cheap"""
+    users = synthetic_users(prefix)
+    Task.objects.filter(user__in=users).delete()
+    return users.delete()[1].get(User._meta.label, 0)
+
+
+def make_task(rng, spec, user_id, now):
+    offset = timedelta(
+        days=rng.triangular(-spec.past_days, spec.future_days, 0),
+        hours=rng.randrange(24),
+        minutes=rng.choice((0, 15, 30, 45)),
+    )
+    due_date = now + offset
+    due_time = None
+    if rng.random() < spec.due_time_rate:
+        due_time = time(rng.randrange(7, 22), rng.choice((0, 15, 30, 45)))
+    done = rng.random() < (spec.done_past if offset < timedelta(0) else spec.done_future)
+    title = f'{rng.choice(VERBS)} {rng.choice(NOUNS)} #{rng.randrange(1000)}'
+    return Task(user_id=user_id, title=title, due_date=due_date, due_time=due_time, done=done)
+
+
+def generate_dataset(spec, batch_size=SYNTHETIC_BATCH_SIZE):
+    """
+    Create ``spec.users`` users and ``spec.tasks`` tasks with a realistic mix.
+
+    Tasks are spread over the users by skewed_counts(). Due dates cluster
+    around today, most past tasks are done and the rest are expired, some
+    tasks have a due time, a few repeat, and some users have a time zone.
+    Everything goes through Task.objects.bulk_create(), so the profile
+    counters and deadlines are maintained as in production. The same seed
+    gives the same dataset.
+    """
+    rng = random.Random(spec.seed)
+    now = timezone.now()
+    dataset = Dataset(spec, task_counts=skewed_counts(spec.tasks, spec.users, spec.skew))
+    # One hash for every user: hashing is deliberately slow
+    password = make_password(None)
+
+    with transaction.atomic():
+        users = User.objects.bulk_create(
+            [User(username=f'{spec.prefix}-{number:05d}', password=password) for number in range(spec.users)],
+            batch_size=batch_size,
+        )
+        dataset.user_ids = [user.pk for user in users]
+        # bulk_create skips the post_save hook that creates profiles
+        UserProfile.objects.bulk_create(
+            [UserProfile(user_id=user_id, time_zone=rng.choice(TIME_ZONES)) for user_id in dataset.user_ids],
+            batch_size=batch_size,
+        )
+
+    pending = []
+    recurring = []
+    for user_id, count in zip(dataset.user_ids, dataset.task_counts):
+        for _ in range(count):
+            pending.append(make_task(rng, spec, user_id, now))
+            if len(pending) >= batch_size:
+                recurring.extend(save_tasks(rng, spec, pending, batch_size))
+                pending = []
+    recurring.extend(save_tasks(rng, spec, pending, batch_size))
+    dataset.recurring = len(recurring)
+    return dataset
+
+
+def save_tasks(rng, spec, tasks, batch_size):
+    """Insert one batch of tasks and turn a share of the open ones into repeating series"""
+    if not tasks:
+        return []
+    with transaction.atomic():
+        Task.objects.bulk_create(tasks, batch_size=batch_size)
+        repeating = [task for task in tasks if not task.done and rng.random() < spec.recurring_rate]
+        if repeating:
+            RecurrenceRule.objects.bulk_create(
+                [
+                    RecurrenceRule(task=task, freq=rng.choice(('DAILY', 'WEEKLY', 'MONTHLY')))
+                    for task in repeating
+                ],
+                batch_size=batch_size,
+            )
+            # bulk_create skips the hook that sets Task.repeats; update() keeps the counters right
+            Task.objects.filter(pk__in=[task.pk for task in repeating]).update(repeats=True)
+    return repeating
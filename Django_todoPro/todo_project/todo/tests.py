@@ -1,2 +1,853 @@
-from django.test import TestCase
+import asyncio
+import importlib.util
+import io
+import json
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from pathlib import Path
+from unittest import mock
 
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.template.loader import render_to_string
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import include, path, resolve, reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import urls
+from .async_views import AsyncTaskListView, TaskEventStreamView
+from .database import REPLICA_DB_ALIAS, ReadReplicaRouter, apply_sqlite_pragmas
+from .events import (
+    EVENT_CREATED, EVENT_UPDATED, LocalBroker, Subscription, get_hub, sse_reset, sse_retry,
+)
+from .management.commands.benchmark_views import SKIPPED_VIEWS, find_regressions, view_requests
+from .models import ApiToken, OccurrenceException, RecurrenceRule, Task, TaskArchive, UserProfile
+from .pagination import InvalidCursor, KeysetPaginator
+from .recurrence import expand
+from .search import has_fts_index
+from .synthetic import DatasetSpec, generate_dataset
+
+
+class TaskListQueryCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', password='secret-pass')
+        now = timezone.now()
+        Task.objects.bulk_create([
+            Task(user=cls.user, title=f'Task {i}', due_date=now + timedelta(days=i - 10), done=i % 4 == 0)
+            for i in range(20)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        # The first visit stores the welcome flag in the session
+        self.client.get(reverse('todo:task_list'))
+
+    def test_task_list_query_count(self):
+        # session, user, one page of tasks, profile counters
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('todo:task_list'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_task_list_issues_one_task_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('todo:task_list'))
+        task_queries = [q['sql'] for q in queries.captured_queries if '"todo_task"' in q['sql']]
+        self.assertEqual(len(task_queries), 1)
+
+    def test_expired_flag_matches_model(self):
+        response = self.client.get(reverse('todo:task_list'))
+        tasks = response.context['tasks']
+        self.assertTrue(tasks)
+        for task in tasks:
+            self.assertEqual(task.is_expired, task.is_past_due_and_incomplete())
+        self.assertEqual(response.context['expired_count'], sum(task.is_expired for task in tasks))
+
+
+class TaskDeadlineTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', password='secret-pass')
+        # 02:00 UTC on Jan 1st is still Dec 31st in New York
+        cls.task = Task.objects.create(
+            user=cls.user, title='New year', due_date=datetime(2030, 1, 1, 2, 0, tzinfo=dt_timezone.utc),
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def change_time_zone(self, name):
+        return self.client.post(reverse('todo:profile_edit'), {
+            'email': 'alice@example.com', 'first_name': 'Alice', 'last_name': 'Smith', 'time_zone': name,
+        })
+
+    def test_time_zone_change_moves_deadlines(self):
+        self.assertEqual(self.task.due_at, datetime(2030, 1, 2, tzinfo=dt_timezone.utc))
+        self.change_time_zone('America/New_York')
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.due_at, datetime(2030, 1, 1, 5, 0, tzinfo=dt_timezone.utc))
+
+    def test_refresh_deadlines_works_in_chunks(self):
+        due = datetime(2030, 2, 1, tzinfo=dt_timezone.utc)
+        Task.objects.bulk_create([Task(user=self.user, title=f'Task {n}', due_date=due) for n in range(5)])
+        # Moved behind Task.save(), as a queryset update of the time zone would
+        UserProfile.objects.filter(user=self.user).update(time_zone='America/New_York')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(Task.objects.all().refresh_deadlines(batch_size=2), 6)
+        # Three chunks of reads plus the empty one that ends the scan
+        reads = [q for q in queries.captured_queries if q['sql'].startswith('SELECT "todo_task"')]
+        self.assertEqual(len(reads), 4)
+        self.assertEqual(set(Task.objects.filter(title__startswith='Task').values_list('due_at', flat=True)),
+                         {datetime(2030, 2, 1, 5, 0, tzinfo=dt_timezone.utc)})
+        self.assertEqual(Task.objects.all().refresh_deadlines(batch_size=2), 0)
+
+    def test_cached_card_follows_the_time_zone(self):
+        self.assertContains(self.client.get(reverse('todo:task_list')), 'Jan 01, 2030')
+        self.change_time_zone('America/New_York')
+        response = self.client.get(reverse('todo:task_list'))
+        self.assertContains(response, 'Dec 31, 2029')
+        self.assertNotContains(response, 'Jan 01, 2030')
+
+
+class TaskApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', password='secret-pass')
+        _, key = ApiToken.create_for(cls.user, name='tests')
+        cls.headers = {'Authorization': f'Bearer {key}'}
+        cls.task = Task.objects.create(
+            user=cls.user, title='Report', due_date=datetime(2030, 1, 1, tzinfo=dt_timezone.utc),
+        )
+
+    def patch_tasks(self, items):
+        return self.client.patch(
+            reverse('todo:api_task_list'), json.dumps(items), content_type='application/json', headers=self.headers,
+        )
+
+    def test_requires_a_valid_token(self):
+        self.assertEqual(self.client.get(reverse('todo:api_task_list')).status_code, 401)
+        response = self.client.get(reverse('todo:api_task_list'), headers={'Authorization': 'Bearer wrong'})
+        self.assertEqual(response.status_code, 401)
+
+    def test_sparse_fieldset(self):
+        response = self.client.get(reverse('todo:api_task_list') + '?fields=id,title', headers=self.headers)
+        self.assertEqual(response.json()['results'], [{'id': self.task.pk, 'title': 'Report'}])
+
+    def test_invalid_batch_writes_nothing(self):
+        response = self.patch_tasks([{'id': self.task.pk, 'title': 'Renamed'}, {'id': self.task.pk + 1, 'done': True}])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('1', response.json()['errors'])
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.title, 'Report')
+
+    def test_batch_patch_returns_the_stored_rows(self):
+        response = self.patch_tasks([{'id': self.task.pk, 'due_date': '2031-06-01 10:00'}])
+        self.assertEqual(response.status_code, 200)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.due_at, datetime(2031, 6, 2, tzinfo=dt_timezone.utc))
+        row = response.json()[0]
+        self.assertEqual(row['due_at'], '2031-06-02T00:00:00Z')
+        # JSON carries milliseconds
+        self.assertLess(abs(parse_datetime(row['updated_at']) - self.task.updated_at), timedelta(milliseconds=1))
+
+    def test_unknown_fields_are_rejected_before_writing(self):
+        list_url = reverse('todo:api_task_list') + '?fields=bogus'
+        detail_url = reverse('todo:api_task_detail', kwargs={'pk': self.task.pk}) + '?fields=bogus'
+        requests = [
+            ('post', list_url, {'title': 'New', 'due_date': '2030-02-01'}),
+            ('patch', list_url, [{'id': self.task.pk, 'title': 'Renamed'}]),
+            ('patch', detail_url, {'title': 'Renamed'}),
+        ]
+        for method, url, data in requests:
+            with self.subTest(method=method, url=url):
+                response = getattr(self.client, method)(
+                    url, json.dumps(data), content_type='application/json', headers=self.headers,
+                )
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(Task.objects.values_list('title', flat=True)), ['Report'])
+
+
+class WeeklyStatsTests(TestCase):
+    def test_counts_per_week_oldest_first(self):
+        user = User.objects.create_user('alice', password='secret-pass')
+        now = timezone.now()
+        Task.objects.bulk_create([
+            Task(user=user, title='This week', due_date=now, done=True),
+            Task(user=user, title='This week too', due_date=now),
+            Task(user=user, title='Two weeks ago', due_date=now - timedelta(weeks=2)),
+            Task(user=user, title='Too old', due_date=now - timedelta(weeks=8)),
+        ])
+        weekly = user.tasks.weekly_stats(weeks=4)
+        self.assertEqual([week['total'] for week in weekly], [0, 1, 0, 2])
+        self.assertEqual(weekly[-1]['completion_rate'], 50.0)
+        self.assertEqual(weekly[-1]['week_start'], timezone.localdate() - timedelta(days=timezone.localdate().weekday()))
+
+
+class RecurrenceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', password='secret-pass')
+        # Monday, Jan 7th 2030
+        cls.start = timezone.make_aware(datetime(2030, 1, 7))
+
+    def make_series(self, **rule):
+        task = Task.objects.create(user=self.user, title='Stand-up', due_date=self.start)
+        RecurrenceRule.objects.create(task=task, **rule)
+        return Task.objects.select_related('recurrence').get(pk=task.pk)
+
+    def test_weekly_rule_expands_on_its_weekdays(self):
+        task = self.make_series(freq='WEEKLY', byweekday='MO,FR', count=3)
+        self.assertEqual(
+            task.recurrence.occurrences(date(2030, 1, 1), date(2030, 2, 1)),
+            (date(2030, 1, 7), date(2030, 1, 11), date(2030, 1, 14)),
+        )
+
+    def test_monthly_rule_skips_months_without_the_day(self):
+        self.assertEqual(
+            expand('MONTHLY', 1, '', date(2030, 1, 31), None, None, date(2030, 1, 1), date(2030, 6, 1)),
+            (date(2030, 1, 31), date(2030, 3, 31), date(2030, 5, 31)),
+        )
+
+    def test_until_and_window_bound_the_expansion(self):
+        task = self.make_series(freq='DAILY', interval=2, until=date(2030, 1, 15))
+        self.assertEqual(
+            task.recurrence.occurrences(date(2030, 1, 10), date(2030, 2, 1)),
+            (date(2030, 1, 11), date(2030, 1, 13), date(2030, 1, 15)),
+        )
+
+    def test_exceptions_mark_single_occurrences(self):
+        task = self.make_series(freq='DAILY')
+        self.client.force_login(self.user)
+        for day, status in (('2030-01-08', 'done'), ('2030-01-09', 'skipped')):
+            url = reverse('todo:occurrence_status', kwargs={'pk': task.pk, 'day': day})
+            self.assertEqual(self.client.post(url, {'status': status}).status_code, 302)
+
+        occurrences = Task.attach_occurrences([task], date(2030, 1, 7), date(2030, 1, 11))
+        self.assertEqual(
+            [(occurrence.date.day, occurrence.done, occurrence.skipped) for occurrence in occurrences],
+            [(7, False, False), (8, True, False), (9, True, True), (10, False, False)],
+        )
+        # The series itself stays open
+        task.refresh_from_db()
+        self.assertFalse(task.done)
+
+    def test_status_of_a_day_without_an_occurrence_is_404(self):
+        task = self.make_series(freq='WEEKLY')
+        self.client.force_login(self.user)
+        url = reverse('todo:occurrence_status', kwargs={'pk': task.pk, 'day': '2030-01-08'})
+        self.assertEqual(self.client.post(url, {'status': 'done'}).status_code, 404)
+        self.assertFalse(OccurrenceException.objects.exists())
+
+
+class TaskCounterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='secret-pass')
+        self.other = User.objects.create_user('bob', password='secret-pass')
+        self.now = timezone.now()
+
+    def assertCountersMatch(self, **expected):
+        # recount_task_counters() only writes profiles that drifted from the task table
+        self.assertEqual(UserProfile.recount_task_counters(), 0)
+        statistics = UserProfile.objects.get(user=self.user).get_task_statistics()
+        self.assertEqual({name: statistics[name] for name in expected}, expected)
+
+    def test_single_task_writes(self):
+        task = Task.objects.create(user=self.user, title='Report', due_date=self.now + timedelta(days=1))
+        self.assertCountersMatch(total=1, pending=1, expired=0)
+
+        task.due_date = self.now - timedelta(days=2)
+        task.save()
+        self.assertCountersMatch(total=1, pending=1, expired=1)
+
+        task.done = True
+        task.save()
+        self.assertCountersMatch(total=1, completed=1, pending=0, expired=0)
+
+        task.user = self.other
+        task.save()
+        self.assertCountersMatch(total=0, completed=0)
+
+        task.delete()
+        self.assertEqual(UserProfile.recount_task_counters(), 0)
+
+    def test_bulk_task_writes(self):
+        tasks = Task.objects.bulk_create([
+            Task(user=self.user, title=f'Task {i}', due_date=self.now + timedelta(days=i - 3)) for i in range(6)
+        ])
+        self.assertCountersMatch(total=6, pending=6, expired=3)
+
+        Task.objects.filter(pk__in=[task.pk for task in tasks[:2]]).update(done=True)
+        self.assertCountersMatch(total=6, completed=2, pending=4, expired=1)
+
+        Task.objects.filter(pk=tasks[5].pk).update(due_date=self.now - timedelta(days=1))
+        self.assertCountersMatch(expired=2)
+
+        self.user.tasks.filter(done=False).delete()
+        self.assertCountersMatch(total=2, completed=2, pending=0, expired=0)
+
+
+class TaskExportImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', password='secret-pass')
+        cls.other = User.objects.create_user('bob', password='secret-pass')
+        due = datetime(2030, 3, 4, 5, 0, tzinfo=dt_timezone.utc)
+        Task.objects.bulk_create([
+            Task(user=cls.user, title='Report, "final"', due_date=due),
+            Task(user=cls.user, title='Call', due_date=due + timedelta(days=1), due_time=time(9, 30)),
+            Task(user=cls.user, title='Paid', due_date=due - timedelta(days=1), done=True),
+        ])
+
+    def task_fields(self, user):
+        return list(user.tasks.order_by('due_date').values_list('title', 'due_date', 'due_time', 'done'))
+
+    def round_trip(self, export_format, import_format):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('todo:task_export'), {'format': export_format})
+        self.assertEqual(response.status_code, 200)
+        upload = SimpleUploadedFile(f'tasks.{export_format}', b''.join(response.streaming_content))
+
+        self.client.force_login(self.other)
+        response = self.client.post(reverse('todo:task_import'), {'file': upload, 'format': import_format})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['report'].created, 3)
+        self.assertEqual(self.task_fields(self.other), self.task_fields(self.user))
+        self.assertEqual(UserProfile.recount_task_counters(), 0)
+
+    def test_csv_round_trip(self):
+        self.round_trip('csv', 'csv')
+
+    def test_ndjson_round_trip(self):
+        self.round_trip('ndjson', 'json')
+
+    async def test_export_streams_asynchronously_under_asgi(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('todo:task_export'), {'format': 'ndjson'})
+        self.assertTrue(response.is_async)
+        lines = b''.join([chunk async for chunk in response.streaming_content]).splitlines()
+        self.assertEqual(sorted(json.loads(line)['title'] for line in lines), ['Call', 'Paid', 'Report, "final"'])
+
+    def test_invalid_rows_are_reported(self):
+        self.client.force_login(self.other)
+        upload = SimpleUploadedFile('tasks.csv', b'title,due_date\nGood,2030-01-01\n,2030-01-01\nBad date,soon\n')
+        response = self.client.post(reverse('todo:task_import'), {'file': upload, 'format': 'csv'})
+        report = response.context['report']
+        self.assertEqual((report.created, report.failed), (1, 2))
+        self.assertEqual(list(self.other.tasks.values_list('title', flat=True)), ['Good'])
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', password='secret-pass')
+        due = timezone.now() + timedelta(days=1)
+        # Pairs of tasks share a deadline, so the id has to break the ties
+        Task.objects.bulk_create([
+            Task(user=cls.user, title=f'Task {i}', due_date=due + timedelta(hours=i // 2)) for i in range(7)
+        ])
+        cls.ordered_ids = list(cls.user.tasks.order_by('due_at', 'id').values_list('id', flat=True))
+
+    def paginator(self):
+        return KeysetPaginator(self.user.tasks.all(), 3, ordering=('due_at', 'id'))
+
+    def test_pages_forward_and_back_cover_every_task_once(self):
+        paginator = self.paginator()
+        pages = [paginator.get_page()]
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        self.assertEqual([[task.pk for task in page] for page in pages], [
+            self.ordered_ids[:3], self.ordered_ids[3:6], self.ordered_ids[6:],
+        ])
+        self.assertFalse(pages[0].has_previous())
+
+        previous = paginator.get_page(pages[-1].previous_cursor)
+        self.assertEqual([task.pk for task in previous], self.ordered_ids[3:6])
+        self.assertEqual(previous.next_cursor, pages[1].next_cursor)
+
+    def test_rows_inserted_before_the_cursor_do_not_shift_the_next_page(self):
+        paginator = self.paginator()
+        cursor = paginator.get_page().next_cursor
+        Task.objects.create(user=self.user, title='Earlier', due_date=timezone.now())
+        self.assertEqual([task.pk for task in paginator.get_page(cursor)], self.ordered_ids[3:6])
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(InvalidCursor):
+            self.paginator().get_page('not-a-cursor')
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('todo:task_list'), {'cursor': 'not-a-cursor'}).status_code, 404)
+
+
+class TaskCardCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', password='secret-pass')
+        now = timezone.now()
+        cls.tasks = Task.objects.bulk_create([
+            Task(user=cls.user, title=f'Task {i}', due_date=now + timedelta(days=i + 1)) for i in range(3)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('todo:task_list'))
+
+    def render_list(self):
+        with mock.patch('todo.fragments.render_to_string', wraps=render_to_string) as render:
+            response = self.client.get(reverse('todo:task_list'))
+        self.assertEqual(response.status_code, 200)
+        return response, render.call_count
+
+    def test_unchanged_cards_come_from_the_cache(self):
+        self.assertEqual(self.render_list()[1], 0)
+
+    def test_edited_task_is_the_only_card_rendered_again(self):
+        task = Task.objects.get(pk=self.tasks[1].pk)
+        task.title = 'Renamed'
+        task.save()
+        response, renders = self.render_list()
+        self.assertEqual(renders, 1)
+        self.assertContains(response, 'Renamed')
+
+    def test_expiry_renders_the_card_again(self):
+        Task.objects.filter(pk=self.tasks[0].pk).update(due_date=timezone.now() - timedelta(days=1))
+        self.assertEqual(self.render_list()[1], 1)
+
+
+class TaskWatermarkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', password='secret-pass')
+        cls.task = Task.objects.create(user=cls.user, title='Report', due_date=timezone.now() + timedelta(days=1))
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('todo:task_list'))
+        self.etag = self.client.get(reverse('todo:task_list'))['ETag']
+
+    def revalidate(self):
+        return self.client.get(reverse('todo:task_list'), headers={'If-None-Match': self.etag})
+
+    def test_unchanged_list_is_not_modified_without_reading_tasks(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.revalidate()
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse([q for q in queries.captured_queries if '"todo_task"' in q['sql']])
+
+    def test_task_write_moves_the_etag(self):
+        self.task.title = 'Final report'
+        self.task.save()
+        response = self.revalidate()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], self.etag)
+
+    def test_passed_deadline_moves_the_etag(self):
+        Task.objects.create(user=self.user, title='Soon', due_date=timezone.now() + timedelta(days=2))
+        self.etag = self.client.get(reverse('todo:task_list'))['ETag']
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() + timedelta(days=3)):
+            self.assertEqual(self.revalidate().status_code, 200)
+        self.assertEqual(UserProfile.objects.get(user=self.user).tasks_expired, 2)
+
+    def test_new_login_moves_the_etag(self):
+        # Logging in rotates the CSRF secret, so the cached page's form tokens are stale
+        self.client.logout()
+        # Following the redirect shows the login's flash message, which is never revalidated
+        self.client.post(reverse('todo:login'), {'username': 'alice', 'password': 'secret-pass'}, follow=True)
+        response = self.revalidate()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], self.etag)
+
+
+class TaskBulkActionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', password='secret-pass')
+        cls.other = User.objects.create_user('bob', password='secret-pass')
+        now = timezone.now()
+        cls.tasks = Task.objects.bulk_create([
+            Task(user=cls.user, title='Expired', due_date=now - timedelta(days=2)),
+            Task(user=cls.user, title='Also expired', due_date=now - timedelta(days=1)),
+            Task(user=cls.user, title='Upcoming', due_date=now + timedelta(days=1)),
+        ])
+        cls.foreign = Task.objects.create(user=cls.other, title='Not yours', due_date=now - timedelta(days=1))
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def post(self, **data):
+        response = self.client.post(reverse('todo:task_bulk'), data)
+        self.assertEqual(response.status_code, 302)
+        # Bulk writes bypass the per-task hooks; the counters must still be right
+        self.assertEqual(UserProfile.recount_task_counters(), 0)
+        return response
+
+    def test_complete_selected_tasks_only_touches_the_users_own(self):
+        self.post(action='complete', scope='selected', task_ids=[self.tasks[0].pk, self.foreign.pk])
+        self.assertEqual(list(Task.objects.filter(done=True)), [self.tasks[0]])
+
+    def test_shift_expired_tasks_moves_their_deadlines(self):
+        before = dict(self.user.tasks.values_list('pk', 'due_at'))
+        self.post(action='shift', scope='expired', days=7)
+        after = dict(self.user.tasks.values_list('pk', 'due_at'))
+        self.assertEqual(after[self.tasks[0].pk] - before[self.tasks[0].pk], timedelta(days=7))
+        self.assertEqual(after[self.tasks[2].pk], before[self.tasks[2].pk])
+        self.assertFalse(self.user.tasks.expired().exists())
+
+    def test_delete_selected_tasks(self):
+        self.post(action='delete', scope='selected', task_ids=[self.tasks[1].pk, self.tasks[2].pk])
+        self.assertEqual(list(self.user.tasks.all()), [self.tasks[0]])
+
+    def test_invalid_action_changes_nothing(self):
+        self.post(action='shift', scope='expired')
+        self.assertEqual(self.user.tasks.expired().count(), 2)
+
+
+class TaskSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', password='secret-pass')
+        cls.other = User.objects.create_user('bob', password='secret-pass')
+        due = timezone.now() + timedelta(days=1)
+        cls.report = Task.objects.create(user=cls.user, title='Quarterly report <draft>', due_date=due)
+        cls.reporter = Task.objects.create(user=cls.user, title='Call the reporter', due_date=due)
+        Task.objects.create(user=cls.user, title='Pay invoice', due_date=due)
+        Task.objects.create(user=cls.other, title='Quarterly report', due_date=due)
+
+    def search(self, text):
+        return Task.objects.search(text, user=self.user)
+
+    def test_uses_the_full_text_index(self):
+        self.assertTrue(has_fts_index(connections[DEFAULT_DB_ALIAS]))
+
+    def test_every_term_must_match_as_a_prefix(self):
+        self.assertEqual(set(self.search('repo')), {self.report, self.reporter})
+        self.assertEqual(self.search('quart repo'), [self.report])
+        self.assertEqual(self.search('quarterly invoice'), [])
+
+    def test_index_follows_title_changes_and_deletes(self):
+        self.reporter.title = 'Call the plumber'
+        self.reporter.save()
+        self.assertEqual(self.search('plumb'), [self.reporter])
+        self.report.delete()
+        self.assertEqual(self.search('report'), [])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(self.search('"quart* -report:'), [self.report])
+        # OR is just another word every match must contain
+        self.assertEqual(self.search('quarterly) OR (invoice'), [])
+
+    def test_matches_are_highlighted_and_escaped(self):
+        self.assertEqual(self.search('draft')[0].title_html, 'Quarterly report &lt;<mark>draft</mark>&gt;')
+
+    def test_search_view(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('todo:task_search'), {'q': 'quarterly'})
+        self.assertEqual(list(response.context['tasks']), [self.report])
+
+
+def load_async_todo_urls():
+    """todo/urls.py as loaded under ASGI, where the async views are routed"""
+    spec = importlib.util.find_spec('todo.urls')
+    module = importlib.util.module_from_spec(spec)
+    with override_settings(ASYNC_VIEWS=True):
+        spec.loader.exec_module(module)
+    return module
+
+
+class AsyncUrlConf:
+    urlpatterns = [
+        path('', include(load_async_todo_urls())),
+        path('calendar/', include('calender.urls')),
+    ]
+
+
+@override_settings(ROOT_URLCONF=AsyncUrlConf)
+class AsyncViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', password='secret-pass')
+        cls.other = User.objects.create_user('bob', password='secret-pass')
+        now = timezone.now()
+        cls.tasks = Task.objects.bulk_create([
+            Task(user=cls.user, title=f'Task {i}', due_date=now + timedelta(days=i - 2)) for i in range(5)
+        ])
+        cls.foreign = Task.objects.create(user=cls.other, title='Not yours', due_date=now)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_async_views_are_routed(self):
+        self.assertIs(resolve(reverse('todo:task_list')).func.view_class, AsyncTaskListView)
+
+    def test_task_list_pages_by_deadline_and_revalidates(self):
+        response = self.client.get(reverse('todo:task_list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [task.pk for task in response.context['tasks']],
+            list(self.user.tasks.by_deadline().values_list('pk', flat=True)),
+        )
+        self.assertEqual(response.context['expired_count'], 2)
+
+        response = self.client.get(reverse('todo:task_list'), headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_expired_list_and_detail(self):
+        response = self.client.get(reverse('todo:expired_tasks_list'))
+        self.assertEqual(list(response.context['expired_tasks']), self.tasks[:2])
+        response = self.client.get(reverse('todo:task_detail', kwargs={'pk': self.tasks[0].pk}))
+        self.assertEqual(response.context['task'], self.tasks[0])
+        self.assertTrue(response.context['is_expired'])
+
+    def test_other_users_task_is_404(self):
+        response = self.client.get(reverse('todo:task_detail', kwargs={'pk': self.foreign.pk}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_anonymous_user_is_sent_to_login(self):
+        self.client.logout()
+        response = self.client.get(reverse('todo:task_list'))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('next=', response['Location'])
+
+    def test_api_list(self):
+        _, key = ApiToken.create_for(self.user, name='test')
+        response = self.client.get(
+            reverse('todo:api_task_list'), {'fields': 'id,title', 'limit': 2},
+            headers={'Authorization': f'Bearer {key}'},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [{'id': task.pk, 'title': task.title} for task in self.tasks[:2]])
+
+    def test_long_poll_rejects_timeouts_that_never_end(self):
+        _, key = ApiToken.create_for(self.user, name='test')
+        headers = {'Authorization': f'Bearer {key}'}
+        url = reverse('todo:api_task_changes')
+        version = self.client.get(url, headers=headers).json()['version']
+        for timeout in ('nan', 'inf', '-inf', '-1', 'soon'):
+            with self.subTest(timeout=timeout):
+                response = self.client.get(url, {'since': version, 'timeout': timeout}, headers=headers)
+                self.assertEqual(response.status_code, 400)
+        response = self.client.get(url, {'since': version, 'timeout': '0'}, headers=headers)
+        self.assertEqual(response.json(), {'version': version, 'changed': False})
+
+
+class TaskEventTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', password='secret-pass')
+
+    def setUp(self):
+        self.broker = LocalBroker(history_size=3)
+
+    def test_task_writes_are_published_on_commit(self):
+        broker = get_hub().broker
+        with self.captureOnCommitCallbacks(execute=True):
+            task = Task.objects.create(user=self.user, title='Report', due_date=timezone.now())
+            self.assertFalse([event for event in broker.history if event.task_id == task.pk])
+        event = broker.history[-1]
+        self.assertEqual((event.user_id, event.type, event.task_id), (self.user.pk, EVENT_CREATED, task.pk))
+        self.assertEqual(event.task['title'], 'Report')
+
+    def test_replay_after_an_event_id(self):
+        first = self.broker.publish(self.user.pk, EVENT_CREATED, 1)
+        self.broker.publish(self.user.pk + 1, EVENT_CREATED, 2)
+        third = self.broker.publish(self.user.pk, EVENT_UPDATED, 1)
+        self.assertEqual(self.broker.replay(self.user.pk, first.id), [third])
+        self.assertEqual(self.broker.replay(self.user.pk, third.id), [])
+
+    def test_replay_is_impossible_after_a_restart_or_trimmed_history(self):
+        first = self.broker.publish(self.user.pk, EVENT_CREATED, 1)
+        self.assertIsNone(LocalBroker().replay(self.user.pk, first.id))
+        self.assertIsNone(self.broker.replay(self.user.pk, 'garbage'))
+        for task_id in range(2, 6):
+            self.broker.publish(self.user.pk, EVENT_CREATED, task_id)
+        self.assertIsNone(self.broker.replay(self.user.pk, first.id))
+
+    async def read_stream(self, last_event_id, live=(), queue_size=10):
+        """The chunks a stream sends until it goes idle; ``live`` events arrive while it replays"""
+        # Subscribe, then replay, as TaskEventStreamView does
+        subscription = Subscription(self.broker, self.user.pk, queue_size)
+        for task_id in live:
+            self.broker.publish(self.user.pk, EVENT_UPDATED, task_id)
+        await asyncio.sleep(0)
+        backlog = self.broker.replay(self.user.pk, last_event_id)
+
+        stream = TaskEventStreamView().stream(subscription, backlog)
+        chunks = []
+        with self.settings(TASK_EVENT_HEARTBEAT=0.01):
+            async for chunk in stream:
+                if chunk.startswith(':'):
+                    break
+                chunks.append(chunk)
+        await stream.aclose()
+        self.assertNotIn(self.user.pk, self.broker.subscribed_users())
+        return chunks
+
+    async def test_stream_replays_then_follows_without_duplicates(self):
+        seen = self.broker.publish(self.user.pk, EVENT_CREATED, 1)
+        missed = self.broker.publish(self.user.pk, EVENT_UPDATED, 1)
+        chunks = await self.read_stream(seen.id, live=[2])
+        self.assertEqual(chunks[0], sse_retry(settings.TASK_EVENT_RETRY))
+        # The live event was also replayed, and is sent once
+        live = self.broker.history[-1]
+        self.assertEqual([chunk.split('\n')[0] for chunk in chunks[1:]], [f'id: {missed.id}', f'id: {live.id}'])
+
+    async def test_stream_resets_when_events_were_lost(self):
+        chunks = await self.read_stream('unknown')
+        self.assertEqual(chunks[1], sse_reset())
+
+        last = self.broker.publish(self.user.pk, EVENT_CREATED, 1)
+        # A queue of one overflows: the client is told to refetch, as it cannot tell what was dropped
+        chunks = await self.read_stream(last.id, live=[2, 3], queue_size=1)
+        self.assertEqual(chunks[1:], [event.to_sse() for event in list(self.broker.history)[-2:]] + [sse_reset()])
+
+
+class ReadReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReadReplicaRouter()
+
+    def test_reads_go_to_the_replica_outside_transactions(self):
+        default = connections[DEFAULT_DB_ALIAS]
+        with mock.patch.object(default, 'in_atomic_block', False):
+            self.assertEqual(self.router.db_for_read(Task), REPLICA_DB_ALIAS)
+        # Inside a transaction a read must see its own writes
+        with mock.patch.object(default, 'in_atomic_block', True):
+            self.assertEqual(self.router.db_for_read(Task), DEFAULT_DB_ALIAS)
+
+    def test_writes_and_migrations_stay_on_default(self):
+        self.assertEqual(self.router.db_for_write(Task), DEFAULT_DB_ALIAS)
+        self.assertTrue(self.router.allow_migrate(DEFAULT_DB_ALIAS, 'todo'))
+        self.assertFalse(self.router.allow_migrate(REPLICA_DB_ALIAS, 'todo'))
+
+    @override_settings(SQLITE_PRAGMAS={'journal_mode': 'WAL', 'busy_timeout': 5000})
+    def test_read_only_connection_skips_file_pragmas(self):
+        replica = mock.Mock(vendor='sqlite', settings_dict={'NAME': 'file:db.sqlite3?mode=ro'})
+        apply_sqlite_pragmas(replica)
+        replica.connection.execute.assert_called_once_with('PRAGMA busy_timeout = 5000')
+
+
+class UsersWithoutTasksTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', password='secret-pass')
+        cls.busy = User.objects.create_user('busy', password='secret-pass')
+        cls.idle = User.objects.create_user('idle', password='secret-pass')
+        Task.objects.create(user=cls.busy, title='Report', due_date=timezone.now())
+
+    def test_anti_join(self):
+        users = Task.objects.users_without_tasks()
+        self.assertEqual(set(users), {self.admin, self.idle})
+        sql = str(users.query).upper()
+        self.assertIn('NOT EXISTS', sql)
+        self.assertNotIn('NOT IN', sql)
+
+    def test_view_from_the_task_table_and_from_the_counters(self):
+        self.client.force_login(self.admin)
+        for from_counters in (False, True):
+            with self.subTest(from_counters=from_counters), \
+                    self.settings(USERS_WITHOUT_TASKS_FROM_COUNTERS=from_counters):
+                response = self.client.get(reverse('todo:users_without_tasks'))
+                self.assertEqual(list(response.context['users']), [self.admin, self.idle])
+
+    def test_view_is_for_administrators(self):
+        self.client.force_login(self.busy)
+        self.assertRedirects(
+            self.client.get(reverse('todo:users_without_tasks')), reverse('todo:task_list'),
+            fetch_redirect_response=False,
+        )
+
+
+class TaskArchiveTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('alice', password='secret-pass')
+        due = datetime(2030, 1, 1, tzinfo=dt_timezone.utc)
+        cls.tasks = Task.objects.bulk_create([
+            Task(user=cls.user, title=f'Task {i}', due_date=due + timedelta(days=i), done=i % 2 == 0)
+            for i in range(6)
+        ])
+        old = timezone.now() - timedelta(days=settings.TASK_ARCHIVE_AFTER_DAYS + 1)
+        # Tasks 0 and 2 were completed long ago, task 4 recently; the odd ones are open
+        Task.objects.filter(pk__in=[task.pk for task in cls.tasks[:4]]).update(updated_at=old)
+
+    def archive(self):
+        call_command('archive_tasks', batch_size=1, stdout=io.StringIO())
+
+    def test_moves_only_long_completed_tasks(self):
+        before = UserProfile.objects.get(user=self.user).get_task_statistics()
+        self.archive()
+        self.assertEqual(list(TaskArchive.objects.values_list('id', 'title')), [
+            (self.tasks[0].pk, 'Task 0'), (self.tasks[2].pk, 'Task 2'),
+        ])
+        self.assertEqual(self.user.tasks.count(), 4)
+
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual((profile.tasks_total, profile.tasks_archived), (4, 2))
+        self.assertEqual(profile.get_task_statistics(), {**before, 'archived': 2})
+        self.assertEqual(UserProfile.recount_task_counters(), 0)
+
+    def test_api_pages_through_live_and_archived_tasks_together(self):
+        self.archive()
+        _, key = ApiToken.create_for(self.user, name='test')
+        ids, cursor = [], None
+        while True:
+            params = {'archived': '1', 'fields': 'id', 'limit': 4, **({'cursor': cursor} if cursor else {})}
+            page = self.client.get(
+                reverse('todo:api_task_list'), params, headers={'Authorization': f'Bearer {key}'},
+            ).json()
+            ids.extend(row['id'] for row in page['results'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(ids, [task.pk for task in self.tasks])
+
+    def test_export_includes_archived_tasks_on_request(self):
+        self.archive()
+        self.client.force_login(self.user)
+        for archived, count in (('', 4), ('1', 6)):
+            response = self.client.get(reverse('todo:task_export'), {'format': 'ndjson', 'archived': archived})
+            self.assertEqual(len(b''.join(response.streaming_content).splitlines()), count)
+
+
+class QueryPlanCheckTests(TestCase):
+    def test_missing_index_fails_the_check(self):
+        # DDL is transactional in SQLite, so the test's rollback restores the index. Only
+        # one check runs on this connection: a cached EXPLAIN keeps its plan after a DROP.
+        with connection.cursor() as cursor:
+            cursor.execute('DROP INDEX task_user_deadline_idx')
+        with self.assertRaisesMessage(CommandError, 'task_list: not using task_user_deadline_idx'):
+            call_command('check_query_plans', stdout=io.StringIO())
+
+
+class SyntheticDatasetTests(TestCase):
+    def test_counters_match_the_generated_tasks(self):
+        dataset = generate_dataset(DatasetSpec(users=5, tasks=300, seed=1, recurring_rate=0.2))
+        self.assertEqual(Task.objects.count(), 300)
+        self.assertEqual(dataset.task_counts, sorted(dataset.task_counts, reverse=True))
+        self.assertGreater(dataset.recurring, 0)
+        self.assertTrue(Task.objects.filter(done=True).exists())
+        self.assertTrue(Task.objects.expired().exists())
+        self.assertEqual(UserProfile.recount_task_counters(dataset.user_ids), 0)
+
+
+class BenchmarkViewsTests(TestCase):
+    def test_every_todo_url_is_measured_or_skipped(self):
+        measured = {request[0] for request in view_requests(1, [1], 2, date(2026, 1, 5), 'key')}
+        names = {pattern.name for pattern in urls.urlpatterns}
+        self.assertEqual(measured | SKIPPED_VIEWS.keys(), names)
+        self.assertFalse(measured & SKIPPED_VIEWS.keys())
+
+    def test_find_regressions(self):
+        old = {'view': 'task_list', 'tasks': 1000, 'status': 200, 'p95_ms': 10.0, 'queries': 4, 'peak_kb': 100.0}
+        baseline = {'task_list@1000': old}
+        noise = dict(old, p95_ms=12.0, peak_kb=120.0)
+        self.assertEqual(find_regressions([noise], baseline, 0.25, 2.0, 64.0), [])
+        worse = dict(old, p95_ms=20.0, queries=5)
+        self.assertEqual(len(find_regressions([worse], baseline, 0.25, 2.0, 64.0)), 2)
+
+    def test_missing_baseline_fails_before_measuring(self):
+        target = 'todo.management.commands.benchmark_views.Command.run'
+        with mock.patch(target) as run, self.assertRaisesMessage(CommandError, 'No baseline at'):
+            call_command('benchmark_views', baseline=Path(settings.BASE_DIR) / 'benchmarks' / 'missing.json')
+        run.assert_not_called()
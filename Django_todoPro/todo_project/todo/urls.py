@@ -1,4 +1,10 @@
+from django.conf import settings
 from django.urls import path
+from .api import (
+    TaskApiListView, TaskApiDetailView,
+    AsyncTaskApiListView, AsyncTaskApiDetailView, TaskApiChangesView,
+)
+from .async_views import AsyncTaskListView, AsyncTaskDetailView, AsyncExpiredTasksListView, TaskEventStreamView
 from .views import (
     # Auth views - Question 3
     HomeView, CustomLoginView, CustomLogoutView,
@@ -6,7 +12,8 @@ from .views import (
 
     # Task views
     TaskListView, TaskDetailView, TaskCreateView,
-    TaskUpdateView, TaskDeleteView, TaskStatusUpdateView,
+    TaskUpdateView, TaskDeleteView, TaskStatusUpdateView, TaskBulkActionView,
+    TaskExportView, TaskImportView, OccurrenceStatusView, TaskSearchView,
 
     # Special views for Questions 1 and 2
     ExpiredTasksListView, UsersWithoutTasksView
@@ -14,6 +21,14 @@ from .views import (
 
 app_name = 'todo'
 
+# Under ASGI the read-heavy pages and the JSON API are served by their async versions
+if settings.ASYNC_VIEWS:
+    TaskListView = AsyncTaskListView
+    TaskDetailView = AsyncTaskDetailView
+    ExpiredTasksListView = AsyncExpiredTasksListView
+    TaskApiListView = AsyncTaskApiListView
+    TaskApiDetailView = AsyncTaskApiDetailView
+
 urlpatterns = [
     # Home URL
     path('', HomeView.as_view(), name='home'),
@@ -32,6 +47,17 @@ urlpatterns = [
     path('tasks/<int:pk>/edit/', TaskUpdateView.as_view(), name='task_edit'),
     path('tasks/<int:pk>/delete/', TaskDeleteView.as_view(), name='task_delete'),
     path('tasks/<int:pk>/update-status/', TaskStatusUpdateView.as_view(), name='task_update_status'),
+    path('tasks/<int:pk>/occurrences/<str:day>/', OccurrenceStatusView.as_view(), name='occurrence_status'),
+    path('tasks/bulk/', TaskBulkActionView.as_view(), name='task_bulk'),
+    path('tasks/search/', TaskSearchView.as_view(), name='task_search'),
+    path('tasks/events/', TaskEventStreamView.as_view(), name='task_events'),
+    path('tasks/export/', TaskExportView.as_view(), name='task_export'),
+    path('tasks/import/', TaskImportView.as_view(), name='task_import'),
+
+    # JSON API
+    path('api/tasks/', TaskApiListView.as_view(), name='api_task_list'),
+    path('api/tasks/<int:pk>/', TaskApiDetailView.as_view(), name='api_task_detail'),
+    path('api/tasks/changes/', TaskApiChangesView.as_view(), name='api_task_changes'),
 
     # Special URLs for Questions
     path('expired-tasks/', ExpiredTasksListView.as_view(), name='expired_tasks_list'),  # Question 1
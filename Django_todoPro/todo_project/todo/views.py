@@ -1,14 +1,63 @@
-from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, TemplateView
+import io
+from datetime import date, timedelta
+from django.views.generic import View, ListView, DetailView, CreateView, UpdateView, DeleteView, TemplateView, FormView
+from django.conf import settings
 from django.urls import reverse_lazy
+from django.utils.http import url_has_allowed_host_and_scheme
 from django.utils import timezone
 from django.contrib import messages
 from django.contrib.auth.models import User
 from django.contrib.auth.views import LoginView, LogoutView
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.shortcuts import redirect
-from django.db.models import Count
-from .models import Task, UserProfile
-from .forms import UserRegistrationForm, UserLoginForm, UserProfileForm, TaskForm
+from django.shortcuts import redirect, get_object_or_404
+from django.http import Http404, StreamingHttpResponse, HttpResponseBadRequest
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Q
+from .models import Task, UserProfile, OccurrenceException
+from .forms import (
+    UserRegistrationForm, UserLoginForm, UserProfileForm, TaskForm, RecurrenceForm, OccurrenceStatusForm,
+    TaskBulkActionForm, TaskExportForm, TaskImportForm,
+)
+from .pagination import KeysetPaginationMixin
+from .fragments import render_task_cards
+from .conditional import TaskWatermarkMixin
+from .middleware import remember_timezone
+from .export import stream_csv, stream_ndjson
+from .importer import TaskImporter, ImportFormatError, iter_rows
+from .search import SEARCH_LIMIT
+from .streaming import streaming_content
+
+# How far ahead the task list and detail pages expand recurring tasks
+UPCOMING_OCCURRENCE_DAYS = 14
+
+
+def get_next_url(request, default):
+    """The posted ``next`` URL when it is safe to redirect to, else ``default``"""
+    next_url = request.POST.get('next')
+    if next_url and url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+        return next_url
+    return default
+
+
+def upcoming_window():
+    today = timezone.localdate()
+    return today, today + timedelta(days=UPCOMING_OCCURRENCE_DAYS)
+
+
+class RecurrenceFormMixin:
+    """The optional RecurrenceForm posted along with TaskForm"""
+
+    def get_recurrence_form(self):
+        if not hasattr(self, '_recurrence_form'):
+            task = getattr(self, 'object', None)
+            rule = getattr(task, 'recurrence', None) if task is not None and task.pk else None
+            self._recurrence_form = RecurrenceForm(self.request.POST or None, instance=rule, prefix='recurrence')
+        return self._recurrence_form
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['recurrence_form'] = self.get_recurrence_form()
+        return context
 
 
 # Home View
@@ -76,8 +125,10 @@ class UserProfileView(LoginRequiredMixin, DetailView):
 
         if hasattr(user, 'tasks'):
             context['user_tasks'] = user.tasks.all().order_by('-due_date')[:10]
-            stats = user.profile.get_task_statistics()
-            context.update(stats)
+            if self.object.expiry_passed():
+                self.object.refresh_expired()
+            context.update(self.object.get_task_statistics())
+            context['weekly'] = user.tasks.weekly_stats()
 
         return context
 
@@ -96,34 +147,36 @@ class UserProfileUpdateView(LoginRequiredMixin, UpdateView):
         return kwargs
 
     def form_valid(self, form):
+        remember_timezone(self.request, form.cleaned_data['time_zone'])
         messages.success(self.request, 'Profile updated successfully!')
         return super().form_valid(form)
 
 
-class TaskListView(LoginRequiredMixin, ListView):
+class TaskListView(LoginRequiredMixin, TaskWatermarkMixin, KeysetPaginationMixin, ListView):
     model = Task
     template_name = 'todo/index.html'
     context_object_name = 'tasks'
+    keyset_ordering = ('due_at', 'id')
 
     def get_queryset(self):
         if hasattr(self.request.user, 'tasks'):
-            return self.request.user.tasks.all().order_by('due_date')
+            return self.request.user.tasks.select_related('recurrence').by_deadline()
         return Task.objects.none()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         user = self.request.user
 
-        if hasattr(user, 'tasks'):
-            expired_tasks = user.tasks.filter(
-                due_date__lt=timezone.now().date(),
-                done=False
-            )
-            context['expired_tasks'] = expired_tasks
-            context['expired_count'] = expired_tasks.count()
-            context['total_tasks'] = user.tasks.count()
+        if hasattr(user, 'profile'):
+            context['expired_count'] = user.profile.tasks_expired
+            context['total_tasks'] = user.profile.tasks_total
 
-        context['today_date'] = timezone.now()
+        today = timezone.now()
+        context['today_date'] = today
+        Task.flag_expired(context['tasks'], today)
+        Task.attach_occurrences(context['tasks'], *upcoming_window())
+        render_task_cards(context['tasks'])
+        context['bulk_form'] = TaskBulkActionForm()
 
         if not self.request.session.get('welcome_shown'):
             messages.info(self.request, f'Welcome to your task manager, {user.username}! Here are all your tasks.')
@@ -132,17 +185,22 @@ class TaskListView(LoginRequiredMixin, ListView):
         return context
 
 
-class TaskCreateView(LoginRequiredMixin, CreateView):
+class TaskCreateView(LoginRequiredMixin, RecurrenceFormMixin, CreateView):
     model = Task
     form_class = TaskForm
     template_name = 'todo/task_form.html'
     success_url = reverse_lazy('todo:task_list')
 
     def form_valid(self, form):
+        recurrence_form = self.get_recurrence_form()
+        if not recurrence_form.is_valid():
+            return self.form_invalid(form)
+
         task = form.save(commit=False)
         if hasattr(self.request.user, 'tasks'):
             task.user = self.request.user
         task.save()
+        recurrence_form.save_for(task)
 
         messages.success(
             self.request,
@@ -166,20 +224,21 @@ class TaskCreateView(LoginRequiredMixin, CreateView):
         return context
 
 
-class TaskDetailView(LoginRequiredMixin, DetailView):
+class TaskDetailView(LoginRequiredMixin, TaskWatermarkMixin, DetailView):
     model = Task
     template_name = 'todo/task_detail.html'
     context_object_name = 'task'
 
     def get_queryset(self):
         if hasattr(self.request.user, 'tasks'):
-            return self.request.user.tasks.all()
+            return self.request.user.tasks.select_related('recurrence')
         return Task.objects.none()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         task = self.get_object()
         context['is_expired'] = task.is_past_due_and_incomplete()
+        Task.attach_occurrences([self.object], *upcoming_window())
 
         if task.is_past_due_and_incomplete():
             messages.warning(
@@ -196,16 +255,26 @@ class TaskDetailView(LoginRequiredMixin, DetailView):
         return context
 
 
-class TaskUpdateView(LoginRequiredMixin, UpdateView):
+class TaskUpdateView(LoginRequiredMixin, RecurrenceFormMixin, UpdateView):
     model = Task
     form_class = TaskForm
     template_name = 'todo/task_form.html'
 
     def get_queryset(self):
         if hasattr(self.request.user, 'tasks'):
-            return self.request.user.tasks.all()
+            return self.request.user.tasks.select_related('recurrence')
         return Task.objects.none()
 
+    def form_valid(self, form):
+        recurrence_form = self.get_recurrence_form()
+        if not recurrence_form.is_valid():
+            return self.form_invalid(form)
+
+        with transaction.atomic():
+            response = super().form_valid(form)
+            recurrence_form.save_for(self.object)
+        return response
+
     def get_success_url(self):
         messages.success(
             self.request,
@@ -308,22 +377,162 @@ class TaskStatusUpdateView(LoginRequiredMixin, UpdateView):
         return context
 
 
-class ExpiredTasksListView(LoginRequiredMixin, ListView):
+class TaskBulkActionView(LoginRequiredMixin, FormView):
+    """Complete, un-complete, delete or reschedule many tasks with one statement"""
+    form_class = TaskBulkActionForm
+    http_method_names = ['post']
+
+    def get_success_url(self):
+        return get_next_url(self.request, reverse_lazy('todo:task_list'))
+
+    def form_valid(self, form):
+        action = form.cleaned_data['action']
+
+        with transaction.atomic():
+            tasks = form.get_tasks(self.request.user)
+            if action == TaskBulkActionForm.ACTION_DELETE:
+                count = tasks.delete()[1].get(Task._meta.label, 0)
+            elif action == TaskBulkActionForm.ACTION_SHIFT:
+                count = tasks.update(due_date=F('due_date') + timedelta(days=form.cleaned_data['days']))
+            else:
+                count = tasks.update(done=action == TaskBulkActionForm.ACTION_COMPLETE)
+
+        action_text = {
+            TaskBulkActionForm.ACTION_COMPLETE: 'marked as COMPLETED',
+            TaskBulkActionForm.ACTION_UNCOMPLETE: 'marked as NOT COMPLETED',
+            TaskBulkActionForm.ACTION_DELETE: 'permanently deleted',
+            TaskBulkActionForm.ACTION_SHIFT: f'rescheduled by {form.cleaned_data["days"]} day(s)',
+        }[action]
+        messages.success(self.request, f'✅ {count} task(s) {action_text}.')
+        return super().form_valid(form)
+
+    def form_invalid(self, form):
+        errors = ' '.join(error for field_errors in form.errors.values() for error in field_errors)
+        messages.error(self.request, f'❌ Bulk action failed. {errors}')
+        return redirect(self.get_success_url())
+
+
+class OccurrenceStatusView(LoginRequiredMixin, View):
+    """
+    Complete, skip or reopen one occurrence of a recurring task.
+
+    Occurrences are not rows: this only writes (or removes) an
+    OccurrenceException for that date.
+    """
+    http_method_names = ['post']
+
+    def post(self, request, pk, day):
+        task = get_object_or_404(request.user.tasks.select_related('recurrence'), pk=pk, repeats=True)
+        try:
+            day = date.fromisoformat(day)
+        except ValueError:
+            raise Http404('Invalid occurrence date.')
+        if not task.recurrence.occurs_on(day):
+            raise Http404('The task does not occur on this date.')
+
+        form = OccurrenceStatusForm(request.POST)
+        if not form.is_valid():
+            return HttpResponseBadRequest(form.errors.as_text(), content_type='text/plain')
+
+        status = form.cleaned_data['status']
+        when = day.strftime('%b %d, %Y')
+        if status == OccurrenceStatusForm.STATUS_PENDING:
+            OccurrenceException.objects.filter(task=task, occurrence=day).delete()
+            messages.info(request, f'📝 "{task.title}" on {when} has been marked as NOT COMPLETED.')
+        else:
+            OccurrenceException.objects.update_or_create(task=task, occurrence=day, defaults={'status': status})
+            if status == OccurrenceException.STATUS_DONE:
+                messages.success(request, f'🎉 Excellent! "{task.title}" on {when} has been marked as COMPLETED!')
+            else:
+                messages.info(request, f'⏭️ "{task.title}" on {when} has been skipped.')
+
+        return redirect(get_next_url(request, reverse_lazy('todo:task_detail', kwargs={'pk': task.pk})))
+
+
+class TaskSearchView(LoginRequiredMixin, ListView):
+    """Ranked, prefix-matching search over the user's task titles"""
+    template_name = 'todo/search.html'
+    context_object_name = 'tasks'
+
+    def get_queryset(self):
+        self.query = self.request.GET.get('q', '').strip()
+        if not self.query:
+            return []
+        return Task.flag_expired(Task.objects.search(self.query, user=self.request.user))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.query
+        context['search_limit'] = SEARCH_LIMIT
+        return context
+
+
+class TaskExportView(LoginRequiredMixin, View):
+    """Stream the user's tasks as CSV or NDJSON with flat memory use"""
+
+    def get(self, request, *args, **kwargs):
+        form = TaskExportForm(request.GET)
+        if not form.is_valid():
+            return HttpResponseBadRequest(form.errors.as_text(), content_type='text/plain')
+
+        tasks = form.get_tasks(request.user)
+        archived = form.get_archived_tasks(request.user)
+        if form.cleaned_data['format'] == TaskExportForm.FORMAT_NDJSON:
+            response = StreamingHttpResponse(
+                streaming_content(request, stream_ndjson(tasks, archived)), content_type='application/x-ndjson',
+            )
+            filename = 'tasks.ndjson'
+        else:
+            response = StreamingHttpResponse(
+                streaming_content(request, stream_csv(tasks, archived)), content_type='text/csv',
+            )
+            filename = 'tasks.csv'
+
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class TaskImportView(LoginRequiredMixin, FormView):
+    """Import many tasks from an uploaded CSV or JSON file"""
+    form_class = TaskImportForm
+    template_name = 'todo/task_import.html'
+
+    def form_valid(self, form):
+        upload = form.cleaned_data['file']
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        importer = TaskImporter(self.request.user)
+
+        try:
+            report = importer.run(iter_rows(stream, form.cleaned_data['format']))
+        except (ImportFormatError, UnicodeDecodeError) as error:
+            report = importer.report
+            messages.error(self.request, f'❌ Import stopped: {error}')
+
+        if report.failed:
+            messages.warning(
+                self.request,
+                f'⚠️ Imported {report.created} task(s); {report.failed} row(s) could not be imported.'
+            )
+        else:
+            messages.success(self.request, f'✅ Imported {report.created} task(s) successfully!')
+
+        return self.render_to_response(self.get_context_data(form=form, report=report))
+
+
+class ExpiredTasksListView(LoginRequiredMixin, TaskWatermarkMixin, KeysetPaginationMixin, ListView):
     template_name = 'todo/expired_tasks.html'
     context_object_name = 'expired_tasks'
+    keyset_ordering = ('due_at', 'id')
 
     def get_queryset(self):
         if hasattr(self.request.user, 'tasks'):
-            return self.request.user.tasks.filter(
-                due_date__lt=timezone.now().date(),
-                done=False
-            ).order_by('due_date')
+            return self.request.user.tasks.expired().by_deadline()
         return Task.objects.none()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        expired_tasks = self.get_queryset()
-        expired_count = expired_tasks.count()
+        user = self.request.user
+        expired_count = user.profile.tasks_expired if hasattr(user, 'profile') else 0
 
         context['expired_count'] = expired_count
         context['today_date'] = timezone.now()
@@ -347,9 +556,10 @@ class ExpiredTasksListView(LoginRequiredMixin, ListView):
         return context
 
 
-class UsersWithoutTasksView(LoginRequiredMixin, ListView):
+class UsersWithoutTasksView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     template_name = 'todo/users_without_tasks.html'
     context_object_name = 'users'
+    keyset_ordering = ('username', 'id')
 
     def dispatch(self, request, *args, **kwargs):
         """Only allow admin users to access this view"""
@@ -361,19 +571,29 @@ class UsersWithoutTasksView(LoginRequiredMixin, ListView):
             return redirect('todo:task_list')
         return super().dispatch(request, *args, **kwargs)
 
+    def without_tasks_condition(self):
+        """Matches users without tasks, from the counters snapshot or the task table"""
+        if settings.USERS_WITHOUT_TASKS_FROM_COUNTERS:
+            return Q(profile__tasks_total=0)
+        return ~Exists(Task.objects.filter(user=OuterRef('pk')))
+
     def get_queryset(self):
-        """Get users without tasks"""
-        return Task.objects.users_without_tasks().order_by('username')
+        return User.objects.filter(self.without_tasks_condition())
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        total_users = User.objects.count()
-        users_without_tasks = self.get_queryset()
-        users_without_count = users_without_tasks.count()
+        # Both counts in one pass over the users
+        counts = User.objects.aggregate(
+            total=Count('pk'),
+            without_tasks=Count('pk', filter=self.without_tasks_condition()),
+        )
+        total_users = counts['total']
+        users_without_count = counts['without_tasks']
 
         context['total_users'] = total_users
         context['users_without_tasks_count'] = users_without_count
+        context['users_with_tasks_count'] = total_users - users_without_count
         context['today_date'] = timezone.now()
 
         # Add statistics message